@@ -0,0 +1,5 @@
+"""Benchmarks for the trove api
+
+Each module runs on its own with ``python -m benchmarks.<name>`` against a
+throwaway test database, so they never touch db.sqlite3.
+"""
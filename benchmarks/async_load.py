@@ -0,0 +1,116 @@
+"""Throughput of the sync ViewSets and the async read views under the same
+concurrency, served by Django's ASGI handler
+
+Every client is a task sending requests one after another through an
+AsyncClient. With the sync URLs every request runs the ViewSet on
+Django's one thread for sync code, as it does under an ASGI server; with
+the async URLs of trove.urls only the queries do. Lists carry a distinct
+query parameter per request and run so they miss list_cache, and the unread long
+poll waits the whole wait since nothing changes.
+
+    python -m benchmarks.async_load [--clients 20] [--requests 10] [--wait 0.5]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import types
+
+from benchmarks.harness import print_table, test_database
+
+GAMES = 200
+TAGS = 20
+
+
+def seed():
+    # pylint: disable=import-outside-toplevel
+    from django.contrib.auth.models import User
+    from rest_framework.authtoken.models import Token
+    from troveapi.models import Game, Tag, TaggedGame
+    from troveapi.views.recommendation import unread_counts
+
+    user = User.objects.create_user(username='bench', password='bench')
+    tags = Tag.objects.bulk_create([Tag(user=user, tag=f'Tag {i}') for i in range(TAGS)])
+    games = Game.objects.bulk_create(
+        [Game(user=user, name=f'Game {i}', current=bool(i % 2), multiplayer_capable=False)
+         for i in range(GAMES)])
+    TaggedGame.objects.bulk_create(
+        [TaggedGame(game=game, tag=tag) for game in games for tag in tags[:3]])
+
+    return Token.objects.create(user=user).key, unread_counts(user)['version']
+
+
+def sync_urls():
+    """URLconf with the ViewSets alone, as before the async views"""
+    # pylint: disable=import-outside-toplevel
+    from django.urls import include, path
+    from trove.urls import router
+
+    urlconf = types.ModuleType('sync_urls')
+    urlconf.urlpatterns = [path('', include(router.urls))]
+    return urlconf
+
+
+async def load(token, url_for, clients, requests, label):
+    """Requests per second, and median and 95th percentile latency in ms"""
+    # pylint: disable=import-outside-toplevel
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    headers = {'Authorization': f'Token {token}'}
+    latencies = []
+
+    async def run_client(number):
+        for request in range(requests):
+            start = time.perf_counter()
+            response = await client.get(url_for(label, number, request), headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.content
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(number) for number in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return (f'{len(latencies) / elapsed:.0f}', f'{statistics.median(latencies):.1f}',
+            f'{latencies[int(len(latencies) * 0.95)]:.1f}')
+
+
+def main():
+    # pylint: disable=import-outside-toplevel
+    from django.test import override_settings
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=10)
+    parser.add_argument('--wait', type=float, default=0.5)
+    args = parser.parse_args()
+
+    with test_database():
+        token, version = seed()
+        scenarios = [
+            ('game list', args.requests,
+             lambda label, number, request: f'/games?{label}={number}.{request}'),
+            ('tag list', args.requests,
+             lambda label, number, request: f'/tags?{label}={number}.{request}'),
+            ('notify', args.requests,
+             lambda label, number, request: '/bookRecommendations/notify'),
+            # one poll per client, each held open for the whole wait by the
+            # async view, the sync view answers at once
+            ('unread long poll', 1,
+             lambda label, number, request: f'/recommendations/unread?since={version}&wait={args.wait}'),
+        ]
+
+        rows = []
+        for name, requests, url_for in scenarios:
+            for label, urlconf in (('sync', sync_urls()), ('async', 'trove.urls')):
+                with override_settings(ROOT_URLCONF=urlconf):
+                    result = asyncio.run(load(token, url_for, args.clients, requests, label))
+                rows.append((name, label, *result))
+
+    print(f'{args.clients} concurrent clients, {GAMES} games\n')
+    print_table(('endpoint', 'views', 'requests/s', 'p50 ms', 'p95 ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
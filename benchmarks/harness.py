@@ -0,0 +1,49 @@
+"""Shared setup and timing helpers for the benchmarks"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'trove.settings')
+os.environ.setdefault('MY_SECRET_KEY', 'benchmark')
+
+import django  # noqa: E402 pylint: disable=wrong-import-position
+
+django.setup()
+
+# pylint: disable=wrong-import-position
+from django.db import connection  # noqa: E402
+from django.test.utils import (setup_databases,  # noqa: E402
+                               setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+
+
+@contextmanager
+def test_database():
+    """Run the body against a freshly migrated throwaway database, which
+    the read replica mirrors as it does in tests
+    """
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False, serialized_aliases=set())
+    try:
+        yield connection
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def timed(func, repeat=7):
+    """Median wall time of func in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def print_table(headers, rows):
+    """Print rows as a plain aligned table"""
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+    for row in (headers, *rows):
+        print('  '.join(str(cell).rjust(width) for cell, width in zip(row, widths)))
@@ -0,0 +1,101 @@
+"""Encode time and peak memory rendering game, book and show lists
+with DRF's JSONRenderer and with FastJSONRenderer
+
+Encode time renders the same list of row dicts. Peak memory covers a whole
+list response, from reading the rows to the rendered body, and the same
+list streamed by render_array a chunk of rows at a time, as lists longer
+than TROVE_STREAM_ROWS are.
+
+    python -m benchmarks.json_render [--rows 5000]
+"""
+import argparse
+import tracemalloc
+
+from benchmarks.harness import print_table, test_database, timed
+
+TAGS = 5
+
+
+def seed(count):
+    # pylint: disable=import-outside-toplevel
+    from django.contrib.auth.models import User
+    from troveapi.models import (Author, Book, Game, Show, StreamingService,
+                                 Tag, TaggedBook, TaggedGame, TaggedShow)
+
+    user = User.objects.create_user(username='bench', password='bench')
+    tags = Tag.objects.bulk_create([Tag(user=user, tag=f'Tag {i}') for i in range(TAGS)])
+    author = Author.objects.create(user=user, name='Ursula K. Le Guin')
+    service = StreamingService.objects.create(service='Streamer')
+
+    games = Game.objects.bulk_create(
+        [Game(user=user, name=f'Game {i}', current=bool(i % 2), multiplayer_capable=False)
+         for i in range(count)])
+    books = Book.objects.bulk_create(
+        [Book(user=user, name=f'Book {i}', current=bool(i % 2), author=author)
+         for i in range(count)])
+    shows = Show.objects.bulk_create(
+        [Show(user=user, name=f'Show {i}', current=bool(i % 2), streaming_service=service)
+         for i in range(count)])
+    TaggedGame.objects.bulk_create(
+        [TaggedGame(game=game, tag=tag) for game in games for tag in tags[:3]])
+    TaggedBook.objects.bulk_create(
+        [TaggedBook(book=book, tag=tag) for book in books for tag in tags[:3]])
+    TaggedShow.objects.bulk_create(
+        [TaggedShow(show=show, tag=tag) for show in shows for tag in tags[:3]])
+
+
+def peak_kib(func):
+    """Peak memory allocated while func runs, in KiB"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    # pylint: disable=import-outside-toplevel
+    from rest_framework.renderers import JSONRenderer
+    from troveapi.models import Book, Game, Show
+    from troveapi.renderers import (CHUNK_SIZE, FastJSONRenderer, orjson,
+                                    render_array)
+    from troveapi.views.fast_serializers import book_data, game_data, show_data
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    renderers = (('JSONRenderer', JSONRenderer()), ('FastJSONRenderer', FastJSONRenderer()))
+    rows = []
+    with test_database():
+        seed(args.rows)
+        for name, model, row_data in (('games', Game, game_data), ('books', Book, book_data),
+                                      ('shows', Show, show_data)):
+            queryset = model.objects.with_related()
+            data = [row_data(row) for row in queryset]
+            assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+            def whole(renderer):
+                return renderer.render([row_data(row) for row in queryset.all()])
+
+            def streamed(renderer):
+                rows = queryset.all().iterator(chunk_size=CHUNK_SIZE)
+                for _ in render_array(renderer, (row_data(row) for row in rows)):
+                    pass
+
+            for label, renderer in renderers:
+                rows.append((
+                    name, label,
+                    f'{timed(lambda: renderer.render(data)):.1f}',
+                    f'{peak_kib(lambda: whole(renderer)):,.0f}',
+                    f'{peak_kib(lambda: streamed(renderer)):,.0f}',
+                ))
+
+    print(f'{args.rows} rows of each with 3 tags, '
+          f'orjson {"installed" if orjson else "not installed"}, median ms\n')
+    print_table(('list', 'renderer', 'encode ms', 'peak KiB', 'streamed peak KiB'), rows)
+
+
+if __name__ == '__main__':
+    main()
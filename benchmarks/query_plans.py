@@ -0,0 +1,121 @@
+"""Query plans and latency of the hot queries before and after the
+0009_query_indexes migration
+
+Seeds a database at the latest migration, then explains and times every
+query with the schema migrated back to 0008 and forward again.
+
+    python -m benchmarks.query_plans
+"""
+import random
+
+from benchmarks.harness import print_table, test_database, timed
+
+USERS = 20
+MEDIA_PER_USER = 500
+TAGS_PER_USER = 20
+RECOMMENDATIONS_PER_USER = 200
+
+BEFORE = '0008_recommendation_created'
+AFTER = '0009_query_indexes'
+
+
+def seed():
+    # pylint: disable=import-outside-toplevel
+    from django.contrib.auth.models import User
+    from troveapi.models import (Author, Book, BookRecommendation, Game,
+                                 Platform, Tag, TaggedGame)
+
+    rng = random.Random(0)
+    platform = Platform.objects.create(name='PC')
+    users = User.objects.bulk_create(
+        [User(username=f'bench{i}') for i in range(USERS)])
+    for user in users:
+        tags = Tag.objects.bulk_create(
+            [Tag(user=user, tag=f'Tag {i}') for i in range(TAGS_PER_USER)])
+        author = Author.objects.create(user=user, name='Ursula Le Guin')
+        games = Game.objects.bulk_create(
+            [Game(user=user, name=f'Game {i}', current=bool(i % 3),
+                  multiplayer_capable=False) for i in range(MEDIA_PER_USER)])
+        TaggedGame.objects.bulk_create(
+            [TaggedGame(game=game, tag=tag) for game in games
+             for tag in rng.sample(tags, 3)])
+        game_platforms = Game.platforms.through
+        game_platforms.objects.bulk_create(
+            [game_platforms(game=game, platform=platform) for game in games])
+        books = Book.objects.bulk_create(
+            [Book(user=user, name=f'Book {i}', current=bool(i % 2), author=author)
+             for i in range(MEDIA_PER_USER)])
+        BookRecommendation.objects.bulk_create(
+            [BookRecommendation(book=rng.choice(books), sender=user,
+                                recipient=rng.choice(users), message='',
+                                read=rng.random() < 0.9)
+             for _ in range(RECOMMENDATIONS_PER_USER)])
+
+    return users[USERS // 2]
+
+
+def hot_queries(user):
+    """Name and queryset of each query pattern the views run"""
+    # pylint: disable=import-outside-toplevel
+    from django.db.models import Count, Max
+    from troveapi.models import Author, BookRecommendation, Game, Tag, TaggedGame
+
+    games = Game.objects.filter(user=user)
+    game_ids = list(games.values_list('pk', flat=True)[:50])
+    return [
+        ('media list', games.order_by('-last_modified', '-id')),
+        ('media version', games.order_by().values('user').annotate(
+            latest=Max('last_modified'), count=Count('pk'))),
+        ('current media', games.filter(current=True)),
+        ('unread recommendations', BookRecommendation.objects.filter(
+            recipient=user, read=False)),
+        ('tag list', Tag.objects.filter(user=user).order_by('tag').values_list(
+            'id', 'tag', 'user')),
+        ('author by name', Author.objects.filter(user=user, name__iexact='ursula le guin')),
+        ('prefetched tag links', TaggedGame.objects.filter(game__in=game_ids)),
+    ]
+
+
+def run_sql(queryset):
+    """Run a queryset's SQL without building model instances, which would
+    drown out the difference the indexes make
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        cursor.fetchall()
+
+
+def measure(user):
+    return {name: (queryset.explain(), timed(lambda q=queryset: run_sql(q), repeat=25))
+            for name, queryset in hot_queries(user)}
+
+
+def main():
+    # pylint: disable=import-outside-toplevel
+    from django.core.management import call_command
+
+    with test_database():
+        user = seed()
+
+        call_command('migrate', 'troveapi', BEFORE, verbosity=0)
+        before = measure(user)
+        call_command('migrate', 'troveapi', AFTER, verbosity=0)
+        after = measure(user)
+
+        print(f'{USERS} users with {MEDIA_PER_USER} games and books each\n')
+        for name in before:
+            print(f'== {name}')
+            print(f'before: {before[name][0]}')
+            print(f'after:  {after[name][0]}\n')
+
+        print_table(
+            ('query', f'{BEFORE} ms', f'{AFTER} ms'),
+            [(name, f'{before[name][1]:.3f}', f'{after[name][1]:.3f}') for name in before])
+
+
+if __name__ == '__main__':
+    main()
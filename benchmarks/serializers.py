@@ -0,0 +1,63 @@
+"""Rows per second serializing game lists with GameSerializer and with the
+hand written game_data of troveapi.views.fast_serializers
+
+The rows are fetched once with the list's related and prefetched queries,
+so only serialization is timed, then serialization and rendering together.
+
+    python -m benchmarks.serializers
+"""
+from benchmarks.harness import print_table, test_database, timed
+
+SIZES = (1000, 10000)
+TAGS = 5
+PLATFORMS = 3
+
+
+def seed(count):
+    # pylint: disable=import-outside-toplevel
+    from django.contrib.auth.models import User
+    from troveapi.models import Game, GamePlatform, Platform, Tag, TaggedGame
+
+    user = User.objects.create_user(username='bench', password='bench')
+    tags = Tag.objects.bulk_create([Tag(user=user, tag=f'Tag {i}') for i in range(TAGS)])
+    platforms = Platform.objects.bulk_create(
+        [Platform(name=f'Platform {i}') for i in range(PLATFORMS)])
+    games = Game.objects.bulk_create(
+        [Game(user=user, name=f'Game {i}', current=bool(i % 2), multiplayer_capable=False)
+         for i in range(count)])
+    TaggedGame.objects.bulk_create(
+        [TaggedGame(game=game, tag=tag) for game in games for tag in tags[:3]])
+    GamePlatform.objects.bulk_create(
+        [GamePlatform(game=game, platform=platform) for game in games for platform in platforms[:2]])
+
+
+def main():
+    # pylint: disable=import-outside-toplevel
+    from rest_framework.renderers import JSONRenderer
+    from troveapi.models import Game
+    from troveapi.views.fast_serializers import game_data
+    from troveapi.views.game import GameSerializer
+
+    renderer = JSONRenderer()
+    rows = []
+    with test_database():
+        seed(max(SIZES))
+        for size in SIZES:
+            games = list(Game.objects.with_related()[:size])
+            assert (renderer.render(GameSerializer(games, many=True).data) ==
+                    renderer.render([game_data(game) for game in games]))
+
+            for label, serialize in (
+                    ('GameSerializer', lambda: GameSerializer(games, many=True).data),
+                    ('game_data', lambda: [game_data(game) for game in games])):
+                serialized = timed(serialize, repeat=5)
+                rendered = timed(lambda: renderer.render(serialize()), repeat=5)
+                rows.append((size, label, f'{serialized:.0f}', f'{size / serialized * 1000:,.0f}',
+                             f'{size / rendered * 1000:,.0f}'))
+
+    print('games with 2 platforms and 3 tags each\n')
+    print_table(('rows', 'serializer', 'ms', 'rows/s', 'rows/s rendered'), rows)
+
+
+if __name__ == '__main__':
+    main()
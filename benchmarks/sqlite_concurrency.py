@@ -0,0 +1,148 @@
+"""Write throughput and lock errors of concurrent requests on SQLite, with
+its default settings and with the tuning in trove/database.py
+
+Several processes share one database file and run a mix of list reads and
+game creates for a fixed time, the way worker processes of a web server
+would. The default configuration reconnects for every request like
+CONN_MAX_AGE = 0; the tuned one keeps its connection.
+
+    python -m benchmarks.sqlite_concurrency [--workers 8] [--seconds 10]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.harness import print_table
+
+TAGS = 10
+READ_SHARE = 0.7
+
+
+def configure(path, tuned):
+    # pylint: disable=import-outside-toplevel
+    from django.db import connection
+    from trove.database import sqlite_database
+
+    config = (sqlite_database(path) if tuned else
+              sqlite_database(path, pragmas={}, conn_max_age=0, timeout=5))
+    if not tuned:
+        config['OPTIONS'].pop('transaction_mode', None)
+
+    connection.close()
+    connection.settings_dict.update(config)
+
+
+def seed():
+    # pylint: disable=import-outside-toplevel
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from troveapi.models import Tag
+
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user(username='bench', password='bench')
+    Tag.objects.bulk_create([Tag(user=user, tag=f'Tag {i}') for i in range(TAGS)])
+    return user.pk
+
+
+def read(user_id):
+    # pylint: disable=import-outside-toplevel
+    from troveapi.models import Game
+
+    list(Game.objects.with_related().filter(user_id=user_id)
+         .order_by('-last_modified', '-id')[:50])
+
+
+def write(user_id, rng):
+    # pylint: disable=import-outside-toplevel
+    from django.db import transaction
+    from troveapi.models import Game, Tag
+
+    # the same steps as a create request: look up the tags, save the game,
+    # link it, and let the signals update the search index and tag usage
+    with transaction.atomic():
+        tags = list(Tag.objects.filter(user_id=user_id))
+        game = Game.objects.create(user_id=user_id, name=f'Game {rng.random()}',
+                                   current=True, multiplayer_capable=False)
+        game.tags.set(rng.sample(tags, 3))
+
+
+def worker(user_id, seconds, seed_value, results):
+    # pylint: disable=import-outside-toplevel
+    from django.db import OperationalError, connection
+
+    rng = random.Random(seed_value)
+    reads = errors = 0
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            if rng.random() < READ_SHARE:
+                read(user_id)
+                reads += 1
+            else:
+                start = time.perf_counter()
+                write(user_id, rng)
+                latencies.append((time.perf_counter() - start) * 1000)
+        except OperationalError as ex:
+            if 'locked' not in str(ex) and 'busy' not in str(ex):
+                raise
+            errors += 1
+        # end of a request: drops the connection unless CONN_MAX_AGE keeps it
+        connection.close_if_unusable_or_obsolete()
+
+    connection.close()
+    results.put((reads, latencies, errors))
+
+
+def run(tuned, workers, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        configure(os.path.join(directory, 'bench.sqlite3'), tuned)
+        user_id = seed()
+        # children must not share the parent's open connection
+        configure(os.path.join(directory, 'bench.sqlite3'), tuned)
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(user_id, seconds, i, results))
+                     for i in range(workers)]
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    reads = sum(outcome[0] for outcome in outcomes)
+    latencies = sorted(latency for outcome in outcomes for latency in outcome[1])
+    errors = sum(outcome[2] for outcome in outcomes)
+    attempts = len(latencies) + errors
+    return (
+        f'{len(latencies) / seconds:.0f}',
+        f'{reads / seconds:.0f}',
+        f'{errors}',
+        f'{100 * errors / attempts if attempts else 0:.1f}',
+        f'{statistics.median(latencies) if latencies else 0:.1f}',
+        f'{latencies[int(len(latencies) * 0.95)] if latencies else 0:.1f}',
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f'{args.workers} processes for {args.seconds:g}s, '
+          f'{READ_SHARE:.0%} list reads and the rest game creates\n')
+    print_table(
+        ('settings', 'writes/s', 'reads/s', 'lock errors', 'error %',
+         'write p50 ms', 'write p95 ms'),
+        [('default', *run(False, args.workers, args.seconds)),
+         ('tuned', *run(True, args.workers, args.seconds))])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Latency of multi-tag game filtering as the number of tags grows
+
+Compares the one join per tag that MediaQuerySet.tagged uses for "all"
+with grouping the links and counting the matched tags, and times the IN
+subquery of "any".
+
+    python -m benchmarks.tag_filter
+"""
+import random
+
+from benchmarks.harness import print_table, test_database, timed
+
+GAMES = 3000
+TAGS = 20
+TAGS_PER_GAME = 8
+
+
+def seed():
+    # pylint: disable=import-outside-toplevel
+    from django.contrib.auth.models import User
+    from troveapi.models import Game, Tag, TaggedGame
+
+    user = User.objects.create_user(username='bench', password='bench')
+    tags = Tag.objects.bulk_create(
+        [Tag(user=user, tag=f'Tag {i}') for i in range(TAGS)])
+    games = Game.objects.bulk_create(
+        [Game(user=user, name=f'Game {i}', current=bool(i % 2), multiplayer_capable=False)
+         for i in range(GAMES)])
+
+    rng = random.Random(0)
+    # the first tags are on every game so intersections stay non empty
+    common = tags[:4]
+    TaggedGame.objects.bulk_create(
+        [TaggedGame(game=game, tag=tag)
+         for game in games
+         for tag in common + rng.sample(tags[4:], TAGS_PER_GAME - len(common))])
+
+    return user, [tag.id for tag in tags]
+
+
+def main():
+    # pylint: disable=import-outside-toplevel
+    from django.db.models import Count
+    from troveapi.models import Game, TaggedGame
+
+    with test_database():
+        user, tag_ids = seed()
+        base = Game.objects.filter(user=user)
+
+        def chained(ids):
+            return list(base.tagged(ids).values_list('id', flat=True))
+
+        def grouped(ids):
+            links = TaggedGame.objects.filter(tag_id__in=ids).values('game').annotate(
+                matched=Count('tag', distinct=True)).filter(matched=len(ids))
+            return list(base.filter(pk__in=links.values('game')).values_list('id', flat=True))
+
+        def any_tag(ids):
+            return list(base.tagged(ids, match_all=False).values_list('id', flat=True))
+
+        rows = []
+        for count in (1, 2, 3, 4, 5, 6, 8):
+            ids = tag_ids[:count]
+            assert sorted(chained(ids)) == sorted(grouped(ids))
+            rows.append((
+                count,
+                f'{timed(lambda: chained(ids)):.2f}',
+                f'{timed(lambda: grouped(ids)):.2f}',
+                f'{timed(lambda: any_tag(ids)):.2f}',
+            ))
+
+        print(f'{GAMES} games, {TAGS_PER_GAME} of {TAGS} tags each, median ms\n')
+        print_table(('tags', 'chained all', 'grouped all', 'any'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'trove.settings')
+# read by trove.database, which closes connections after each request
+os.environ.setdefault('TROVE_SERVER', 'asgi')
 
 application = get_asgi_application()
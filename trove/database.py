@@ -0,0 +1,157 @@
+"""Database connection settings
+
+DATABASE_URL picks the primary database and REPLICA_DATABASE_URL the read
+replica, e.g. postgres://trove:secret@db:5432/trove. Without them both
+aliases use the SQLite file next to manage.py.
+
+SQLite lets one writer in at a time, and with its defaults a burst of
+concurrent requests ends in "database is locked" errors. Every SQLite
+connection is tuned as it opens:
+
+- journal_mode=WAL lets readers carry on while a writer commits
+- synchronous=NORMAL syncs at checkpoints only, which is safe in WAL mode
+- busy_timeout makes a blocked writer wait for the lock instead of failing
+- mmap_size and cache_size keep hot pages in memory
+
+Under WSGI, connections are kept open between requests (CONN_MAX_AGE) so
+the pragmas and the page cache are not rebuilt for every request. Under
+ASGI, which trove/asgi.py announces with TROVE_SERVER=asgi, they are
+closed after each request as Django advises: its sync code runs on
+changing threads there, and each would keep a connection of its own.
+TROVE_DB_CONN_MAX_AGE overrides either default. PostgreSQL connections
+come from a pool on Django 5.1 and later, and follow CONN_MAX_AGE on
+older versions or with TROVE_DB_POOL=0.
+"""
+import copy
+import os
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import django
+from django.db.backends.signals import connection_created
+
+REPLICA = 'replica'
+
+ASGI = os.environ.get('TROVE_SERVER') == 'asgi'
+CONN_MAX_AGE = int(os.environ.get('TROVE_DB_CONN_MAX_AGE', 0 if ASGI else 600))
+# seconds a connection waits for a lock held by another one
+TIMEOUT = float(os.environ.get('TROVE_DB_TIMEOUT', 20))
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(TIMEOUT * 1000),
+    'mmap_size': int(os.environ.get('TROVE_DB_MMAP_SIZE', 256 * 1024 * 1024)),
+    # negative sizes are in KiB rather than pages
+    'cache_size': -int(os.environ.get('TROVE_DB_CACHE_KIB', 64 * 1024)),
+    'temp_store': 'MEMORY',
+}
+
+# pooling needs psycopg 3 with psycopg_pool, TROVE_DB_POOL=0 turns it off
+POOL = os.environ.get('TROVE_DB_POOL', '1') == '1'
+POOL_MIN_SIZE = int(os.environ.get('TROVE_DB_POOL_MIN_SIZE', 2))
+POOL_MAX_SIZE = int(os.environ.get('TROVE_DB_POOL_MAX_SIZE', 20))
+
+
+def sqlite_database(name, pragmas=None, conn_max_age=CONN_MAX_AGE, timeout=TIMEOUT):
+    """DATABASES entry of a tuned SQLite database
+
+    pragmas defaults to SQLITE_PRAGMAS; pass an empty dict for SQLite's
+    own defaults.
+    """
+    options = {'timeout': timeout}
+    if django.VERSION >= (5, 1):
+        # take the write lock at BEGIN: a transaction that reads and then
+        # writes cannot wait out a busy lock, SQLite fails it at once
+        options['transaction_mode'] = 'IMMEDIATE'
+
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': conn_max_age != 0,
+        'OPTIONS': options,
+        'PRAGMAS': dict(SQLITE_PRAGMAS if pragmas is None else pragmas),
+    }
+
+
+def postgres_database(name, user='', password='', host='', port='', options=None):
+    """DATABASES entry of a PostgreSQL database with pooled connections"""
+    options = dict(options or {})
+    conn_max_age = CONN_MAX_AGE
+    if POOL and django.VERSION >= (5, 1):
+        # a pool hands connections between requests, so Django must not
+        # also hold on to one per thread
+        options.setdefault('pool', {'min_size': POOL_MIN_SIZE, 'max_size': POOL_MAX_SIZE,
+                                    'timeout': TIMEOUT})
+        conn_max_age = 0
+
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': name,
+        'USER': user,
+        'PASSWORD': password,
+        'HOST': host,
+        'PORT': port,
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': conn_max_age != 0,
+        'OPTIONS': options,
+    }
+
+
+def database_from_url(url):
+    """DATABASES entry of a sqlite:// or postgres:// URL
+
+    Query string parameters of a PostgreSQL URL, e.g. ?sslmode=require, are
+    passed on as connection options. sqlite:///db.sqlite3 is a path
+    relative to the working directory and sqlite:////srv/db.sqlite3 an
+    absolute one.
+
+    Raises:
+        ValueError -- if the URL's scheme is not a supported database
+    """
+    parts = urlsplit(url)
+    if parts.scheme == 'sqlite':
+        return sqlite_database(unquote(parts.path[1:]) or ':memory:')
+
+    if parts.scheme in ('postgres', 'postgresql', 'pgsql'):
+        return postgres_database(
+            unquote(parts.path[1:]),
+            user=unquote(parts.username or ''),
+            password=unquote(parts.password or ''),
+            host=unquote(parts.hostname or ''),
+            port=str(parts.port or ''),
+            options=dict(parse_qsl(parts.query)))
+
+    raise ValueError(f'Unsupported database URL scheme {parts.scheme!r}')
+
+
+def databases_from_env(default_sqlite_path):
+    """DATABASES setting with a primary and a read replica alias
+
+    The replica is the primary itself unless REPLICA_DATABASE_URL names
+    another database. Tests never create it: its test database mirrors the
+    primary's.
+    """
+    primary_url = os.environ.get('DATABASE_URL')
+    primary = (database_from_url(primary_url) if primary_url else
+               sqlite_database(default_sqlite_path))
+
+    replica_url = os.environ.get('REPLICA_DATABASE_URL')
+    replica = database_from_url(replica_url) if replica_url else copy.deepcopy(primary)
+    replica['TEST'] = {'MIRROR': 'default'}
+
+    return {'default': primary, REPLICA: replica}
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Run the PRAGMAS of a database's settings on each new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+
+    pragmas = connection.settings_dict.get('PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+connection_created.connect(apply_pragmas, dispatch_uid='trove.database.apply_pragmas')
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 from pathlib import Path
 import os
 
+from trove.database import databases_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -49,12 +51,56 @@ INSTALLED_APPS = [
 # THIS IS NEW
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'troveapi.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # encodes with orjson when it is installed, see troveapi.renderers
+    'DEFAULT_RENDERER_CLASSES': [
+        'troveapi.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Seconds and number of tokens each process trusts without a query
+TROVE_TOKEN_CACHE_TTL = int(os.environ.get('TROVE_TOKEN_CACHE_TTL', 60))
+TROVE_TOKEN_CACHE_SIZE = int(os.environ.get('TROVE_TOKEN_CACHE_SIZE', 1024))
+
+# Pub/sub behind the recommendation event streams, InProcessBroker only
+# reaches streams served by the publishing process
+TROVE_EVENT_BROKER = os.environ.get('TROVE_EVENT_BROKER', 'troveapi.events.InProcessBroker')
+
+# Default page size of cursor paginated media lists, ?pageSize= overrides it
+TROVE_PAGE_SIZE = int(os.environ.get('TROVE_PAGE_SIZE', 50))
+
+# Tags every new user is seeded with by POST /tags/seed
+TROVE_DEFAULT_TAGS = [
+    "Action", "Adventure", "Comedy", "Drama", "Mystery",
+    "Fantasy", "Historical", "Horror", "Romance", "Science Fiction", "Thriller",
+    "Western", "Platformer", "Shooter", "Survival", "RPG",
+    "Strategy", "Esports", "Casual", "Educational", "Open world"
+]
+
+# Cached responses live in process memory unless TROVE_CACHE_DIR names a
+# directory every worker process can share
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'trove',
+    }
 }
+if os.environ.get('TROVE_CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['TROVE_CACHE_DIR'],
+    }
+
+# Bytes of rendered media and tag lists each process keeps in memory
+TROVE_LIST_CACHE_BYTES = int(os.environ.get('TROVE_LIST_CACHE_BYTES', 32 * 1024 * 1024))
+
+# Seconds browsers may reuse the platform and streaming service lists
+TROVE_REFERENCE_MAX_AGE = int(os.environ.get('TROVE_REFERENCE_MAX_AGE', 600))
 
 # THIS IS NEW
 CORS_ORIGIN_WHITELIST = (
@@ -101,12 +147,14 @@ WSGI_APPLICATION = 'trove.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# DATABASE_URL and REPLICA_DATABASE_URL, or a tuned SQLite file for both
+# aliases, see trove/database.py
+DATABASES = databases_from_env(BASE_DIR / 'db.sqlite3')
+
+# Reads of list and retrieve requests go to the replica, except for users
+# who wrote within the last TROVE_READ_YOUR_WRITES seconds
+DATABASE_ROUTERS = ['troveapi.routers.ReplicaRouter']
+TROVE_READ_YOUR_WRITES = int(os.environ.get('TROVE_READ_YOUR_WRITES', 5))
 
 
 # Password validation
@@ -18,10 +18,15 @@ from django.contrib import admin
 from django.urls import path
 from rest_framework import routers
 from troveapi.views import (AuthorView, BookRecommendationView, BookView,
-                            GameRecommendationView, GameView, PlatformView,
+                            CacheStatsView, GameRecommendationView, GameView,
+                            PlatformView, RecommendationView, SearchView,
                             ShowRecommendationView, ShowView,
-                            StreamingServiceView, TagView, UserView,
-                            login_user, register_user)
+                            StreamingServiceView, TagView, TroveView,
+                            UserView, async_get, book_list, book_notify,
+                            game_list, game_notify, login_user,
+                            recommendation_events,
+                            recommendation_events_ticket, register_user,
+                            show_list, show_notify, tag_list, unread)
 
 router = routers.DefaultRouter(trailing_slash=False)
 router.register(r'games', GameView, 'game')
@@ -34,13 +39,36 @@ router.register(r'authors', AuthorView, 'author')
 router.register(r'bookRecommendations', BookRecommendationView, 'bookRecommendation')
 router.register(r'showRecommendations', ShowRecommendationView, 'showRecommendation')
 router.register(r'gameRecommendations', GameRecommendationView, 'gameRecommendation')
+router.register(r'recommendations', RecommendationView, 'recommendation')
 router.register(r'streamingServices', StreamingServiceView, 'streaming service')
+router.register(r'search', SearchView, 'search')
+router.register(r'trove', TroveView, 'trove')
+router.register(r'cacheStats', CacheStatsView, 'cacheStats')
 
+# the hot reads are async views, other methods on their URLs go to the ViewSets
+LIST = {'get': 'list', 'post': 'create'}
+async_urlpatterns = [
+    path('games', async_get(game_list, GameView, LIST, 'game')),
+    path('books', async_get(book_list, BookView, LIST, 'book')),
+    path('shows', async_get(show_list, ShowView, LIST, 'show')),
+    path('tags', async_get(tag_list, TagView, LIST, 'tag')),
+    path('bookRecommendations/notify', async_get(
+        book_notify, BookRecommendationView, {'get': 'notify'}, 'bookRecommendation')),
+    path('gameRecommendations/notify', async_get(
+        game_notify, GameRecommendationView, {'get': 'notify'}, 'gameRecommendation')),
+    path('showRecommendations/notify', async_get(
+        show_notify, ShowRecommendationView, {'get': 'notify'}, 'showRecommendation')),
+    path('recommendations/unread', async_get(
+        unread, RecommendationView, {'get': 'unread'}, 'recommendation')),
+]
 
 urlpatterns = [
     path('register', register_user),
     path('login', login_user),
+    path('recommendations/events', recommendation_events),
+    path('recommendations/events/ticket', recommendation_events_ticket),
     path('api-auth', include('rest_framework.urls', namespace='rest_framework')),
     path('admin/', admin.site.urls),
+    *async_urlpatterns,
     path('', include(router.urls)),
 ]
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TroveapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'troveapi'
+
+    def ready(self):
+        # pylint: disable=import-outside-toplevel,unused-import
+        from troveapi import signals
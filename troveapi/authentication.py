@@ -0,0 +1,118 @@
+"""Token authentication that remembers recently seen tokens"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (TokenAuthentication,
+                                           get_authorization_header)
+
+# seconds a token stays trusted without a query, which bounds how long
+# another process can miss a change to it
+TOKEN_CACHE_TTL = getattr(settings, 'TROVE_TOKEN_CACHE_TTL', 60)
+TOKEN_CACHE_SIZE = getattr(settings, 'TROVE_TOKEN_CACHE_SIZE', 1024)
+
+
+class TokenCache:
+    """Least recently used token to (user, token) pairs that expire"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            expires, user, token = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+
+        # each request gets its own instances to change
+        user = copy.copy(user)
+        token = copy.copy(token)
+        token.user = user
+        return user, token
+
+    def set(self, key, user, token):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, user, token)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def forget(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def forget_user(self, user_id):
+        with self.lock:
+            for key in [key for key, (_, user, _) in self.entries.items()
+                        if user.pk == user_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the token and user query for tokens
+    seen in the last TOKEN_CACHE_TTL seconds
+
+    Entries are dropped when their token is deleted or their user changes,
+    see troveapi.signals.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, copy.copy(user), copy.copy(token))
+        return user, token
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views, which looks tokens missing from
+        the cache up with the async ORM
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError as ex:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.')) from ex
+
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+
+        model = self.get_model()
+        try:
+            token = await model.objects.select_related('user').aget(key=key)
+        except model.DoesNotExist as ex:
+            raise exceptions.AuthenticationFailed(_('Invalid token.')) from ex
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        token_cache.set(key, copy.copy(token.user), copy.copy(token))
+        return token.user, token
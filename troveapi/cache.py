@@ -0,0 +1,460 @@
+"""Caching of API responses
+
+Responses are kept in the default Django cache, which is process local
+memory unless TROVE_CACHE_DIR points every worker at a shared directory,
+and in list_cache. Both are keyed by versions of the data that include
+the generations stored in the database, so a write in one process is seen
+by every other one.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from typing import NamedTuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (CharField, Count, F, Max, OuterRef, Subquery,
+                              Value)
+from django.db.models.functions import Cast, Coalesce
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from troveapi.models import Generation
+from troveapi.renderers import (CHUNK_SIZE, arender_array, json_renderer,
+                                render_array)
+
+# seconds browsers may reuse a reference table without asking again, and
+# the cache keeps its rows at most
+REFERENCE_MAX_AGE = getattr(settings, 'TROVE_REFERENCE_MAX_AGE', 600)
+
+# seconds each process trusts everyone's generation for reference lists
+# before reading it again, so repeated requests cost no query
+REFERENCE_GENERATION_TTL = getattr(settings, 'TROVE_REFERENCE_GENERATION_TTL', 5)
+
+# bytes of rendered list responses kept by each process
+LIST_CACHE_BYTES = getattr(settings, 'TROVE_LIST_CACHE_BYTES', 32 * 1024 * 1024)
+
+# rows in a user's collection above which its unpaged lists are streamed
+# instead of kept in list_cache
+STREAM_ROWS = getattr(settings, 'TROVE_STREAM_ROWS', 2000)
+
+# generation shared by every user, bumped when platforms or services change
+EVERYONE = 'all'
+
+
+def reference_key(model, generation):
+    """Cache key of the serialized rows of a reference table, as of
+    everyone's generation
+    """
+    return f'trove:reference:{model._meta.model_name}:{generation}'
+
+
+def make_etag(data):
+    """Strong ETag of JSON serializable response data"""
+    digest = hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    """Whether the client's If-None-Match already names etag"""
+    etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    return '*' in etags or etag in etags
+
+
+class TimedGeneration:
+    """Everyone's generation as this process last read it, trusted for ttl
+    seconds
+
+    A change made by another process is seen within ttl seconds, one made
+    by this process at once, as bump_generation forgets the value.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.forget()
+
+    def get(self):
+        now = time.monotonic()
+        if now >= self.expires:
+            self.value, self.expires = generations(EVERYONE)[1], now + self.ttl
+        return self.value
+
+    def forget(self):
+        self.value, self.expires = None, 0
+
+
+reference_generation = TimedGeneration(REFERENCE_GENERATION_TTL)
+
+
+def reference_list(request, model, serializer_class):
+    """List every row of a nearly static table like Platform
+
+    The serialized rows and their ETag are cached until a row is saved or
+    deleted, which moves everyone's generation on. Clients that send the ETag back in
+    If-None-Match get an empty 304. Everyone's generation is read at most
+    every REFERENCE_GENERATION_TTL seconds, so most requests cost no query.
+
+    Returns:
+        Response -- JSON serialized list of rows, or 304 Not Modified
+    """
+    # changes to the table bump everyone's generation, see troveapi.signals
+    key = reference_key(model, reference_generation.get())
+    cached = cache.get(key)
+    if cached is None:
+        data = [dict(row) for row in serializer_class(model.objects.all(), many=True).data]
+        cached = (make_etag(data), data)
+        cache.set(key, cached, REFERENCE_MAX_AGE)
+
+    etag, data = cached
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=REFERENCE_MAX_AGE)
+    return response
+
+
+def bump_generation(user_id=EVERYONE):
+    """Mark a user's media as changed in a way last_modified does not show,
+    like a renamed tag or a deleted game
+    """
+    Generation.objects.bulk_create(
+        [Generation(scope=str(user_id), value=time.time_ns())],
+        update_conflicts=True, unique_fields=['scope'], update_fields=['value'])
+    if str(user_id) == EVERYONE:
+        transaction.on_commit(reference_generation.forget)
+
+
+def generation_scopes(user_id):
+    return [str(user_id), EVERYONE]
+
+
+def generations(user_id):
+    """The (user, everyone) generations, nanosecond times of the last bumps,
+    or 0 if there was none
+    """
+    found = dict(Generation.objects.filter(
+        scope__in=generation_scopes(user_id)).values_list('scope', 'value'))
+    return found.get(str(user_id), 0), found.get(EVERYONE, 0)
+
+
+async def agenerations(user_id):
+    """generations for async views"""
+    found = {scope: value async for scope, value in Generation.objects.filter(
+        scope__in=generation_scopes(user_id)).values_list('scope', 'value')}
+    return found.get(str(user_id), 0), found.get(EVERYONE, 0)
+
+
+def generation_subqueries(scope):
+    """user_generation and everyone_generation as subqueries, to read them
+    in the same query as the data they version
+
+    scope is the user's id as a string, or an expression of it.
+    """
+    def generation(scope):
+        return Coalesce(Subquery(Generation.objects.filter(scope=scope).values('value')), 0)
+
+    return {'user_generation': generation(scope), 'everyone_generation': generation(EVERYONE)}
+
+
+class Version(NamedTuple):
+    """Validators of a response, and the key of the data they cover"""
+    etag: str
+    last_modified: datetime
+    key: tuple
+
+
+def user_version(request, user_id, latest=None, count=0, user_generations=None):
+    """Version of data owned by user_id, from its newest last_modified and
+    its row count if it has them, and the generations, read unless given
+
+    The ETag also covers the query string and Accept header, so each
+    filtered list or page of a collection has its own.
+    """
+    if user_generations is None:
+        user_generations = generations(user_id)
+    user_generation, everyone_generation = user_generations
+    changed = datetime.fromtimestamp(
+        max(user_generation, everyone_generation) / 1e9, tz=timezone.utc)
+
+    key = (user_id, latest.isoformat() if latest else '', count,
+           user_generation, everyone_generation)
+    parts = [*key, request.get_full_path(), request.META.get('HTTP_ACCEPT', '')]
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode())
+
+    return Version(f'"{digest.hexdigest()}"', max(latest, changed) if latest else changed, key)
+
+
+async def auser_version(request, user_id, latest=None, count=0):
+    """user_version for async views"""
+    return user_version(request, user_id, latest, count, await agenerations(user_id))
+
+
+def collection_summary(model, user):
+    """Query of the newest last_modified and the row count of a user's
+    collection of a media model, and the user's generations
+    """
+    rows = model.objects.filter(user=user).order_by().values('user')
+    return User.objects.filter(pk=user.id).values(
+        latest=Subquery(rows.annotate(latest=Max('last_modified')).values('latest')),
+        count=Coalesce(Subquery(rows.annotate(count=Count('pk')).values('count')), 0),
+        **generation_subqueries(str(user.id)))
+
+
+def summary_version(request, user_id, summary):
+    return user_version(request, user_id, summary['latest'], summary['count'],
+                        (summary['user_generation'], summary['everyone_generation']))
+
+
+def collection_version(request, model, user):
+    """Version of a user's whole collection of a media model, in one query"""
+    return summary_version(request, user.id, collection_summary(model, user).get())
+
+
+async def acollection_version(request, model, user):
+    """collection_version for async views"""
+    return summary_version(request, user.id, await collection_summary(model, user).aget())
+
+
+def row_version(request, model, pk):
+    """Version of one media row, or None if it does not exist"""
+    try:
+        row = model.objects.filter(pk=pk).values(
+            'user_id', latest=F('last_modified'), count=Value(1),
+            **generation_subqueries(Cast(OuterRef('user_id'), CharField()))).first()
+    except (TypeError, ValueError):
+        return None
+    if row is None:
+        return None
+
+    return summary_version(request, row['user_id'], row)
+
+
+def last_modified_seconds(version):
+    """Last-Modified of a version in whole seconds, or None while writes in
+    the same second may still follow
+
+    HTTP dates have no fractions of a second, so a client that got the
+    version in the second it changed could not tell it from a later write
+    in that second by If-Modified-Since. It revalidates by ETag instead.
+    """
+    seconds = int(version.last_modified.timestamp())
+    return seconds if seconds < int(time.time()) else None
+
+
+def not_modified(request, version):
+    """304 response if the client already has this version, otherwise None"""
+    if version is None:
+        return None
+
+    response = get_conditional_response(
+        request, etag=version.etag, last_modified=last_modified_seconds(version))
+    return response and add_validators(response, version)
+
+
+def add_validators(response, version):
+    """Let the client revalidate its copy of a response with a conditional GET"""
+    response['ETag'] = version.etag
+    seconds = last_modified_seconds(version)
+    if seconds is not None:
+        response['Last-Modified'] = http_date(seconds)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class ResponseCache:
+    """Least recently used rendered responses of one process, capped by size
+
+    Keys carry the version of the data, so entries never go stale; writes
+    move the version on and the old entries age out.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def set(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+
+            self.entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRate': self.hits / lookups if lookups else None
+            }
+
+
+list_cache = ResponseCache(LIST_CACHE_BYTES)
+
+
+def normalized_params(request):
+    """Query parameters as a hashable key, independent of their order"""
+    return tuple(sorted((name, tuple(sorted(values)))
+                        for name, values in request.query_params.lists()))
+
+
+def rendered_response(request, body):
+    """Response of cached JSON, passed through as is when JSON was asked for"""
+    if isinstance(request.accepted_renderer, JSONRenderer):
+        return HttpResponse(body, content_type=request.accepted_renderer.media_type)
+
+    return Response(json.loads(body))
+
+
+def cached_lookup(request, name, version):
+    """Look a list response up by the version of its data
+
+    Returns:
+        tuple -- list_cache key of the response, and a 304 or the cached
+        response, or None if the list has to be built
+    """
+    unchanged = not_modified(request, version)
+    if unchanged:
+        return None, unchanged
+
+    # the host is part of the next links of paged lists
+    key = (name, version.key, request.get_host(), normalized_params(request))
+    body = list_cache.get(key)
+    if body is None:
+        return key, None
+
+    response = rendered_response(request, body)
+    response['X-Cache'] = 'HIT'
+    return key, add_validators(response, version)
+
+
+def cache_response(request, key, version, response):
+    """Keep a freshly built list response in list_cache"""
+    if response.status_code == status.HTTP_200_OK:
+        body = json_renderer().render(response.data)
+        list_cache.set(key, body)
+        response = rendered_response(request, body)
+    response['X-Cache'] = 'MISS'
+    return add_validators(response, version)
+
+
+def streams_list(request, version):
+    """Whether to stream an unpaged list rather than render and cache it
+    whole: the collection has more than STREAM_ROWS rows, and compact JSON
+    was asked for
+    """
+    # pylint: disable=import-outside-toplevel
+    from troveapi.views.pagination import KeysetPagination
+
+    renderer = request.accepted_renderer
+    return (version.key[2] > STREAM_ROWS and isinstance(renderer, JSONRenderer) and
+            renderer.compact and renderer.get_indent(request.accepted_media_type, {}) is None and
+            not KeysetPagination().is_requested(request))
+
+
+def streamed_response(request, version, body):
+    response = StreamingHttpResponse(body, content_type=request.accepted_renderer.media_type)
+    response['X-Cache'] = 'BYPASS'
+    return add_validators(response, version)
+
+
+def streamed_list(request, version, rows, row_data):
+    """Response streaming the rows of a list queryset, CHUNK_SIZE at a time
+
+    Each chunk is read with its own prefetch queries, so memory stays flat
+    however long the list is. The body is not kept in list_cache.
+    """
+    # the body is read after the view returns and resets read_alias
+    rows = rows.using(rows.db).iterator(chunk_size=CHUNK_SIZE)
+    return streamed_response(request, version, render_array(
+        request.accepted_renderer, (row_data(row) for row in rows)))
+
+
+def astreamed_list(request, version, rows, row_data):
+    """streamed_list read with the async ORM, for async views under ASGI"""
+    async def body():
+        async for row in rows.using(rows.db).aiterator(chunk_size=CHUNK_SIZE):
+            yield row_data(row)
+
+    return streamed_response(request, version, arender_array(request.accepted_renderer, body()))
+
+
+def cached_list(model=None, rows=None, row_data=None):
+    """Decorate a list action to answer from the version of the user's data
+
+    Conditional GETs of an unchanged version get a 304. Otherwise the
+    rendered response is kept in list_cache under the version and the
+    normalized query parameters, and the X-Cache header says whether it came
+    from there. Data without last_modified, like tags, is versioned by the
+    user's generation alone, so its writes have to bump it.
+
+    With rows, a function of the request returning the list's queryset, and
+    row_data, long lists are streamed instead, see streams_list.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            if model is None:
+                version = user_version(request, request.auth.user.id)
+            else:
+                version = collection_version(request, model, request.auth.user)
+
+            if rows is not None and streams_list(request, version):
+                return not_modified(request, version) or streamed_list(
+                    request, version, rows(request), row_data)
+
+            key, response = cached_lookup(request, view.__qualname__, version)
+            if response is not None:
+                return response
+
+            return cache_response(request, key, version, view(self, request, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,103 @@
+"""Publish and subscribe to events about a user, e.g. new recommendations
+
+Publishers call publish() from ordinary sync code. Subscribers are async
+and wait on subscribe(). The broker behind them is the class named by the
+TROVE_EVENT_BROKER setting. The default, InProcessBroker, only reaches
+subscribers in the publishing process. A broker shared by several processes
+has to provide the same publish and subscribe methods.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# events a slow subscriber may fall behind by before new ones are dropped
+QUEUE_SIZE = 100
+
+
+class InProcessBroker:
+    """Fan events out to the subscribers of a channel in this process"""
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def publish(self, channel, event):
+        with self.lock:
+            subscribers = list(self.subscribers.get(channel, ()))
+
+        for loop, queue in subscribers:
+            # publishers run on other threads than the subscribers' event loops
+            loop.call_soon_threadsafe(self.deliver, queue, event)
+
+    @staticmethod
+    def deliver(queue, event):
+        if not queue.full():
+            queue.put_nowait(event)
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        """Queue of the events published on channel while the context is open"""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(QUEUE_SIZE))
+        with self.lock:
+            self.subscribers[channel].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self.lock:
+                self.subscribers[channel].discard(subscriber)
+                if not self.subscribers[channel]:
+                    del self.subscribers[channel]
+
+
+_broker = None
+
+
+def get_broker():
+    """The broker named by TROVE_EVENT_BROKER, created on first use"""
+    global _broker
+    if _broker is None:
+        broker_class = import_string(
+            getattr(settings, 'TROVE_EVENT_BROKER', 'troveapi.events.InProcessBroker'))
+        _broker = broker_class()
+    return _broker
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def publish(user_id, events):
+    """Send events to a user's subscribers once the current transaction commits"""
+    events = list(events)
+    if not events:
+        return
+
+    def send():
+        broker = get_broker()
+        for event in events:
+            broker.publish(user_channel(user_id), event)
+
+    transaction.on_commit(send)
+
+
+def subscribe(user_id):
+    """Async context manager around a queue of a user's events"""
+    return get_broker().subscribe(user_channel(user_id))
+
+
+def recommendation_event(recommendation):
+    """Event telling a recipient about a new book, game or show recommendation"""
+    media_field = recommendation._meta.model_name[:-len('recommendation')]
+    media = getattr(recommendation, media_field)
+    return {
+        'type': f'{media_field}Recommendation',
+        'id': recommendation.pk,
+        media_field: {'id': media.pk, 'name': media.name},
+        'sender': {'id': recommendation.sender.pk, 'username': recommendation.sender.username},
+        'message': recommendation.message
+    }
@@ -0,0 +1,29 @@
+"""Write a user's whole trove to a file or stdout"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from troveapi.transfer import FORMATS, export_records
+
+
+class Command(BaseCommand):
+    help = "Export a user's tags, games, books, shows and recommendations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--output', help='File to write to instead of stdout')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist as ex:
+            raise CommandError(f"No user named {options['username']}") from ex
+
+        writer, _, _ = FORMATS[options['format']]
+        chunks = writer(export_records(user))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,31 @@
+"""Add an exported trove to a user's trove"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from troveapi.transfer import FORMATS, TroveImporter
+
+
+class Command(BaseCommand):
+    help = 'Import a file written by export_trove into a user\'s trove'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('file')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Defaults to the extension of the file')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist as ex:
+            raise CommandError(f"No user named {options['username']}") from ex
+
+        file_format = options['format'] or options['file'].rsplit('.', 1)[-1].lower()
+        if file_format not in FORMATS:
+            raise CommandError(f'Unknown format {file_format}, pass --format')
+
+        _, reader, _ = FORMATS[file_format]
+        with open(options['file'], encoding='utf-8', newline='') as lines:
+            counts = TroveImporter(user).run(reader(lines))
+
+        for record_type, count in sorted(counts.items()):
+            self.stdout.write(f'{record_type}: {count}')
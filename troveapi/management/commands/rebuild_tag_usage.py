@@ -0,0 +1,57 @@
+"""Recount the stored tag usage counters from the through tables"""
+from django.core.management.base import BaseCommand, CommandError
+from troveapi.models import Tag, TagUsage
+from troveapi.models.tag_usage import USAGE_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the TagUsage counters, or with --verify only check them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Report tags whose stored counters are wrong without fixing them')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of tags recounted per query')
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            self.verify(options['batch_size'])
+        else:
+            self.rebuild(options['batch_size'])
+
+    def tag_batches(self, batch_size):
+        tag_ids = list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(tag_ids), batch_size):
+            yield tag_ids[start:start + batch_size]
+
+    def rebuild(self, batch_size):
+        TagUsage.objects.create_missing()
+
+        rebuilt = 0
+        for batch in self.tag_batches(batch_size):
+            TagUsage.objects.refresh(batch)
+            rebuilt += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt usage of {rebuilt} tags'))
+
+    def verify(self, batch_size):
+        stale = 0
+        for batch in self.tag_batches(batch_size):
+            tags = Tag.objects.filter(pk__in=batch)
+            stored = {row.pop('pk'): row
+                      for row in tags.with_usage().values('pk', *USAGE_FIELDS)}
+            counted = {row.pop('pk'): row
+                       for row in tags.with_counted_usage().values('pk', *USAGE_FIELDS)}
+
+            for pk, counts in counted.items():
+                if stored.get(pk) != counts:
+                    stale += 1
+                    self.stdout.write(f'Tag {pk}: stored {stored.get(pk)}, counted {counts}')
+
+        if stale:
+            raise CommandError(
+                f'{stale} tags have stale usage counters, run rebuild_tag_usage to fix them')
+
+        self.stdout.write(self.style.SUCCESS('Tag usage counters are up to date'))
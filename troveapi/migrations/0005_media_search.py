@@ -0,0 +1,38 @@
+from django.db import migrations
+
+from troveapi import search
+
+
+def create_search_index(apps, schema_editor):
+    backend = search.get_backend(schema_editor.connection)
+    if backend is None:
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        backend.create(cursor)
+
+        for media_type in search.MEDIA_TYPES:
+            model = apps.get_model('troveapi', media_type)
+            rows = model.objects.values_list('pk', 'user_id', 'name')
+            backend.index(cursor, [(media_type, pk, user_id, name)
+                                   for pk, user_id, name in rows.iterator()])
+
+
+def drop_search_index(apps, schema_editor):
+    backend = search.get_backend(schema_editor.connection)
+    if backend is None:
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        backend.drop(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('troveapi', '0004_alter_book_author'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_tag_usage(apps, schema_editor):
+    Tag = apps.get_model('troveapi', 'Tag')
+    TagUsage = apps.get_model('troveapi', 'TagUsage')
+
+    usage = {pk: {} for pk in Tag.objects.values_list('pk', flat=True)}
+    for media_field in ('book', 'game', 'show'):
+        through = apps.get_model('troveapi', f'tagged{media_field}')
+        counts = through.objects.values('tag', f'{media_field}__current').annotate(
+            used=Count('pk'))
+        for row in counts:
+            state = 'current' if row[f'{media_field}__current'] else 'queued'
+            usage[row['tag']][f'{state}_{media_field}s'] = row['used']
+
+    TagUsage.objects.bulk_create(
+        [TagUsage(tag_id=tag_id, **counts) for tag_id, counts in usage.items()],
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('troveapi', '0005_media_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagUsage',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='troveapi.tag')),
+                ('current_books', models.PositiveIntegerField(default=0)),
+                ('queued_books', models.PositiveIntegerField(default=0)),
+                ('current_games', models.PositiveIntegerField(default=0)),
+                ('queued_games', models.PositiveIntegerField(default=0)),
+                ('current_shows', models.PositiveIntegerField(default=0)),
+                ('queued_shows', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_tag_usage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('troveapi', '0006_tag_usage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookrecommendation',
+            index=models.Index(condition=models.Q(('read', False)), fields=['recipient'], name='bookreco_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamerecommendation',
+            index=models.Index(condition=models.Q(('read', False)), fields=['recipient'], name='gamereco_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showrecommendation',
+            index=models.Index(condition=models.Q(('read', False)), fields=['recipient'], name='showreco_unread_idx'),
+        ),
+    ]
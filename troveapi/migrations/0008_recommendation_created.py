@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:31
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('troveapi', '0007_recommendation_unread_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookrecommendation',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='gamerecommendation',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='showrecommendation',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='bookrecommendation',
+            index=models.Index(fields=['recipient', '-created', '-id'], name='bookreco_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamerecommendation',
+            index=models.Index(fields=['recipient', '-created', '-id'], name='gamereco_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showrecommendation',
+            index=models.Index(fields=['recipient', '-created', '-id'], name='showreco_inbox_idx'),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# through model, media field and related field of each link table
+LINK_TABLES = (
+    ('gameplatform', 'game', 'platform'),
+    ('taggedbook', 'book', 'tag'),
+    ('taggedgame', 'game', 'tag'),
+    ('taggedshow', 'show', 'tag'),
+)
+
+
+def recount_tag_usage(apps, tag_ids):
+    TagUsage = apps.get_model('troveapi', 'TagUsage')
+
+    counts = {}
+    for media_field in ('book', 'game', 'show'):
+        through = apps.get_model('troveapi', f'tagged{media_field}')
+        for state, current in (('current', True), ('queued', False)):
+            links = through.objects.filter(
+                tag=OuterRef('pk'), **{f'{media_field}__current': current}
+            ).order_by().values('tag').annotate(used=Count('pk')).values('used')
+            counts[f'{state}_{media_field}s'] = Coalesce(Subquery(links), 0)
+
+    TagUsage.objects.filter(tag__in=tag_ids).update(**counts)
+
+
+def remove_duplicate_links(apps, schema_editor):
+    """Keep the oldest of each set of identical links so the unique
+    constraints can be added
+    """
+    tag_ids = set()
+    for model_name, media_field, related_field in LINK_TABLES:
+        through = apps.get_model('troveapi', model_name)
+        kept = through.objects.values(media_field, related_field).annotate(
+            kept=Min('pk')).values('kept')
+        duplicates = through.objects.exclude(pk__in=kept)
+
+        if related_field == 'tag':
+            tag_ids.update(duplicates.values_list('tag', flat=True))
+        duplicates.delete()
+
+    if tag_ids:
+        recount_tag_usage(apps, tag_ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('troveapi', '0008_recommendation_created'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['user', '-last_modified', '-id'], name='book_user_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['user', 'current'], name='book_user_current_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['user', '-last_modified', '-id'], name='game_user_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['user', 'current'], name='game_user_current_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='show',
+            index=models.Index(fields=['user', '-last_modified', '-id'], name='show_user_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='show',
+            index=models.Index(fields=['user', 'current'], name='show_user_current_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'tag'], name='tag_user_tag_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_links, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='gameplatform',
+            constraint=models.UniqueConstraint(fields=('game', 'platform'), name='unique_gameplatform'),
+        ),
+        migrations.AddConstraint(
+            model_name='taggedbook',
+            constraint=models.UniqueConstraint(fields=('book', 'tag'), name='unique_taggedbook'),
+        ),
+        migrations.AddConstraint(
+            model_name='taggedgame',
+            constraint=models.UniqueConstraint(fields=('game', 'tag'), name='unique_taggedgame'),
+        ),
+        migrations.AddConstraint(
+            model_name='taggedshow',
+            constraint=models.UniqueConstraint(fields=('show', 'tag'), name='unique_taggedshow'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:29
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.db.models.functions import Lower
+
+
+def merge_duplicate_authors(apps, schema_editor):
+    """Point the books of authors that differ only by case at the oldest of
+    them and delete the rest, so the unique constraint can be added
+    """
+    Author = apps.get_model('troveapi', 'Author')
+    Book = apps.get_model('troveapi', 'Book')
+
+    groups = Author.objects.annotate(name_lower=Lower('name')).values(
+        'user', 'name_lower').annotate(kept=Min('pk'), authors=Count('pk')).filter(authors__gt=1)
+    for group in groups:
+        duplicates = Author.objects.annotate(name_lower=Lower('name')).filter(
+            user=group['user'], name_lower=group['name_lower']).exclude(pk=group['kept'])
+        Book.objects.filter(author__in=duplicates).update(author=group['kept'])
+        duplicates.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('troveapi', '0009_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_authors, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='author',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), models.F('user'), name='unique_author_name'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+USAGE_FIELDS = ('current_books', 'queued_books', 'current_games',
+                'queued_games', 'current_shows', 'queued_shows')
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    """Move the links of a user's tags with the same name to the oldest of
+    them, recount its usage and delete the rest, so the unique constraint
+    can be added
+    """
+    Tag = apps.get_model('troveapi', 'Tag')
+    TagUsage = apps.get_model('troveapi', 'TagUsage')
+
+    groups = Tag.objects.values('user', 'tag').annotate(
+        kept=Min('pk'), tags=Count('pk')).filter(tags__gt=1)
+    for group in groups:
+        duplicates = Tag.objects.filter(
+            user=group['user'], tag=group['tag']).exclude(pk=group['kept'])
+
+        usage = dict.fromkeys(USAGE_FIELDS, 0)
+        for media_field in ('book', 'game', 'show'):
+            through = apps.get_model('troveapi', f'tagged{media_field}')
+            media_ids = set(through.objects.filter(tag__in=duplicates).values_list(
+                f'{media_field}_id', flat=True))
+            # media already on the kept tag keep their one link
+            through.objects.bulk_create(
+                [through(tag_id=group['kept'], **{f'{media_field}_id': pk}) for pk in media_ids],
+                batch_size=500, ignore_conflicts=True)
+
+            counts = through.objects.filter(tag=group['kept']).values(
+                f'{media_field}__current').annotate(used=Count('pk'))
+            for row in counts:
+                state = 'current' if row[f'{media_field}__current'] else 'queued'
+                usage[f'{state}_{media_field}s'] = row['used']
+
+        TagUsage.objects.update_or_create(tag_id=group['kept'], defaults=usage)
+        duplicates.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('troveapi', '0011_generation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='tag',
+            name='tag_user_tag_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'tag'), name='unique_tag'),
+        ),
+    ]
@@ -7,8 +7,10 @@ from .game.game_platform import GamePlatform
 from .game.game_recommendation import GameRecommendation
 from .game.platform import Platform
 from .game.tagged_game import TaggedGame
+from .generation import Generation
 from .show.show import Show
 from .show.show_recommendation import ShowRecommendation
 from .show.streaming_service import StreamingService
 from .show.tagged_show import TaggedShow
 from .tag import Tag
+from .tag_usage import TagUsage
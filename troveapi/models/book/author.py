@@ -1,6 +1,50 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
+from django.db.models import Value
+from django.db.models.functions import Lower
+
+
+class AuthorQuerySet(models.QuerySet):
+    def named(self, name):
+        """Authors whose name matches name ignoring case, an indexed lookup"""
+        return self.alias(name_lower=Lower('name')).filter(name_lower=Lower(Value(name)))
+
+    def named_any(self, names):
+        """Authors whose name matches any of names ignoring case
+
+        Both sides are lowered by the database, as in the unique
+        constraint, whose LOWER() may fold less than str.lower does.
+        """
+        return self.alias(name_lower=Lower('name')).filter(
+            name_lower__in=[Lower(Value(name)) for name in names])
+
+    def resolve(self, user, name):
+        """Get the user's author with this name ignoring case, or create it
+
+        Returns:
+            tuple -- the author and whether it was created
+        """
+        try:
+            return self.named(name).get(user=user), False
+        except self.model.DoesNotExist:
+            pass
+
+        try:
+            with transaction.atomic():
+                return self.create(user=user, name=name), True
+        except IntegrityError:
+            # another request created it since the lookup above
+            return self.named(name).get(user=user), False
+
 
 class Author(models.Model):
     name = models.CharField(max_length=30)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
\ No newline at end of file
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    objects = AuthorQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # also the index behind AuthorQuerySet.named
+            models.UniqueConstraint(Lower('name'), 'user', name='unique_author_name'),
+        ]
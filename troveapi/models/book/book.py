@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from ..media_queryset import MediaQuerySet
 
 
 class Book(models.Model):
@@ -10,3 +11,13 @@ class Book(models.Model):
     last_modified = models.DateTimeField(auto_now=True)
     tags = models.ManyToManyField(
         "Tag", through="TaggedBook", related_name="bookTags")
+
+    objects = MediaQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # lists, their keyset pages and their version aggregate
+            models.Index(fields=['user', '-last_modified', '-id'],
+                         name='book_user_modified_idx'),
+            models.Index(fields=['user', 'current'], name='book_user_current_idx'),
+        ]
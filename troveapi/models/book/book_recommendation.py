@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
+from ..recommendation_queryset import RecommendationQuerySet
 
 
 class BookRecommendation(models.Model):
@@ -8,3 +10,16 @@ class BookRecommendation(models.Model):
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookRecipient')
     message = models.TextField()
     read = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = RecommendationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # unread counts only ever look at unread rows
+            models.Index(fields=['recipient'], condition=Q(read=False),
+                         name='bookreco_unread_idx'),
+            # the inbox pages through a recipient's rows newest first
+            models.Index(fields=['recipient', '-created', '-id'],
+                         name='bookreco_inbox_idx'),
+        ]
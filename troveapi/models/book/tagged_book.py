@@ -4,3 +4,8 @@ from django.db import models
 class TaggedBook(models.Model):
     book = models.ForeignKey("Book", on_delete=models.CASCADE)
     tag = models.ForeignKey("Tag", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'tag'], name='unique_taggedbook'),
+        ]
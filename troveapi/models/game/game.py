@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from ..media_queryset import MediaQuerySet
 
 
 class Game(models.Model):
@@ -13,3 +14,12 @@ class Game(models.Model):
     tags = models.ManyToManyField(
         "Tag", through="TaggedGame", related_name="gameTags")
 
+    objects = MediaQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # lists, their keyset pages and their version aggregate
+            models.Index(fields=['user', '-last_modified', '-id'],
+                         name='game_user_modified_idx'),
+            models.Index(fields=['user', 'current'], name='game_user_current_idx'),
+        ]
@@ -3,4 +3,9 @@ from django.db import models
 
 class GamePlatform(models.Model):
     game = models.ForeignKey("Game", on_delete=models.CASCADE)
-    platform = models.ForeignKey("Platform", on_delete=models.CASCADE)
\ No newline at end of file
+    platform = models.ForeignKey("Platform", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'platform'], name='unique_gameplatform'),
+        ]
@@ -4,3 +4,8 @@ from django.db import models
 class TaggedGame(models.Model):
     game = models.ForeignKey("Game", on_delete=models.CASCADE)
     tag = models.ForeignKey("Tag", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'tag'], name='unique_taggedgame'),
+        ]
@@ -0,0 +1,14 @@
+from django.db import models
+
+
+class Generation(models.Model):
+    """When a user's data, or everyone's, last changed in a way
+    last_modified does not show, like a renamed tag or a deleted game
+
+    Response versions include the generations, see troveapi.cache. They live
+    in the database so every worker process sees the same ones.
+    """
+    # a user's id, or troveapi.cache.EVERYONE
+    scope = models.CharField(max_length=20, primary_key=True)
+    # nanosecond time of the last change
+    value = models.BigIntegerField()
@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class RecommendationQuerySet(models.QuerySet):
+    """QuerySet shared by book, game and show recommendations"""
+
+    def unread(self, user):
+        """Recommendations user received and has not read yet"""
+        return self.filter(recipient=user, read=False)
+
+    def with_related(self):
+        """Eager load everything a recommendation row serializes
+
+        The media, sender and recipient are joined into the main query and
+        each many to many field of the media (tags, platforms) is fetched in
+        one batched query, so any number of rows costs a fixed number of
+        queries.
+        """
+        opts = self.model._meta
+        media = next(field for field in opts.fields
+                     if field.many_to_one and field.related_model is not User)
+        joined = [field.name for field in opts.fields if field.many_to_one]
+        batched = [f'{media.name}__{field.name}'
+                   for field in media.related_model._meta.many_to_many]
+
+        return self.select_related(*joined).prefetch_related(*batched)
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from ..media_queryset import MediaQuerySet
 
 class Show(models.Model):
     streaming_service= models.ForeignKey("StreamingService", on_delete=models.CASCADE)
@@ -8,4 +9,14 @@ class Show(models.Model):
     current = models.BooleanField()
     last_modified = models.DateTimeField(auto_now=True)
     tags = models.ManyToManyField(
-        "Tag", through="TaggedShow", related_name="showTags")
\ No newline at end of file
+        "Tag", through="TaggedShow", related_name="showTags")
+
+    objects = MediaQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # lists, their keyset pages and their version aggregate
+            models.Index(fields=['user', '-last_modified', '-id'],
+                         name='show_user_modified_idx'),
+            models.Index(fields=['user', 'current'], name='show_user_current_idx'),
+        ]
@@ -4,3 +4,8 @@ from django.db import models
 class TaggedShow(models.Model):
     show = models.ForeignKey("Show", on_delete=models.CASCADE)
     tag = models.ForeignKey("Tag", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['show', 'tag'], name='unique_taggedshow'),
+        ]
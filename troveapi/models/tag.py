@@ -1,15 +1,64 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from .game.tagged_game import TaggedGame
 from .show.tagged_show import TaggedShow
 from .book.tagged_book import TaggedBook
+from .tag_usage import USAGE_FIELDS
+
+# through model of each media type a tag can be used on, keyed by media field
+TAGGED_MEDIA = {
+    'book': TaggedBook,
+    'game': TaggedGame,
+    'show': TaggedShow,
+}
+
+
+def usage_count(media_field, current):
+    """Subquery counting the current or queued media a tag is used on"""
+    links = TAGGED_MEDIA[media_field].objects.filter(
+        tag=OuterRef('pk'), **{f'{media_field}__current': current}
+    ).order_by().values('tag').annotate(used=Count('pk')).values('used')
+
+    return Coalesce(Subquery(links), 0)
+
+
+def counted_usage():
+    """Count subqueries for every usage field, correlated on the tag's pk"""
+    usage = {}
+    for media_field in TAGGED_MEDIA:
+        usage[f'current_{media_field}s'] = usage_count(media_field, True)
+        usage[f'queued_{media_field}s'] = usage_count(media_field, False)
+
+    return usage
+
+
+class TagQuerySet(models.QuerySet):
+
+    def with_usage(self):
+        """Annotate current_books, queued_books, current_games, queued_games,
+        current_shows and queued_shows from the stored TagUsage counters
+        """
+        return self.annotate(**{
+            field: Coalesce(F(f'usage__{field}'), 0) for field in USAGE_FIELDS
+        })
+
+    def with_counted_usage(self):
+        """Annotate the same counts as with_usage, counted from the through
+        tables in the same query as the tags
+        """
+        return self.annotate(**counted_usage())
 
 
 class Tag(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     tag = models.CharField(max_length=40)
 
-    # look into uniqueConstraints?
-
-
+    objects = TagQuerySet.as_manager()
 
+    class Meta:
+        constraints = [
+            # also the index a user's tags are read from sorted by name
+            models.UniqueConstraint(fields=['user', 'tag'], name='unique_tag'),
+        ]
@@ -0,0 +1,73 @@
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+USAGE_FIELDS = ('current_books', 'queued_books', 'current_games',
+                'queued_games', 'current_shows', 'queued_shows')
+
+
+def usage_field(media_field, current):
+    """The counter of current or queued media of a media field like game"""
+    return f"{'current' if current else 'queued'}_{media_field}s"
+
+
+class TagUsageManager(models.Manager):
+
+    def shift(self, tags, **deltas):
+        """Add deltas, like current_games=-1, to the counters of tags, a Tag
+        queryset or list of ids, in a single UPDATE
+
+        The database adds them to the stored values, so writers changing the
+        same counters at once cannot overwrite each other.
+        """
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return 0
+        # a counter that drifted low stops at zero, rebuild_tag_usage fixes it
+        return self.filter(tag__in=tags).update(**{
+            field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()})
+
+    def refresh(self, tags):
+        """Recount the usage of tags, a Tag queryset or list of ids, from the
+        through tables in a single UPDATE
+
+        The usage rows are locked before they are recounted, so the recount
+        waits for transactions shifting the same counters and then sees
+        their links.
+        """
+        # pylint: disable=import-outside-toplevel
+        from .tag import counted_usage
+
+        with transaction.atomic():
+            list(self.select_for_update().filter(tag__in=tags).values_list('pk', flat=True))
+            # a usage row shares its tag's pk, so the tag subqueries correlate as is
+            return self.filter(tag__in=tags).update(**counted_usage())
+
+    def create_missing(self):
+        """Add zeroed usage rows for tags that do not have one yet"""
+        # pylint: disable=import-outside-toplevel
+        from .tag import Tag
+
+        missing = Tag.objects.filter(usage__isnull=True).values_list('pk', flat=True)
+        return self.bulk_create([self.model(tag_id=pk) for pk in missing],
+                                batch_size=500, ignore_conflicts=True)
+
+
+class TagUsage(models.Model):
+    """How many current and queued books, games and shows a tag is on
+
+    Every tag gets a usage row when it is created, and the signal handlers in
+    troveapi.signals shift its counters whenever its links or linked media
+    change, so reading tag activity is a lookup instead of a count over the
+    through tables.
+    """
+    tag = models.OneToOneField("Tag", on_delete=models.CASCADE,
+                               primary_key=True, related_name="usage")
+    current_books = models.PositiveIntegerField(default=0)
+    queued_books = models.PositiveIntegerField(default=0)
+    current_games = models.PositiveIntegerField(default=0)
+    queued_games = models.PositiveIntegerField(default=0)
+    current_shows = models.PositiveIntegerField(default=0)
+    queued_shows = models.PositiveIntegerField(default=0)
+
+    objects = TagUsageManager()
@@ -0,0 +1,95 @@
+"""JSON rendering of API responses
+
+FastJSONRenderer encodes with orjson when it is installed and with DRF's
+JSONRenderer otherwise. Both give the same bytes for strings, integers,
+booleans, None and datetimes, so cached bodies and ETags do not depend on
+which one ran. Floats, like the hit rate of the cache stats, can be
+spelled differently, e.g. orjson writes 1e16 where JSONRenderer writes
+1e+16, and orjson writes NaN and infinity as null where JSONRenderer
+refuses them.
+
+Lists too long to keep in list_cache are streamed instead, see
+render_array.
+"""
+from itertools import islice
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# rows encoded at a time by render_array
+CHUNK_SIZE = 500
+
+# DRF escapes these so the JSON is also valid JavaScript
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+def render_array(renderer, rows):
+    """Encode an iterable of rows as one JSON array, CHUNK_SIZE rows at a
+    time
+
+    Compact JSON has nothing between the items of an array but commas, so
+    the chunks join to the bytes of rendering the whole list at once.
+    """
+    rows = iter(rows)
+    yield b'['
+    separator = b''
+    while chunk := list(islice(rows, CHUNK_SIZE)):
+        yield separator + renderer.render(chunk)[1:-1]
+        separator = b','
+    yield b']'
+
+
+async def arender_array(renderer, rows):
+    """render_array of an async iterator of rows"""
+    yield b'['
+    chunk, separator = [], b''
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            yield separator + renderer.render(chunk)[1:-1]
+            chunk, separator = [], b','
+    if chunk:
+        yield separator + renderer.render(chunk)[1:-1]
+    yield b']'
+
+
+def json_renderer():
+    """The JSON renderer configured in REST_FRAMEWORK"""
+    for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES:
+        if issubclass(renderer_class, JSONRenderer):
+            return renderer_class()
+    return JSONRenderer()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it is installed
+
+    orjson only encodes compact UTF-8, so indented output, as the browsable
+    API asks for, and output with UNICODE_JSON or COMPACT_JSON turned off
+    go through JSONRenderer. Datetimes and types orjson does not know are
+    handed to DRF's encoder, and data orjson refuses, like integer dict
+    keys, is rendered by JSONRenderer instead.
+    """
+
+    def encodes_fast(self, accepted_media_type, renderer_context):
+        return (orjson is not None and self.compact and not self.ensure_ascii and
+                self.get_indent(accepted_media_type, renderer_context or {}) is None)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or not self.encodes_fast(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            body = orjson.dumps(data, default=self.encoder_class().default,
+                                option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        for raw, escaped in LINE_SEPARATORS:
+            body = body.replace(raw, escaped)
+        return body
@@ -0,0 +1,76 @@
+"""Routing of reads to the read replica
+
+Views opt in with troveapi.views.replica.ReplicaReadMixin, which points
+read_alias at the replica for the length of a read request. Everything
+else, writes included, goes to the primary.
+
+A replica lags behind the primary, so a user who just wrote is pinned to
+the primary for TROVE_READ_YOUR_WRITES seconds and reads back what they
+wrote. Pins live in the default Django cache so every worker sharing it
+honours them.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from trove.database import REPLICA
+
+# seconds after a write that a user's reads stay on the primary
+READ_YOUR_WRITES = getattr(settings, 'TROVE_READ_YOUR_WRITES', 5)
+
+# alias reads of the current request go to, None for the primary
+read_alias = ContextVar('read_alias', default=None)
+
+
+def same_database(alias, other):
+    """Whether two aliases are configured as one database, like the replica
+    of a single SQLite file or of a test run where it mirrors the primary
+    """
+    first = connections[alias].settings_dict
+    second = connections[other].settings_dict
+    return all(first.get(key) == second.get(key) for key in ('ENGINE', 'NAME', 'HOST', 'PORT'))
+
+
+def replica_alias():
+    """Alias to read from, the primary when there is no separate replica"""
+    if REPLICA not in connections or same_database(REPLICA, DEFAULT_DB_ALIAS):
+        return DEFAULT_DB_ALIAS
+    return REPLICA
+
+
+def pin_key(user_id):
+    return f'trove:pinned:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Send a user's reads to the primary until the replica has their write"""
+    cache.set(pin_key(user_id), True, READ_YOUR_WRITES)
+
+
+def pinned_to_primary(user_id):
+    return cache.get(pin_key(user_id), False)
+
+
+async def apinned_to_primary(user_id):
+    """pinned_to_primary for async views"""
+    return await cache.aget(pin_key(user_id), False)
+
+
+class ReplicaRouter:
+    """Reads go to read_alias when a view has set it, writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica gets its schema from the primary by replication
+        return db != REPLICA
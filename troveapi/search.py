@@ -0,0 +1,214 @@
+"""Full text search over the names of games, books and shows
+
+Every game, book and show has a row in the troveapi_mediasearch table,
+kept in sync by the signal handlers in troveapi.signals. The table is an
+FTS5 virtual table on SQLite and a tsvector/trigram indexed table on
+PostgreSQL; both backends share the interface below so views never need
+to know which one is in use.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TABLE = 'troveapi_mediasearch'
+
+# model_name of each searchable model, in a fixed order used for row keys
+MEDIA_TYPES = ('game', 'book', 'show')
+
+
+def tokenize(text):
+    """Split search text into the words a name has to contain a prefix of
+
+    Only word characters survive, so the words are safe to splice into the
+    query syntax of either backend.
+    """
+    return re.findall(r'\w+', text or '')
+
+
+class SqliteSearchBackend:
+    """FTS5 backed search
+
+    FTS5 tables only index their text columns, so each entry is keyed by a
+    rowid derived from its media type and id to keep updates and deletes to
+    a primary key lookup.
+    """
+
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {TABLE} USING fts5("
+            "name, user_id UNINDEXED, media_type UNINDEXED, media_id UNINDEXED, "
+            "prefix='2 3')"
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def rowid(self, media_type, media_id):
+        return media_id * len(MEDIA_TYPES) + MEDIA_TYPES.index(media_type)
+
+    def index(self, cursor, entries):
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {TABLE} (rowid, name, user_id, media_type, media_id) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [(self.rowid(media_type, media_id), name, user_id, media_type, media_id)
+             for media_type, media_id, user_id, name in entries]
+        )
+
+    def remove(self, cursor, media_type, media_ids):
+        cursor.executemany(
+            f"DELETE FROM {TABLE} WHERE rowid = %s",
+            [(self.rowid(media_type, media_id),) for media_id in media_ids]
+        )
+
+    def match_query(self, words):
+        # quoted so words like AND, OR and NEAR are not read as FTS5 operators
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def match_sql(self, user_id, media_type, words):
+        return (
+            f"SELECT media_id FROM {TABLE} "
+            f"WHERE {TABLE} MATCH %s AND user_id = %s AND media_type = %s",
+            [self.match_query(words), user_id, media_type]
+        )
+
+    def ranked_sql(self, user_id, media_types, words, limit):
+        placeholders = ', '.join(['%s'] * len(media_types))
+        return (
+            f"SELECT media_type, media_id FROM {TABLE} "
+            f"WHERE {TABLE} MATCH %s AND user_id = %s AND media_type IN ({placeholders}) "
+            "ORDER BY rank LIMIT %s",
+            [self.match_query(words), user_id, *media_types, limit]
+        )
+
+
+class PostgresSearchBackend:
+    """tsvector backed search with trigram similarity for typos"""
+
+    def create(self, cursor):
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute(
+            f"CREATE TABLE {TABLE} ("
+            "media_type varchar(4) NOT NULL, "
+            "media_id bigint NOT NULL, "
+            "user_id integer NOT NULL, "
+            "name text NOT NULL, "
+            "document tsvector GENERATED ALWAYS AS (to_tsvector('simple', name)) STORED, "
+            "PRIMARY KEY (media_type, media_id))"
+        )
+        cursor.execute(
+            f"CREATE INDEX {TABLE}_document ON {TABLE} USING GIN (document)")
+        cursor.execute(
+            f"CREATE INDEX {TABLE}_trigram ON {TABLE} USING GIN (name gin_trgm_ops)")
+
+    def drop(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def index(self, cursor, entries):
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (media_type, media_id, user_id, name) "
+            "VALUES (%s, %s, %s, %s) "
+            "ON CONFLICT (media_type, media_id) "
+            "DO UPDATE SET user_id = EXCLUDED.user_id, name = EXCLUDED.name",
+            list(entries)
+        )
+
+    def remove(self, cursor, media_type, media_ids):
+        cursor.execute(
+            f"DELETE FROM {TABLE} WHERE media_type = %s AND media_id = ANY(%s)",
+            [media_type, list(media_ids)]
+        )
+
+    def match_query(self, words):
+        return ' & '.join(f'{word}:*' for word in words)
+
+    def match_sql(self, user_id, media_type, words):
+        return (
+            f"SELECT media_id FROM {TABLE} "
+            "WHERE user_id = %s AND media_type = %s "
+            "AND (document @@ to_tsquery('simple', %s) OR name %% %s)",
+            [user_id, media_type, self.match_query(words), ' '.join(words)]
+        )
+
+    def ranked_sql(self, user_id, media_types, words, limit):
+        query = self.match_query(words)
+        text = ' '.join(words)
+        return (
+            f"SELECT media_type, media_id FROM {TABLE} "
+            "WHERE user_id = %s AND media_type = ANY(%s) "
+            "AND (document @@ to_tsquery('simple', %s) OR name %% %s) "
+            "ORDER BY ts_rank(document, to_tsquery('simple', %s)) DESC, "
+            "similarity(name, %s) DESC LIMIT %s",
+            [user_id, list(media_types), query, text, query, text, limit]
+        )
+
+
+BACKENDS = {
+    'sqlite': SqliteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(using=None):
+    """Search backend for a connection, or None if its vendor has no index"""
+    using = using or connection
+    backend_class = BACKENDS.get(using.vendor)
+    return backend_class() if backend_class else None
+
+
+def entry(instance):
+    """The (media_type, media_id, user_id, name) search entry of a media row"""
+    return instance._meta.model_name, instance.pk, instance.user_id, instance.name
+
+
+def index(instances):
+    """Add or refresh the search entries of games, books or shows"""
+    backend = get_backend()
+    if backend is None:
+        return
+
+    with connection.cursor() as cursor:
+        backend.index(cursor, [entry(instance) for instance in instances])
+
+
+def remove(model, pks):
+    """Drop the search entries of deleted games, books or shows"""
+    backend = get_backend()
+    if backend is None:
+        return
+
+    with connection.cursor() as cursor:
+        backend.remove(cursor, model._meta.model_name, pks)
+
+
+def name_filter(model, user, text):
+    """Q object matching the rows of a media model whose name matches text
+
+    A name matches when each word of text is the start of one of its words,
+    not when text is anywhere in it. Falls back to a name__contains scan on
+    databases without a search index.
+    """
+    backend = get_backend()
+    if backend is None:
+        return Q(name__contains=text)
+
+    words = tokenize(text)
+    if not words:
+        return Q(pk__in=[])
+
+    sql, params = backend.match_sql(user.id, model._meta.model_name, words)
+    return Q(pk__in=RawSQL(sql, params))
+
+
+def ranked(user, text, media_types=MEDIA_TYPES, limit=50):
+    """Best (media_type, media_id) matches across media types, in one query"""
+    backend = get_backend()
+    words = tokenize(text)
+    if backend is None or not words or not media_types:
+        return []
+
+    sql, params = backend.ranked_sql(user.id, media_types, words, limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(media_type, int(media_id)) for media_type, media_id in cursor.fetchall()]
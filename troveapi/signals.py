@@ -0,0 +1,278 @@
+"""Signal handlers that keep derived data in step with the models"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from troveapi import search
+from troveapi.authentication import token_cache
+from troveapi.cache import EVERYONE, bump_generation
+from troveapi.events import publish, recommendation_event
+from troveapi.models import (Author, Book, BookRecommendation, Game,
+                             GameRecommendation, Platform, Show,
+                             ShowRecommendation, StreamingService, Tag,
+                             TagUsage)
+from troveapi.models.tag_usage import usage_field
+
+# set while media is deleted in bulk by code that updates the derived data
+# of all deleted rows at once
+bulk_deleting = ContextVar('bulk_deleting', default=False)
+
+
+@contextmanager
+def deleting_in_bulk():
+    """Skip the per row handlers of deleted games, books and shows
+
+    The caller has to update the search index, tag usage and generations
+    the handlers would have.
+    """
+    token = bulk_deleting.set(True)
+    try:
+        yield
+    finally:
+        bulk_deleting.reset(token)
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Show)
+def index_media(sender, instance, **kwargs):
+    """Refresh the search entry of a saved game, book or show"""
+    search.index([instance])
+
+
+@receiver(post_delete, sender=Game)
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Show)
+def unindex_media(sender, instance, **kwargs):
+    """Drop the search entry of a deleted game, book or show"""
+    if bulk_deleting.get():
+        return
+    search.remove(sender, [instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+def add_tag_usage(sender, instance, created, raw, **kwargs):
+    """Give a new tag the usage row its counters live on
+
+    A tag loaded from a fixture can arrive after its links, which are
+    counted from the through tables then.
+    """
+    if created:
+        TagUsage.objects.create(tag=instance)
+        if raw:
+            TagUsage.objects.refresh([instance.pk])
+
+
+def link_media_field(through):
+    """The media side of a tags through model, like game for TaggedGame"""
+    return next(field for field in through._meta.fields
+                if field.many_to_one and field.name != 'tag')
+
+
+@receiver(post_save, sender=Game.tags.through)
+@receiver(post_save, sender=Book.tags.through)
+@receiver(post_save, sender=Show.tags.through)
+def count_saved_tag_link(sender, instance, created, **kwargs):
+    """Count a link saved as a row of its own, like one loaded from a
+    fixture, the tags managers insert theirs in bulk and send m2m_changed
+
+    Link rows are only deleted through the tags managers or with their
+    media or tag, which count them. Handling post_delete here as well
+    would make Django fetch and signal every link those deletes remove.
+    """
+    if not created:
+        return
+
+    media = link_media_field(sender)
+    stored = media.related_model.objects.filter(
+        pk=getattr(instance, media.attname)).values('current', 'user_id').first()
+    # media loaded after its links counts them when it is saved
+    if stored is None:
+        return
+
+    TagUsage.objects.shift([instance.tag_id], **{usage_field(media.name, stored['current']): 1})
+    bump_generation(stored['user_id'])
+
+
+@receiver(m2m_changed, sender=Game.tags.through)
+@receiver(m2m_changed, sender=Book.tags.through)
+@receiver(m2m_changed, sender=Show.tags.through)
+def count_tag_links(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Shift the usage of tags linked to or unlinked from media
+
+    Django sends these signals inside the transaction of the link change.
+    Links about to be removed are locked and read first, so only the links
+    that really go are counted.
+    """
+    media_field = model._meta.model_name if reverse else instance._meta.model_name
+    # the ids on the other side of the links, media ids when reverse
+    other_column = f'{media_field}_id' if reverse else 'tag_id'
+    links = sender.objects.filter(**{'tag' if reverse else media_field: instance})
+
+    if action in ('pre_remove', 'pre_clear'):
+        if action == 'pre_remove':
+            links = links.filter(**{f'{other_column}__in': pk_set})
+        instance._unlinked_ids = list(
+            links.select_for_update().values_list(other_column, flat=True))
+        return
+
+    if action == 'post_add':
+        linked, sign = pk_set, 1
+    elif action in ('post_remove', 'post_clear'):
+        linked, sign = instance.__dict__.pop('_unlinked_ids', []), -1
+    else:
+        return
+
+    if not linked:
+        return
+    if not reverse:
+        TagUsage.objects.shift(linked, **{usage_field(media_field, instance.current): sign})
+        return
+
+    states = model.objects.filter(pk__in=linked).values('current').annotate(media=Count('pk'))
+    TagUsage.objects.shift([instance.pk], **{
+        usage_field(media_field, state['current']): sign * state['media'] for state in states})
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Show)
+def count_tags_of_loaded_media(sender, instance, created, raw, **kwargs):
+    """Count the links of media loaded from a fixture after them"""
+    if not (created and raw):
+        return
+
+    media_field = sender._meta.model_name
+    TagUsage.objects.shift(sender.tags.through.objects.filter(
+        **{media_field: instance}).values('tag_id'),
+        **{usage_field(media_field, instance.current): 1})
+
+
+@receiver(pre_save, sender=Game)
+@receiver(pre_save, sender=Book)
+@receiver(pre_save, sender=Show)
+def remember_stored_state(sender, instance, update_fields=None, **kwargs):
+    """Note whether media about to be updated is stored as current, its
+    tags' usage moves if that changes
+    """
+    if instance._state.adding or (update_fields is not None and 'current' not in update_fields):
+        return
+
+    stored = sender.objects.filter(pk=instance.pk)
+    if transaction.get_connection().in_atomic_block:
+        # concurrent updates of the media move its tags' usage one at a time
+        stored = stored.select_for_update()
+    instance._stored_current = stored.values_list('current', flat=True).first()
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Show)
+def count_tags_of_saved_media(sender, instance, created, **kwargs):
+    """Move the usage of updated media's tags between current and queued"""
+    stored = instance.__dict__.pop('_stored_current', None)
+    if created or stored is None or stored == instance.current:
+        return
+
+    media_field = sender._meta.model_name
+    TagUsage.objects.shift(instance.tags.values('pk'), **{
+        usage_field(media_field, stored): -1, usage_field(media_field, instance.current): 1})
+
+
+@receiver(pre_delete, sender=Game)
+@receiver(pre_delete, sender=Book)
+@receiver(pre_delete, sender=Show)
+def remember_tags_of_deleted_media(sender, instance, **kwargs):
+    """Lock and note the tags of media about to be deleted, the links go
+    with it in the same transaction
+    """
+    if bulk_deleting.get():
+        return
+    instance._deleted_tag_ids = list(sender.tags.through.objects.select_for_update().filter(
+        **{sender._meta.model_name: instance}).values_list('tag_id', flat=True))
+
+
+@receiver(post_delete, sender=Game)
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Show)
+def count_tags_of_deleted_media(sender, instance, **kwargs):
+    """Take deleted media off the usage of the tags it was using"""
+    tag_ids = instance.__dict__.pop('_deleted_tag_ids', [])
+    if tag_ids:
+        TagUsage.objects.shift(
+            tag_ids, **{usage_field(sender._meta.model_name, instance.current): -1})
+
+
+@receiver(post_save, sender=Platform)
+@receiver(post_save, sender=StreamingService)
+@receiver(post_delete, sender=Platform)
+@receiver(post_delete, sender=StreamingService)
+def bump_everyones_generation(sender, **kwargs):
+    """Invalidate the cached reference lists and every user's media
+    versions, their games and shows embed platforms and streaming services
+    """
+    bump_generation()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Game)
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Show)
+def bump_owners_generation(sender, instance, **kwargs):
+    """Invalidate the media versions of the owner of a changed tag or author,
+    or of deleted media
+    """
+    if bulk_deleting.get():
+        return
+    bump_generation(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def bump_users_generation(sender, instance, **kwargs):
+    """Invalidate the media versions of a user, media embeds its owner"""
+    bump_generation(instance.pk)
+
+
+@receiver(m2m_changed, sender=Game.tags.through)
+@receiver(m2m_changed, sender=Book.tags.through)
+@receiver(m2m_changed, sender=Show.tags.through)
+@receiver(m2m_changed, sender=Game.platforms.through)
+def bump_linking_generation(sender, instance, action, **kwargs):
+    """Invalidate media versions when tags or platforms are linked or
+    unlinked, which leaves last_modified alone
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_generation(getattr(instance, 'user_id', EVERYONE))
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def forget_cached_token(sender, instance, **kwargs):
+    """Stop trusting the cached user of a changed or deleted token"""
+    token_cache.forget(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_tokens_of_user(sender, instance, **kwargs):
+    """Drop cached tokens of a changed user, e.g. one made inactive"""
+    token_cache.forget_user(instance.pk)
+
+
+@receiver(post_save, sender=BookRecommendation)
+@receiver(post_save, sender=GameRecommendation)
+@receiver(post_save, sender=ShowRecommendation)
+def push_new_recommendation(sender, instance, created, **kwargs):
+    """Tell the recipient's open event streams about a new recommendation"""
+    if created:
+        publish(instance.recipient_id, [recommendation_event(instance)])
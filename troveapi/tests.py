@@ -1,3 +1,1272 @@
-from django.test import TestCase
+import asyncio
+import csv
+import time
+import types
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from django.db import connection
+from django.db.models import F
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework.throttling import BaseThrottle
+from troveapi.authentication import token_cache
+from troveapi.cache import (REFERENCE_GENERATION_TTL, Version,
+                            last_modified_seconds, list_cache,
+                            reference_generation)
+from troveapi.events import InProcessBroker, get_broker, publish, user_channel
+from troveapi.renderers import FastJSONRenderer
+from troveapi.models import (Author, Book, BookRecommendation, Game,
+                             GameRecommendation, Generation, Platform, Show,
+                             ShowRecommendation, StreamingService, Tag,
+                             TagUsage)
+from troveapi import search
+from troveapi.models.tag_usage import USAGE_FIELDS
+from troveapi.routers import ReplicaRouter, read_alias
+from troveapi.views import (book_recommendation, fast_serializers,
+                            game_recommendation, show_recommendation)
+from troveapi.views.async_reads import POLL_INTERVAL, AsyncReadView
+from troveapi.views.events import event_stream
+from troveapi.views.book import BookSerializer
+from troveapi.views.game import GameSerializer
+from troveapi.views.pagination import encode_cursor
+from troveapi.views.recommendation import INBOX_TYPES
+from troveapi.views.show import ShowSerializer
+from troveapi.views.tag import TagSerializer
+from trove.urls import router
+
+
+class MediaFixtureMixin:
+    """A reader with tags, platforms, an author and a streaming service to
+    add media with"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pw')
+        token = Token.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user, token=token)
+
+        self.tags = [Tag.objects.create(user=self.user, tag=name)
+                     for name in ('Action', 'Drama', 'RPG')]
+        self.platforms = [Platform.objects.create(name=name)
+                          for name in ('PC', 'Switch')]
+        self.author = Author.objects.create(user=self.user, name='Le Guin')
+        self.service = StreamingService.objects.create(service='Netflix')
+
+    def add_media(self, count):
+        for i in range(count):
+            game = Game.objects.create(
+                user=self.user, name=f'Game {i}', current=True,
+                multiplayer_capable=False)
+            game.tags.set(self.tags)
+            game.platforms.set(self.platforms)
+
+            book = Book.objects.create(
+                user=self.user, name=f'Book {i}', current=False, author=self.author)
+            book.tags.set(self.tags)
+
+            show = Show.objects.create(
+                user=self.user, name=f'Show {i}', current=True,
+                streaming_service=self.service)
+            show.tags.set(self.tags)
+
+    def add_recommendations(self):
+        """Recommend each of the reader's media back to them"""
+        sender, _ = User.objects.get_or_create(username='sender', first_name='Zoë')
+        for book, game, show in zip(Book.objects.all(), Game.objects.all(), Show.objects.all()):
+            BookRecommendation.objects.create(book=book, sender=sender, recipient=self.user,
+                                              message='"Read" this')
+            GameRecommendation.objects.create(game=game, sender=sender, recipient=self.user,
+                                              message='')
+            ShowRecommendation.objects.create(show=show, sender=sender, recipient=self.user,
+                                              message='x', read=True)
+
+
+class MediaListQueryCountTests(MediaFixtureMixin, APITestCase):
+    """List and retrieve endpoints cost a fixed number of queries"""
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_list_query_count_is_fixed(self):
+        # collection version, main query and one batched query per many to
+        # many field
+        expected = {'/games': 4, '/books': 3, '/shows': 3}
+
+        self.add_media(1)
+        small = {url: self.count_queries(url) for url in expected}
+
+        self.add_media(25)
+        large = {url: self.count_queries(url) for url in expected}
+
+        self.assertEqual(small, expected)
+        self.assertEqual(large, expected)
+
+    def test_long_list_query_count_is_fixed(self):
+        self.add_media(1)
+        Game.objects.bulk_create(
+            [Game(user=self.user, name=f'Game {i}', current=True, multiplayer_capable=False)
+             for i in range(600)])
+        viewsets = types.ModuleType('viewset_urls')
+        viewsets.urlpatterns = [path('', include(router.urls))]
+
+        self.assertEqual(self.count_queries('/games'), 4)
+        list_cache.clear()
+        with override_settings(ROOT_URLCONF=viewsets):
+            self.assertEqual(self.count_queries('/games'), 4)
+
+    def test_recommendation_list_query_count_is_fixed(self):
+        # main query with media, sender and recipient joined, and one
+        # batched query per many to many field of the media
+        expected = {'/bookRecommendations': 2, '/gameRecommendations': 3,
+                    '/showRecommendations': 2}
+
+        self.add_media(1)
+        self.add_recommendations()
+        small = {url: self.count_queries(url) for url in expected}
+
+        self.add_media(20)
+        self.add_recommendations()
+        large = {url: self.count_queries(url) for url in expected}
+
+        self.assertEqual(small, expected)
+        self.assertEqual(large, expected)
+
+    def test_retrieve_query_count(self):
+        self.add_media(1)
+        game = Game.objects.get()
+
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/games/{game.id}')
+
+        self.assertEqual(response.data['user']['username'], 'reader')
+        self.assertEqual(len(response.data['platforms']), 2)
+        self.assertEqual(len(response.data['tags']), 3)
+
+    def test_unchanged_list_is_not_modified(self):
+        self.add_media(3)
+        etag = self.client.get('/books')['ETag']
+
+        # only the collection version is read, nothing is serialized
+        with self.assertNumQueries(1):
+            response = self.client.get('/books', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.tags[0].tag = 'Adventure'
+        self.tags[0].save()
+        response = self.client.get('/books', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['tags'][0]['tag'], 'Adventure')
+
+
+@mock.patch('troveapi.renderers.CHUNK_SIZE', 5)
+@mock.patch('troveapi.cache.CHUNK_SIZE', 5)
+class StreamedListTests(MediaFixtureMixin, APITestCase):
+    """Long unpaged lists are streamed a chunk at a time, to the same bytes"""
+
+    def setUp(self):
+        super().setUp()
+        self.add_media(12)
+        self.key = Token.objects.get(user=self.user).key
+        list_cache.clear()
+        self.whole = {url: self.client.get(url) for url in ('/games', '/books', '/shows')}
+
+    def test_same_body_as_whole_list(self):
+        viewsets = types.ModuleType('viewset_urls')
+        viewsets.urlpatterns = [path('', include(router.urls))]
+
+        for urlconf in (settings.ROOT_URLCONF, viewsets):
+            for url, whole in self.whole.items():
+                with override_settings(ROOT_URLCONF=urlconf), \
+                        mock.patch('troveapi.cache.STREAM_ROWS', 10):
+                    response = self.client.get(url)
+                    self.assertTrue(response.streaming)
+                    self.assertEqual(b''.join(response.streaming_content), whole.content)
+                    self.assertEqual(response['X-Cache'], 'BYPASS')
+                    self.assertEqual(response['ETag'], whole['ETag'])
+
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=whole['ETag'])
+                    self.assertEqual(response.status_code, 304)
+
+    def test_query_count_per_chunk(self):
+        # collection version, main query, and per chunk of 5 rows one query
+        # per many to many field
+        with mock.patch('troveapi.cache.STREAM_ROWS', 10), \
+                CaptureQueriesContext(connection) as context:
+            b''.join(self.client.get('/games').streaming_content)
+        self.assertEqual(len(context.captured_queries), 2 + 3 * 2)
+
+    async def test_async_body_under_asgi(self):
+        with mock.patch('troveapi.cache.STREAM_ROWS', 10):
+            response = await self.async_client.get(
+                '/games', headers={'Authorization': f'Token {self.key}'})
+            self.assertTrue(response.is_async)
+            body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(body, self.whole['/games'].content)
+
+
+class KeysetPaginationTests(APITestCase):
+    """Paged lists walk every row once, newest first, by cursor"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.client.force_authenticate(user=self.user, token=Token.objects.create(user=self.user))
+        self.games = Game.objects.bulk_create(
+            [Game(user=self.user, name=f'Game {i}', current=True, multiplayer_capable=False)
+             for i in range(7)])
+
+    def walk(self, url):
+        """Ids of every page's rows, following nextCursor to the end"""
+        pages = []
+        response = self.client.get(url)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            pages.append([game['id'] for game in body['results']])
+            if body['nextCursor'] is None:
+                self.assertIsNone(body['next'])
+                return pages
+
+            self.assertIn(f"cursor={body['nextCursor']}", body['next'])
+            response = self.client.get(f"{url}&cursor={body['nextCursor']}")
+
+    def test_cursor_round_trip(self):
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for i, game in enumerate(self.games):
+            Game.objects.filter(pk=game.pk).update(last_modified=start + timedelta(minutes=i))
+
+        pages = self.walk('/games?pageSize=3')
+
+        newest_first = [game.id for game in reversed(self.games)]
+        self.assertEqual(pages, [newest_first[:3], newest_first[3:6], newest_first[6:]])
+
+    def test_ties_on_last_modified(self):
+        Game.objects.update(last_modified=datetime(2026, 1, 1, tzinfo=timezone.utc))
+
+        pages = self.walk('/games?pageSize=2')
+
+        self.assertEqual([pk for page in pages for pk in page],
+                         sorted((game.id for game in self.games), reverse=True))
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+
+    def test_invalid_cursor(self):
+        for cursor in ('%%%', 'bm90IGEgY3Vyc29y', encode_cursor('yesterday', 1),
+                       encode_cursor('2026-01-01T00:00:00+00:00', 'one'),
+                       encode_cursor('2026-01-01T00:00:00+00:00', 1, 2)):
+            response = self.client.get(f'/games?cursor={cursor}')
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(response.json(), {'detail': 'Invalid cursor'})
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    """Known tokens authenticate without a query until they change"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_write_costs_no_auth_queries(self):
+        self.client.get('/users')
+
+        # the tag, its usage row and the owner's generation in a savepoint,
+        # nothing to authenticate
+        with self.assertNumQueries(5):
+            response = self.client.post('/tags', {'tag': 'Drama'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get('/users')
+        self.token.delete()
+
+        response = self.client.get('/users')
+        self.assertEqual(response.status_code, 401)
+
+    def test_inactive_user_is_rejected(self):
+        self.client.get('/users')
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get('/users')
+        self.assertEqual(response.status_code, 401)
+
+
+class ReplicaRoutingTests(APITestCase):
+    """Reads go to the replica until the user writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.client.force_authenticate(user=self.user, token=Token.objects.create(user=self.user))
+
+    def read_aliases(self, url):
+        """Aliases the router was asked to read from during a GET"""
+        aliases = []
+
+        def db_for_read(router, model, **hints):
+            aliases.append(read_alias.get())
+
+        # the test replica mirrors the primary, so pretend it is separate
+        with mock.patch.object(ReplicaRouter, 'db_for_read', db_for_read), \
+                mock.patch('troveapi.routers.same_database', return_value=False):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return set(aliases)
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.read_aliases('/tags'), {'replica'})
+
+    def test_reads_after_a_write_go_to_primary(self):
+        self.client.post('/tags', {'tag': 'Drama'}, format='json')
+
+        self.assertEqual(self.read_aliases('/tags'), {None})
+        self.assertEqual(read_alias.get(), None)
+
+
+class AsyncReadTests(APITestCase):
+    """The async read views answer exactly like the ViewSets they replace"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.client.force_authenticate(user=self.user, token=Token.objects.create(user=self.user))
+
+        tags = [Tag.objects.create(user=self.user, tag=name) for name in ('Action', 'Drama')]
+        author = Author.objects.create(user=self.user, name='Le Guin')
+        for i in range(3):
+            game = Game.objects.create(
+                user=self.user, name=f'Game {i}', current=True, multiplayer_capable=False)
+            game.tags.set(tags)
+            Book.objects.create(user=self.user, name=f'Book {i}', current=False, author=author)
+
+    def test_same_body_as_viewset(self):
+        viewsets = types.ModuleType('viewset_urls')
+        viewsets.urlpatterns = [path('', include(router.urls))]
+
+        for url in ('/games', '/books?pageSize=2', '/tags', '/gameRecommendations/notify'):
+            list_cache.clear()
+            with override_settings(ROOT_URLCONF=viewsets):
+                expected = self.client.get(url)
+            list_cache.clear()
+            response = self.client.get(url)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, expected.content)
+
+    def test_needs_credentials_like_viewset(self):
+        viewsets = types.ModuleType('viewset_urls')
+        viewsets.urlpatterns = [path('', include(router.urls))]
+        self.client.force_authenticate(user=None)
+
+        for url in ('/games', '/recommendations/unread'):
+            with override_settings(ROOT_URLCONF=viewsets):
+                expected = self.client.get(url)
+            response = self.client.get(url)
+
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response['WWW-Authenticate'], 'Token')
+            self.assertEqual(response.content, expected.content)
+
+        response = self.client.get('/games', HTTP_AUTHORIZATION='Token nope')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'detail': 'Invalid token.'})
+
+    def test_negotiates_content(self):
+        for url in ('/games?format=api', '/gameRecommendations/notify?format=api'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response['Content-Type'].startswith('text/html'))
+
+        response = self.client.get('/games', HTTP_ACCEPT='application/xml')
+        self.assertEqual(response.status_code, 406)
+
+    def test_throttles(self):
+        class Closed(BaseThrottle):
+            def allow_request(self, request, view):
+                return False
+
+        with mock.patch.object(AsyncReadView, 'throttle_classes', [Closed]):
+            response = self.client.get('/tags')
+        self.assertEqual(response.status_code, 429)
+
+
+class FastSerializerTests(MediaFixtureMixin, APITestCase):
+    """The hand written list serialization renders like the serializers"""
+
+    def assertSameJson(self, expected, data):
+        self.assertEqual(JSONRenderer().render(data), JSONRenderer().render(expected))
+
+    def test_media_and_tags(self):
+        self.add_media(3)
+        cases = (
+            (Game.objects.with_related(), GameSerializer, fast_serializers.game_data),
+            (Book.objects.with_related(), BookSerializer, fast_serializers.book_data),
+            (Show.objects.with_related(), ShowSerializer, fast_serializers.show_data),
+            (Tag.objects.all(), TagSerializer, fast_serializers.tag_data),
+        )
+        for queryset, serializer_class, row_data in cases:
+            rows = list(queryset)
+            self.assertSameJson(serializer_class(rows, many=True).data,
+                                [row_data(row) for row in rows])
+
+    def test_recommendations(self):
+        self.add_media(2)
+        self.add_recommendations()
+
+        reco_serializers = {
+            'book': book_recommendation.RecoSerializer,
+            'game': game_recommendation.RecoSerializer,
+            'show': show_recommendation.RecoSerializer,
+        }
+        for _, model, media_field, serializer_class in INBOX_TYPES:
+            rows = list(model.objects.all())
+            self.assertSameJson(reco_serializers[media_field](rows, many=True).data,
+                                [fast_serializers.recommendation_data(row, media_field)
+                                 for row in rows])
+            self.assertSameJson(serializer_class(rows, many=True).data,
+                                [fast_serializers.inbox_data(row, media_field) for row in rows])
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """FastJSONRenderer renders the same bytes as JSONRenderer"""
+
+    data = {
+        'name': 'Zoë "Q" \u2028 ✓',
+        'created': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+        'rating': Decimal('4.5'),
+        'counts': {1: 2},
+        'tags': [{'id': 1, 'tag': None, 'current': True}],
+    }
+
+    def test_same_bytes(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(FastJSONRenderer().render(self.data), expected)
+        with mock.patch('troveapi.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.data), expected)
+
+        self.assertEqual(FastJSONRenderer().render(self.data, 'application/json; indent=4'),
+                         JSONRenderer().render(self.data, 'application/json; indent=4'))
+
+
+class AuthorNameTests(APITestCase):
+    """Author names are matched ignoring case the way the database does"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pw', is_staff=True)
+        self.client.force_authenticate(user=self.user, token=Token.objects.create(user=self.user))
+        Author.objects.create(user=self.user, name='Émile Zola')
+
+    def test_seeding_is_idempotent(self):
+        for _ in range(2):
+            response = self.client.post('/tags/seed', {
+                'tags': ['Drâma'], 'authors': ['Émile Zola', 'ÉMILE ZOLA', 'Zoë Adams'],
+                'users': [self.user.id]}, format='json')
+            self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(sorted(Author.objects.values_list('name', flat=True)),
+                         ['Zoë Adams', 'Émile Zola'])
+        self.assertEqual(Tag.objects.filter(tag='Drâma').count(), 1)
+
+    def test_reimport_uses_existing_author(self):
+        export = b'{"type": "book", "name": "Germinal", "author": "\\u00c9mile Zola"}\n'
+        for _ in range(2):
+            upload = SimpleUploadedFile('trove.ndjson', export)
+            response = self.client.post('/trove/import', {'file': upload})
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.data['book'], 1)
+
+        self.assertEqual(Author.objects.count(), 1)
+        self.assertEqual(Book.objects.filter(author__name='Émile Zola').count(), 2)
+
+
+class SeedTests(APITestCase):
+    """Seeding adds each tag once per user and checks the shape of its body"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.client.force_authenticate(user=self.user, token=Token.objects.create(user=self.user))
+
+    def test_default_tags_are_seeded_once(self):
+        for _ in range(2):
+            response = self.client.post('/tags/seed', {}, format='json')
+            self.assertEqual(response.status_code, 201)
+
+        names = list(Tag.objects.filter(user=self.user).values_list('tag', flat=True))
+        self.assertEqual(sorted(names), sorted(settings.TROVE_DEFAULT_TAGS))
+        self.assertEqual(TagUsage.objects.filter(tag__user=self.user).count(), len(names))
+
+    def test_tag_names_are_unique_per_user(self):
+        response = self.client.post('/tags/seed', {'tags': ['Drama', 'Drama']}, format='json')
+        self.assertEqual([tag['tag'] for tag in response.data], ['Drama'])
+
+        response = self.client.post('/tags', {'tag': 'Drama'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        other = Tag.objects.create(user=self.user, tag='Comedy')
+        response = self.client.put(f'/tags/{other.id}', {'tag': 'Drama'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        stranger = User.objects.create_user(username='stranger', password='pw')
+        Tag.objects.create(user=stranger, tag='Drama')
+        self.assertEqual(Tag.objects.filter(tag='Drama').count(), 2)
+
+    def test_malformed_body_is_rejected(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        for body in ({'tags': 'Drama'}, {'authors': 'Le Guin'}, {'users': str(self.user.id)},
+                     {'users': [True]}, {'tags': [['Drama']]}):
+            response = self.client.post('/tags/seed', body, format='json')
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(Tag.objects.exists())
+
+
+class TagFixtureMixin:
+    """A reader with three tags and an author"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.client.force_authenticate(user=self.user, token=Token.objects.create(user=self.user))
+        self.tags = [Tag.objects.create(user=self.user, tag=name)
+                     for name in ('Action', 'Drama', 'RPG')]
+        self.author = Author.objects.create(user=self.user, name='Le Guin')
+
+
+class TagUsageTests(TagFixtureMixin, APITestCase):
+    """The stored tag usage counters follow every write and can be rebuilt"""
+
+    def assertCountersExact(self):
+        tags = Tag.objects.order_by('pk')
+        self.assertEqual(list(tags.with_usage().values('pk', *USAGE_FIELDS)),
+                         list(tags.with_counted_usage().values('pk', *USAGE_FIELDS)))
+
+    def test_counters_do_not_drift(self):
+        action, drama, rpg = self.tags
+        game = Game.objects.create(user=self.user, name='Hades', current=True,
+                                   multiplayer_capable=False)
+        book = Book.objects.create(user=self.user, name='Earthsea', current=False,
+                                   author=self.author)
+
+        game.tags.add(action, drama)
+        game.tags.add(action)
+        game.tags.remove(rpg)
+        drama.bookTags.add(book)
+        self.assertCountersExact()
+
+        game.current = False
+        game.save()
+        game.save()
+        game.tags.clear()
+        game.tags.set([rpg, drama])
+        drama.gameTags.remove(game)
+        drama.gameTags.remove(game)
+        self.assertCountersExact()
+
+        response = self.client.put(f'/games/{game.id}', {
+            'name': 'Hades', 'current': True, 'multiplayer_capable': False,
+            'tags': [action.id, rpg.id], 'platforms': []}, format='json')
+        self.assertEqual(response.status_code, 204)
+        book.delete()
+        drama.gameTags.clear()
+        self.assertCountersExact()
+        self.assertEqual(TagUsage.objects.get(tag=rpg).current_games, 1)
+
+    def test_rebuild_fixes_stale_counters(self):
+        game = Game.objects.create(user=self.user, name='Hades', current=True,
+                                   multiplayer_capable=False)
+        game.tags.set(self.tags)
+        TagUsage.objects.filter(tag=self.tags[0]).update(current_games=5)
+        TagUsage.objects.filter(tag=self.tags[1]).delete()
+
+        output = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_tag_usage', '--verify', stdout=output)
+        call_command('rebuild_tag_usage', '--batch-size', '2', stdout=output)
+        call_command('rebuild_tag_usage', '--verify', stdout=output)
+
+        self.assertCountersExact()
+        self.assertEqual(TagUsage.objects.count(), 3)
+
+
+class TagFilterTests(TagFixtureMixin, APITestCase):
+    """Lists filter by all of the tags asked for, or by any of them"""
+
+    def test_all_and_any(self):
+        action, drama, rpg = self.tags
+        games = {}
+        for name, tags in (('both', [action, drama]), ('action', [action]), ('rpg', [rpg])):
+            games[name] = Game.objects.create(user=self.user, name=name, current=True,
+                                              multiplayer_capable=False)
+            games[name].tags.set(tags)
+
+        def names(query):
+            return sorted(game['name'] for game in self.client.get(f'/games?{query}').json())
+
+        self.assertEqual(names(f'tags={action.id}&tags={drama.id}'), ['both'])
+        self.assertEqual(names(f'tags={action.id}&tags={action.id}'), ['action', 'both'])
+        self.assertEqual(names(f'tags={action.id}&tags={rpg.id}'), [])
+        self.assertEqual(names(f'tags={drama.id}&tags={rpg.id}&tagMatch=any'), ['both', 'rpg'])
+
+
+class TagActivityTests(TagFixtureMixin, APITestCase):
+    """Tag activity endpoints read every count from one query"""
+
+    def setUp(self):
+        super().setUp()
+        action, drama, _ = self.tags
+        game = Game.objects.create(user=self.user, name='Hades', current=True,
+                                   multiplayer_capable=False)
+        game.tags.set([action, drama])
+        book = Book.objects.create(user=self.user, name='Earthsea', current=False,
+                                   author=self.author)
+        book.tags.set([drama])
+        other = User.objects.create_user(username='other')
+        Tag.objects.create(user=other, tag='Puzzle')
+
+    def get(self, url):
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_activity(self):
+        action, drama, rpg = self.tags
+        zero = {'currentBooks': 0, 'queuedBooks': 0, 'currentGames': 0,
+                'queuedGames': 0, 'currentShows': 0, 'queuedShows': 0}
+        counts = {tag['tag']: {key: tag[key] for key in zero}
+                  for tag in self.get('/tags/activity')}
+
+        self.assertEqual(counts, {
+            action.tag: {**zero, 'currentGames': 1},
+            drama.tag: {**zero, 'currentGames': 1, 'queuedBooks': 1},
+            rpg.tag: zero,
+        })
+
+    def test_active(self):
+        action, drama, _ = self.tags
+
+        def names(tags):
+            return [tag['tag'] for tag in tags]
+
+        self.assertEqual(names(self.get('/tags/active')), [action.tag, drama.tag])
+
+        current = self.get('/tags/active_current')
+        self.assertEqual(names(current['currentGameTags']), [action.tag, drama.tag])
+        self.assertEqual(current['currentBookTags'], [])
+        self.assertEqual(current['currentShowTags'], [])
+
+        queued = self.get('/tags/active_queued')
+        self.assertEqual(names(queued['queuedBookTags']), [drama.tag])
+        self.assertEqual(queued['queuedGameTags'], [])
+
+
+class FixtureTagUsageTests(APITestCase):
+    """Links loaded from the fixtures are counted whatever order they load in"""
+
+    REFERENCES = ('users', 'authors', 'platforms', 'streaming_services')
+    MEDIA = ('games', 'books', 'shows')
+    LINKS = ('tagged_games', 'tagged_books', 'tagged_shows')
+
+    def load(self, *fixtures):
+        # one loaddata checks foreign keys after every fixture is in
+        call_command('loaddata', *fixtures, verbosity=0)
+
+    def assertCountersExact(self):
+        tags = Tag.objects.order_by('pk')
+        self.assertEqual(list(tags.with_usage().values('pk', *USAGE_FIELDS)),
+                         list(tags.with_counted_usage().values('pk', *USAGE_FIELDS)))
+        call_command('rebuild_tag_usage', '--verify', stdout=StringIO())
+
+    def test_links_after_media(self):
+        self.load(*self.REFERENCES, 'tags', *self.MEDIA, *self.LINKS)
+        self.assertCountersExact()
+        self.assertTrue(TagUsage.objects.filter(current_games__gt=0).exists())
+
+    def test_links_before_media(self):
+        self.load(*self.REFERENCES, 'tags', *self.LINKS, *self.MEDIA)
+        self.assertCountersExact()
+
+    def test_tags_last(self):
+        self.load(*self.REFERENCES, *self.MEDIA, *self.LINKS, 'tags')
+        self.assertCountersExact()
+
+
+class SharedVersionTests(APITestCase):
+    """Versions move on for writes made by any worker process"""
+
+    def setUp(self):
+        cache.clear()
+        reference_generation.forget()
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.client.force_authenticate(user=self.user, token=Token.objects.create(user=self.user))
+        Tag.objects.create(user=self.user, tag='Drama')
+
+    def bump_elsewhere(self, scope):
+        """Bump a generation as another process would, past this one's caches"""
+        Generation.objects.filter(scope=scope).update(value=F('value') + 1)
+
+    def test_tag_rename_elsewhere_is_seen(self):
+        etag = self.client.get('/tags')['ETag']
+        self.assertEqual(self.client.get('/tags')['X-Cache'], 'HIT')
+
+        Tag.objects.filter(user=self.user).update(tag='Comedy')
+        self.bump_elsewhere(str(self.user.id))
+
+        response = self.client.get('/tags', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()[0]['tag'], 'Comedy')
+
+    def test_reference_change_elsewhere_is_seen(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Platform.objects.create(name='PC')
+        self.client.get('/platforms')
+
+        Platform.objects.bulk_create([Platform(name='Switch')])
+        self.bump_elsewhere('all')
+
+        def names():
+            return [platform['name'] for platform in self.client.get('/platforms').json()]
+
+        # everyone's generation is trusted for a few seconds
+        self.assertEqual(names(), ['PC'])
+        expired = time.monotonic() + REFERENCE_GENERATION_TTL
+        with mock.patch('troveapi.cache.time.monotonic', return_value=expired):
+            self.assertEqual(names(), ['PC', 'Switch'])
+
+    def test_reference_list_costs_no_query(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Platform.objects.create(name='PC')
+        etag = self.client.get('/platforms')['ETag']
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/platforms').status_code, 200)
+            response = self.client.get('/platforms', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_last_modified_waits_for_its_second_to_pass(self):
+        now = datetime.now(timezone.utc)
+        self.assertIsNone(last_modified_seconds(Version('"x"', now, ())))
+        earlier = now - timedelta(seconds=2)
+        self.assertEqual(last_modified_seconds(Version('"x"', earlier, ())),
+                         int(earlier.timestamp()))
+
+
+class TroveTransferTests(APITestCase):
+    """A trove exports and imports whole, or not at all"""
+
+    def setUp(self):
+        self.sender = User.objects.create_user(username='sender', password='pw')
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.other = User.objects.create_user(username='other', password='pw')
+        self.login(self.user)
+
+        drama = Tag.objects.create(user=self.user, tag='Drama')
+        Tag.objects.create(user=self.user, tag='Unused')
+        platform = Platform.objects.create(name='PC')
+        service = StreamingService.objects.create(service='Netflix')
+        game = Game.objects.create(user=self.user, name='Hades', current=True,
+                                   multiplayer_capable=False)
+        game.platforms.set([platform])
+        game.tags.set([drama])
+        author = Author.objects.create(user=self.user, name='Émile Zola')
+        Book.objects.create(user=self.user, name='Germinal', current=False, author=author)
+        Show.objects.create(user=self.user, name='Dark', current=True, streaming_service=service)
+        sent = Book.objects.create(user=self.sender, name='Nana', current=False,
+                                   author=Author.objects.create(user=self.sender, name='Zola'))
+        BookRecommendation.objects.create(book=sent, sender=self.sender, recipient=self.user,
+                                          message='Read "this"', read=True)
+
+    def login(self, user):
+        self.client.force_authenticate(user=user, token=Token.objects.get_or_create(user=user)[0])
+
+    def export(self, file_format):
+        response = self.client.get(f'/trove/export?fileFormat={file_format}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def upload(self, name, content):
+        return self.client.post('/trove/import', {'file': SimpleUploadedFile(name, content)})
+
+    async def test_async_export_under_asgi(self):
+        key = (await Token.objects.aget(user=self.user)).key
+        for file_format in ('ndjson', 'csv'):
+            expected = await sync_to_async(self.export)(file_format)
+            with mock.patch('troveapi.transfer.CHUNK_SIZE', 2):
+                response = await self.async_client.get(
+                    f'/trove/export?fileFormat={file_format}',
+                    headers={'Authorization': f'Token {key}'})
+                self.assertTrue(response.is_async)
+                chunks = [chunk async for chunk in response.streaming_content]
+
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual(b''.join(chunks), expected)
+
+    def test_round_trip(self):
+        for file_format in ('ndjson', 'csv'):
+            self.login(self.user)
+            exported = self.export(file_format)
+
+            other = User.objects.create_user(username=f'other-{file_format}')
+            self.login(other)
+            response = self.upload(f'trove.{file_format}', exported)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.data['skipped'], 0)
+
+            self.assertEqual(self.export(file_format), exported)
+
+    def test_malformed_file_imports_nothing(self):
+        self.login(self.other)
+        lines = b'{"type": "tag", "name": "Kept?"}\n{"type": "tag", "name": "Also"}\nnot json\n'
+        with mock.patch('troveapi.transfer.CHUNK_SIZE', 1):
+            response = self.upload('trove.ndjson', lines)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Tag.objects.filter(user=self.other).exists())
+
+    def test_unreadable_csv_is_rejected(self):
+        self.login(self.other)
+        content = b'type,name\ntag,' + b'x' * (csv.field_size_limit() + 1) + b'\n'
+
+        response = self.upload('trove.csv', content)
+        self.assertEqual(response.status_code, 400)
+
+
+class BatchTests(APITestCase):
+    """Batches of media writes apply whole or not at all"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.client.force_authenticate(user=self.user, token=Token.objects.create(user=self.user))
+        self.drama = Tag.objects.create(user=self.user, tag='Drama')
+        self.platform = Platform.objects.create(name='PC')
+
+        stranger = User.objects.create_user(username='stranger', password='pw')
+        self.foreign_tag = Tag.objects.create(user=stranger, tag='Theirs')
+        self.foreign_game = Game.objects.create(user=stranger, name='Theirs', current=True,
+                                                multiplayer_capable=False)
+
+    def add_games(self, count):
+        games = []
+        for number in range(count):
+            game = Game.objects.create(user=self.user, name=f'Old {number}', current=True,
+                                       multiplayer_capable=False)
+            game.tags.set([self.drama])
+            games.append(game)
+        return games
+
+    def batch(self, body):
+        return self.client.post('/games/batch', body, format='json')
+
+    def usage(self):
+        return TagUsage.objects.get(tag=self.drama)
+
+    def test_create_update_delete(self):
+        kept, gone = self.add_games(2)
+        response = self.batch({
+            'create': [{'name': 'Hades', 'current': True, 'multiplayer_capable': False,
+                        'tags': [self.drama.id], 'platforms': [self.platform.id]}],
+            'update': [{'id': kept.id, 'name': 'Renamed', 'current': False,
+                        'multiplayer_capable': True}],
+            'delete': [gone.id],
+        })
+        self.assertEqual(response.status_code, 200)
+
+        created = Game.objects.get(name='Hades')
+        self.assertEqual(response.data, {'created': [created.id], 'updated': [kept.id],
+                                         'deleted': [gone.id]})
+        self.assertEqual(list(created.tags.all()), [self.drama])
+        self.assertFalse(Game.objects.filter(pk=gone.id).exists())
+        self.assertEqual((self.usage().current_games, self.usage().queued_games), (1, 1))
+        self.assertEqual(search.ranked(self.user, 'renamed'), [('game', kept.id)])
+        self.assertEqual(search.ranked(self.user, 'old'), [])
+
+    def test_bad_item_rolls_back_the_batch(self):
+        game, = self.add_games(1)
+        response = self.batch({
+            'create': [{'name': 'Hades', 'current': True, 'multiplayer_capable': False}],
+            'update': [{'id': game.id, 'name': '', 'current': True,
+                        'multiplayer_capable': False}],
+            'delete': [game.id],
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('name', response.data['update'][0])
+        self.assertEqual(list(Game.objects.filter(user=self.user)), [game])
+
+    def test_foreign_ids_are_rejected(self):
+        response = self.batch({
+            'create': [{'name': 'Hades', 'current': True, 'multiplayer_capable': False,
+                        'tags': [self.foreign_tag.id]}],
+            'update': [{'id': self.foreign_game.id, 'name': 'Mine', 'current': True,
+                        'multiplayer_capable': False}],
+            'delete': [self.foreign_game.id],
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags', response.data['create'][0])
+        self.assertEqual(response.data['update'][0], {'id': ['Not found.']})
+        self.assertEqual(response.data['delete'][0], {'id': ['Not found.']})
+        self.assertEqual(Game.objects.get(pk=self.foreign_game.id).name, 'Theirs')
+
+    def test_foreign_author_is_rejected(self):
+        stranger = User.objects.get(username='stranger')
+        author = Author.objects.create(user=stranger, name='Theirs')
+        response = self.client.post('/books/batch', {
+            'create': [{'name': 'Mine', 'current': True, 'author': author.id}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('author', response.data['create'][0])
+        self.assertFalse(Book.objects.filter(user=self.user).exists())
+
+    def test_malformed_body_is_rejected(self):
+        for body in ([], {'delete': '1'}, {'delete': [True]}, {'create': {'name': 'x'}},
+                     {'update': [{'id': [1]}]}):
+            self.assertEqual(self.batch(body).status_code, 400, body)
+
+    def test_delete_costs_the_same_for_any_number_of_rows(self):
+        def delete_queries(games):
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.batch({'delete': [game.id for game in games]}).status_code,
+                                 200)
+            return len(context.captured_queries)
+
+        self.assertEqual(delete_queries(self.add_games(1)), delete_queries(self.add_games(5)))
+        self.assertEqual(self.usage().current_games, 0)
+
+
+class SearchTests(APITestCase):
+    """Media names are searched by word prefix through the search index"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.client.force_authenticate(user=self.user, token=Token.objects.create(user=self.user))
+        self.game = Game.objects.create(user=self.user, name='The Witcher 3', current=True,
+                                        multiplayer_capable=False)
+        author = Author.objects.create(user=self.user, name='Sapkowski')
+        Book.objects.create(user=self.user, name='The Last Wish', current=False, author=author)
+
+    def found(self, text, **params):
+        response = self.client.get('/search', {'q': text, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(match['type'], match[match['type']]['name']) for match in response.data]
+
+    def test_words_match_by_prefix(self):
+        self.assertEqual(self.found('wit'), [('game', 'The Witcher 3')])
+        self.assertEqual(sorted(self.found('the wi')),
+                         [('book', 'The Last Wish'), ('game', 'The Witcher 3')])
+        self.assertEqual(self.found('itcher'), [])
+        # query syntax is taken as plain words
+        self.assertEqual(self.found('"wit" OR NEAR(*'), [])
+
+        response = self.client.get('/games', {'search': 'witch'})
+        self.assertEqual([game['name'] for game in response.json()], ['The Witcher 3'])
+
+    def test_index_follows_renames_and_deletes(self):
+        self.game.name = 'Hades'
+        self.game.save()
+        self.assertEqual(self.found('witcher'), [])
+        self.assertEqual(self.found('had'), [('game', 'Hades')])
+
+        self.game.delete()
+        self.assertEqual(self.found('had'), [])
+
+    def test_limit_is_checked(self):
+        self.assertEqual(len(self.found('the', limit=-1)), 1)
+        self.assertEqual(len(self.found('the', limit=1000)), 2)
+
+        response = self.client.get('/search', {'q': 'the', 'limit': 'many'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RecommendationFixtureMixin:
+    """A reader who receives recommendations of a book, game and show"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.client.force_authenticate(user=self.user, token=Token.objects.create(user=self.user))
+        self.sender = User.objects.create_user(username='sender')
+        author = Author.objects.create(user=self.sender, name='Le Guin')
+        service = StreamingService.objects.create(service='Netflix')
+        self.book = Book.objects.create(user=self.sender, name='Earthsea', current=True,
+                                        author=author)
+        self.game = Game.objects.create(user=self.sender, name='Hades', current=True,
+                                        multiplayer_capable=False)
+        self.show = Show.objects.create(user=self.sender, name='Dark', current=True,
+                                        streaming_service=service)
+
+    def receive(self, created, recipient=None):
+        """One recommendation of each type, all sent at created"""
+        recipient = recipient or self.user
+        sent = [
+            BookRecommendation.objects.create(book=self.book, sender=self.sender,
+                                              recipient=recipient, message=''),
+            GameRecommendation.objects.create(game=self.game, sender=self.sender,
+                                              recipient=recipient, message=''),
+            ShowRecommendation.objects.create(show=self.show, sender=self.sender,
+                                              recipient=recipient, message=''),
+        ]
+        for recommendation in sent:
+            type(recommendation).objects.filter(pk=recommendation.pk).update(created=created)
+        return [(record_type, recommendation.pk)
+                for (record_type, *_), recommendation in zip(INBOX_TYPES, sent)]
+
+
+class InboxTests(RecommendationFixtureMixin, APITestCase):
+    """The inbox pages through every type of received recommendation"""
+
+    def test_pages_merge_types_newest_first(self):
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        older = self.receive(start)
+        # sent at the same time, ordered by type then newest id
+        tied = self.receive(start + timedelta(hours=1)) + self.receive(start + timedelta(hours=1))
+        self.receive(start + timedelta(hours=2), recipient=self.sender)
+
+        rows = []
+        url = '/recommendations?pageSize=4'
+        while url:
+            body = self.client.get(url).json()
+            self.assertLessEqual(len(body['results']), 4)
+            rows += [(row['type'], row[row['type']]['id']) for row in body['results']]
+            url = body['next']
+
+        rank = {record_type: i for i, (record_type, *_) in enumerate(INBOX_TYPES)}
+        expected = sorted(tied, key=lambda row: (rank[row[0]], -row[1])) + older
+        self.assertEqual(rows, expected)
+
+    def test_invalid_cursor(self):
+        for cursor in ('bm90IGEgY3Vyc29y', encode_cursor('2026-01-01T00:00:00+00:00', 'x', 1)):
+            response = self.client.get(f'/recommendations?cursor={cursor}')
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json(), {'detail': 'Invalid cursor'})
+
+
+class BulkSelectionTests(RecommendationFixtureMixin, APITestCase):
+    """Many received recommendations are marked read or dismissed at once"""
+
+    def setUp(self):
+        super().setUp()
+        self.start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.older = self.receive(self.start)
+        self.newer = self.receive(self.start + timedelta(hours=1))
+        self.others = self.receive(self.start, recipient=self.sender)
+
+    def test_read_by_ids(self):
+        (book_type, book_id), (game_type, game_id), _ = self.older
+        response = self.client.put('/recommendations/read', {'ids': {
+            book_type: [book_id, self.others[0][1]], game_type: [game_id]}}, format='json')
+
+        self.assertEqual(response.json(), {'bookRecommendation': 1, 'gameRecommendation': 1,
+                                           'showRecommendation': 0, 'total': 2})
+        self.assertEqual(BookRecommendation.objects.filter(read=True).count(), 1)
+        self.assertEqual(GameRecommendation.objects.filter(read=True).count(), 1)
+        self.assertFalse(ShowRecommendation.objects.filter(read=True).exists())
+
+        response = self.client.put('/recommendations/read', {'ids': {book_type: [book_id]}},
+                                   format='json')
+        self.assertEqual(response.json()['total'], 0)
+
+    def test_read_all_of_some_types(self):
+        response = self.client.put('/recommendations/read', {
+            'all': True, 'types': ['gameRecommendation', 'showRecommendation']}, format='json')
+
+        self.assertEqual(response.json(), {'gameRecommendation': 2, 'showRecommendation': 2,
+                                           'total': 4})
+        self.assertEqual(GameRecommendation.objects.filter(read=False).count(), 1)
+        self.assertEqual(BookRecommendation.objects.filter(read=False).count(), 3)
+
+    def test_dismiss_before(self):
+        response = self.client.post('/recommendations/dismiss', {
+            'all': True, 'before': self.start.isoformat()}, format='json')
+
+        self.assertEqual(response.json()['total'], 3)
+        remaining = [(record_type, pk) for record_type, model, *_ in INBOX_TYPES
+                     for pk in model.objects.values_list('pk', flat=True)]
+        self.assertEqual(sorted(remaining), sorted(self.newer + self.others))
+
+    def test_rejects_bad_selections(self):
+        for selection in ({}, {'all': False}, {'ids': {'movieRecommendation': [1]}},
+                          {'all': True, 'types': ['movieRecommendation']}):
+            response = self.client.post('/recommendations/dismiss', selection, format='json')
+            self.assertEqual(response.status_code, 400, selection)
+
+        self.assertEqual(BookRecommendation.objects.count(), 3)
+
+
+class FanOutTests(APITestCase):
+    """One recommendation can be sent to many recipients at once"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sender', password='pw')
+        self.client.force_authenticate(user=self.user, token=Token.objects.create(user=self.user))
+        self.recipients = [User.objects.create_user(username=f'friend{i}') for i in range(3)]
+        author = Author.objects.create(user=self.user, name='Le Guin')
+        self.book = Book.objects.create(user=self.user, name='Earthsea', current=True,
+                                        author=author)
+
+    def send(self, recipients):
+        return self.client.post('/bookRecommendations', {
+            'book': self.book.id, 'message': 'Read this', 'recipients': recipients},
+            format='json')
+
+    def test_sends_once_to_each_recipient(self):
+        first, second, _ = self.recipients
+
+        # the media, the recipients and one insert in a savepoint
+        with self.assertNumQueries(5):
+            response = self.send([first.id, second.id, first.id])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row['recipient'] for row in response.json()], [first.id, second.id])
+        self.assertEqual(
+            sorted(BookRecommendation.objects.values_list('recipient', 'sender', 'message')),
+            [(first.id, self.user.id, 'Read this'), (second.id, self.user.id, 'Read this')])
+
+    def test_rejects_bad_recipients(self):
+        first = self.recipients[0]
+        for recipients in ([], first.id, [str(first.id)], [True], [first.id, False],
+                           [first.id, 0], list(range(1, 102))):
+            response = self.send(recipients)
+            self.assertEqual(response.status_code, 400, recipients)
+            self.assertIn('recipients', response.json())
+
+        self.assertFalse(BookRecommendation.objects.exists())
+
+
+class UnreadTests(APITestCase):
+    """Unread counts change version with any arrival and long poll under ASGI"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.token = Token.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user, token=self.token)
+        self.sender = User.objects.create_user(username='sender', password='pw')
+        author = Author.objects.create(user=self.sender, name='Le Guin')
+        self.book = Book.objects.create(user=self.sender, name='Earthsea', current=False,
+                                        author=author)
+
+    def recommend(self):
+        return BookRecommendation.objects.create(book=self.book, sender=self.sender,
+                                                 recipient=self.user, message='')
+
+    def test_read_then_new_arrival_changes_version(self):
+        self.recommend()
+        before = self.client.get('/recommendations/unread').json()
+
+        self.client.put('/recommendations/read', {'all': True}, format='json')
+        self.recommend()
+        after = self.client.get('/recommendations/unread').json()
+
+        self.assertEqual((before['books'], after['books']), (1, 1))
+        self.assertNotEqual(before['version'], after['version'])
+
+    def test_wsgi_answers_at_once(self):
+        version = self.client.get('/recommendations/unread').json()['version']
+
+        started = time.monotonic()
+        response = self.client.get('/recommendations/unread', {'since': version, 'wait': 10})
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.json()['version'], version)
+
+    async def test_asgi_wait_ends_on_new_recommendation(self):
+        headers = {'Authorization': f'Token {self.token.key}'}
+        response = await self.async_client.get('/recommendations/unread', headers=headers)
+        version = response.json()['version']
+
+        async def arrive():
+            await asyncio.sleep(0.2)
+            recommendation = await sync_to_async(self.recommend)()
+            get_broker().publish(user_channel(self.user.id), {'id': recommendation.pk})
+
+        started = time.monotonic()
+        response, _ = await asyncio.gather(
+            self.async_client.get('/recommendations/unread', {'since': version, 'wait': 10},
+                                  headers=headers),
+            arrive())
+
+        self.assertLess(time.monotonic() - started, POLL_INTERVAL)
+        self.assertEqual(response.json()['books'], 1)
+        self.assertNotEqual(response.json()['version'], version)
+
+
+class EventTests(APITestCase):
+    """Events reach their channel's subscribers over an ASGI only stream"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pw')
+        self.token = Token.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user, token=self.token)
+
+    async def test_broker_delivers_to_its_channel(self):
+        broker = InProcessBroker()
+        async with broker.subscribe('a') as events, broker.subscribe('b') as others:
+            # publishers run on other threads than the subscribers
+            await sync_to_async(broker.publish, thread_sensitive=False)('a', {'id': 1})
+            self.assertEqual(await asyncio.wait_for(events.get(), 1), {'id': 1})
+            self.assertTrue(others.empty())
+
+        self.assertEqual(broker.subscribers, {})
+
+    async def test_slow_subscriber_drops_new_events(self):
+        broker = InProcessBroker()
+        with mock.patch('troveapi.events.QUEUE_SIZE', 1):
+            async with broker.subscribe('a') as events:
+                broker.publish('a', {'id': 1})
+                broker.publish('a', {'id': 2})
+                await asyncio.sleep(0)
+                self.assertEqual((events.qsize(), events.get_nowait()), (1, {'id': 1}))
+
+    def test_publish_waits_for_commit(self):
+        with mock.patch('troveapi.events.get_broker') as get_broker_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                publish(self.user.id, [{'id': 1}])
+                get_broker_mock.assert_not_called()
+
+        get_broker_mock().publish.assert_called_once_with(user_channel(self.user.id), {'id': 1})
+
+    def test_stream_needs_asgi(self):
+        response = self.client.get('/recommendations/events',
+                                   HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(response.status_code, 503)
+
+    async def test_stream_opens_with_a_ticket_once(self):
+        response = await self.async_client.post(
+            '/recommendations/events/ticket', headers={'Authorization': f'Token {self.token.key}'})
+        ticket = response.json()['ticket']
+
+        response = await self.async_client.get('/recommendations/events', {'ticket': ticket})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await anext(response.streaming_content), b'retry: 5000\n\n')
+
+        for params in ({'ticket': ticket}, {'token': self.token.key}):
+            response = await self.async_client.get('/recommendations/events', params)
+            self.assertEqual(response.status_code, 401)
+
+    async def test_stream_sends_published_events(self):
+        stream = event_stream(self.user.id)
+        self.assertEqual(await anext(stream), 'retry: 5000\n\n')
+
+        # the stream subscribes once it is asked for its next message
+        following = asyncio.ensure_future(anext(stream))
+        while user_channel(self.user.id) not in get_broker().subscribers:
+            await asyncio.sleep(0.01)
+        get_broker().publish(user_channel(self.user.id), {'type': 'bookRecommendation', 'id': 1})
+
+        self.assertEqual(await asyncio.wait_for(following, 1),
+                         'event: bookRecommendation\n'
+                         'data: {"type": "bookRecommendation", "id": 1}\n\n')
+        await stream.aclose()
+        self.assertNotIn(user_channel(self.user.id), get_broker().subscribers)
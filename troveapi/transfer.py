@@ -0,0 +1,360 @@
+"""Streaming export and import of a user's whole trove
+
+A trove is written as a flat sequence of records, one per tag, game, book,
+show and received recommendation, either as NDJSON (one JSON object per
+line) or as CSV (one row per record). Records refer to tags, authors,
+platforms, streaming services and users by name rather than by id, so an
+export can be imported into another account or another database.
+
+Both directions work on iterators a chunk at a time, so memory use stays
+flat however large the trove is. Under ASGI an export is handed to the
+server as an async iterator, see aiter_chunks, since Django reads a sync
+one whole before sending any of it.
+"""
+import csv
+import io
+import json
+from collections import Counter, defaultdict
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from troveapi import search
+from troveapi.cache import bump_generation
+from troveapi.models import (Author, Book, BookRecommendation, Game,
+                             GameRecommendation, Platform, Show,
+                             ShowRecommendation, StreamingService, Tag,
+                             TagUsage)
+
+CHUNK_SIZE = 500
+
+MEDIA_MODELS = {'game': Game, 'book': Book, 'show': Show}
+
+# record type of each recommendation model, with the media it points at
+RECOMMENDATIONS = {
+    'bookRecommendation': (BookRecommendation, 'book'),
+    'gameRecommendation': (GameRecommendation, 'game'),
+    'showRecommendation': (ShowRecommendation, 'show'),
+}
+
+CSV_FIELDS = ('type', 'name', 'current', 'multiplayer_capable', 'author',
+              'streaming_service', 'platforms', 'tags', 'owner', 'sender',
+              'message', 'read')
+# CSV cells of these fields hold JSON so booleans and lists survive a round trip
+CSV_JSON_FIELDS = {'current', 'multiplayer_capable', 'platforms', 'tags', 'read'}
+
+
+def export_records(user):
+    """Yield every record of a user's trove"""
+    for tag in Tag.objects.filter(user=user).order_by('pk').iterator(chunk_size=CHUNK_SIZE):
+        yield {'type': 'tag', 'name': tag.tag}
+
+    games = Game.objects.with_related().filter(user=user).order_by('pk')
+    for game in games.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'type': 'game',
+            'name': game.name,
+            'current': game.current,
+            'multiplayer_capable': game.multiplayer_capable,
+            'platforms': [platform.name for platform in game.platforms.all()],
+            'tags': [tag.tag for tag in game.tags.all()]
+        }
+
+    books = Book.objects.with_related().filter(user=user).order_by('pk')
+    for book in books.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'type': 'book',
+            'name': book.name,
+            'current': book.current,
+            'author': book.author.name,
+            'tags': [tag.tag for tag in book.tags.all()]
+        }
+
+    shows = Show.objects.with_related().filter(user=user).order_by('pk')
+    for show in shows.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'type': 'show',
+            'name': show.name,
+            'current': show.current,
+            'streaming_service': show.streaming_service.service,
+            'tags': [tag.tag for tag in show.tags.all()]
+        }
+
+    for record_type, (model, media_field) in RECOMMENDATIONS.items():
+        recommendations = model.objects.filter(recipient=user).select_related(
+            'sender', f'{media_field}__user').order_by('pk')
+        for recommendation in recommendations.iterator(chunk_size=CHUNK_SIZE):
+            media = getattr(recommendation, media_field)
+            yield {
+                'type': record_type,
+                'name': media.name,
+                'owner': media.user.username,
+                'sender': recommendation.sender.username,
+                'message': recommendation.message,
+                'read': recommendation.read
+            }
+
+
+def to_ndjson(records):
+    for record in records:
+        yield json.dumps(record) + '\n'
+
+
+def from_ndjson(lines):
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def to_csv(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_FIELDS)
+    writer.writeheader()
+
+    for record in records:
+        writer.writerow({field: json.dumps(value) if field in CSV_JSON_FIELDS else value
+                         for field, value in record.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    # the header when there were no records
+    yield buffer.getvalue()
+
+
+def from_csv(lines):
+    for row in csv.DictReader(lines):
+        yield {field: json.loads(value) if field in CSV_JSON_FIELDS else value
+               for field, value in row.items() if value not in ('', None)}
+
+
+async def aiter_chunks(strings):
+    """An async iterator of a sync iterator of strings, joined CHUNK_SIZE
+    at a time
+
+    Each chunk is read in Django's sync thread, where the queries of the
+    iterator can run.
+    """
+    strings = iter(strings)
+
+    def read_chunk():
+        return ''.join(islice(strings, CHUNK_SIZE))
+
+    while chunk := await sync_to_async(read_chunk)():
+        yield chunk
+
+
+# errors readers raise for a malformed file
+READ_ERRORS = (ValueError, csv.Error)
+
+# writer, reader and content type of each file format
+FORMATS = {
+    'ndjson': (to_ndjson, from_ndjson, 'application/x-ndjson'),
+    'csv': (to_csv, from_csv, 'text/csv'),
+}
+
+
+def valid_name(value, model, field='name'):
+    """Whether value fits in a model's name column"""
+    return isinstance(value, str) and 0 < len(value) <= model._meta.get_field(field).max_length
+
+
+class TroveImporter:
+    """Add the records of an export to a user's trove, a chunk at a time
+
+    Each chunk is written with bulk inserts, all in one transaction so a
+    file that turns out to be malformed part way through adds nothing.
+    Records that cannot be imported, e.g. a show on an unknown streaming
+    service, are skipped and counted.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.tags = dict(Tag.objects.filter(user=user).values_list('tag', 'pk'))
+        # authors are unique per user ignoring case
+        self.authors = {name.lower(): pk for name, pk in
+                        Author.objects.filter(user=user).values_list('name', 'pk')}
+        self.platforms = dict(Platform.objects.values_list('name', 'pk'))
+        self.streaming_services = dict(StreamingService.objects.values_list('service', 'pk'))
+        self.counts = Counter()
+        self.touched_tags = set()
+
+    @transaction.atomic
+    def run(self, records):
+        """Import an iterable of records
+
+        Raises:
+            ValueError, csv.Error -- if the records cannot be read, see
+            READ_ERRORS; nothing is imported then
+
+        Returns:
+            dict -- number of imported records per type, and skipped records
+        """
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, CHUNK_SIZE))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+
+        if self.touched_tags:
+            TagUsage.objects.refresh(self.touched_tags)
+        # new tags and authors skipped the signals that move cached versions on
+        bump_generation(self.user.id)
+
+        return dict(self.counts)
+
+    def import_chunk(self, chunk):
+        by_type = defaultdict(list)
+        for record in chunk:
+            record_type = record.get('type') if isinstance(record, dict) else None
+            if record_type in MEDIA_MODELS or record_type in RECOMMENDATIONS or record_type == 'tag':
+                by_type[record_type].append(record)
+            else:
+                self.counts['skipped'] += 1
+
+        tag_names = [record.get('name') for record in by_type['tag']]
+        valid_tags = sum(valid_name(name, Tag, 'tag') for name in tag_names)
+        self.counts['tag'] += valid_tags
+        self.counts['skipped'] += len(tag_names) - valid_tags
+
+        for media_type in MEDIA_MODELS:
+            for record in by_type[media_type]:
+                tags = record.get('tags', [])
+                record['tags'] = tags = tags if isinstance(tags, list) else []
+                tag_names.extend(tags)
+        self.add_named(Tag, 'tag', self.tags,
+                       [name for name in tag_names if valid_name(name, Tag, 'tag')])
+
+        self.add_named(Author, 'name', self.authors,
+                       [record.get('author') for record in by_type['book']
+                        if valid_name(record.get('author'), Author)], fold=str.lower)
+
+        for media_type, model in MEDIA_MODELS.items():
+            self.add_media(model, by_type[media_type])
+
+        for record_type, (model, media_field) in RECOMMENDATIONS.items():
+            self.add_recommendations(model, media_field, by_type[record_type])
+
+    def add_named(self, model, field, known, names, fold=str):
+        """Bulk insert the names a user does not have a row for yet, known
+        maps fold(name) to the pk of each row
+        """
+        missing = {}
+        for name in names:
+            if fold(name) not in known:
+                missing.setdefault(fold(name), name)
+        if not missing:
+            return
+
+        if model is Author:
+            # authors are unique by the database's LOWER(), which may fold
+            # less than str.lower does
+            rows = Author.objects.named_any(missing.values())
+        else:
+            rows = model.objects.filter(**{f'{field}__in': list(missing.values())})
+        rows = rows.filter(user=self.user)
+
+        model.objects.bulk_create(
+            [model(user=self.user, **{field: name}) for name in missing.values()],
+            ignore_conflicts=True)
+        # rows inserted ignoring conflicts get no pk, so read them back
+        rows = list(rows)
+        if model is Tag:
+            TagUsage.objects.bulk_create([TagUsage(tag=tag) for tag in rows],
+                                         ignore_conflicts=True)
+
+        known.update((fold(getattr(row, field)), row.pk) for row in rows)
+
+    def media_fields(self, model, record):
+        """Model fields of a media record, or None if it cannot be imported"""
+        if not valid_name(record.get('name'), model):
+            return None
+
+        fields = {'name': record['name'], 'current': bool(record.get('current'))}
+        if model is Game:
+            fields['multiplayer_capable'] = bool(record.get('multiplayer_capable'))
+        elif model is Book:
+            author = record.get('author')
+            fields['author_id'] = self.authors.get(author.lower()) if isinstance(author, str) else None
+            if fields['author_id'] is None:
+                return None
+        elif model is Show:
+            fields['streaming_service_id'] = self.streaming_services.get(
+                record.get('streaming_service'))
+            if fields['streaming_service_id'] is None:
+                return None
+
+        return fields
+
+    def add_media(self, model, records):
+        rows = []
+        imported = []
+        for record in records:
+            fields = self.media_fields(model, record)
+            if fields is None:
+                self.counts['skipped'] += 1
+                continue
+            rows.append(model(user=self.user, **fields))
+            imported.append(record)
+
+        created = model.objects.bulk_create(rows)
+
+        for field in model._meta.many_to_many:
+            known = self.tags if field.name == 'tags' else self.platforms
+            through = field.remote_field.through
+            media_column = f'{field.m2m_field_name()}_id'
+            related_column = f'{field.m2m_reverse_field_name()}_id'
+
+            related_ids = [
+                [known[name] for name in dict.fromkeys(record.get(field.name) or [])
+                 if isinstance(name, str) and name in known]
+                for record in imported
+            ]
+            through.objects.bulk_create(
+                [through(**{media_column: instance.pk, related_column: related_pk})
+                 for instance, ids in zip(created, related_ids)
+                 for related_pk in ids])
+
+            if field.name == 'tags':
+                self.touched_tags.update(pk for ids in related_ids for pk in ids)
+
+        search.index(created)
+        self.counts[model._meta.model_name] += len(created)
+
+    def add_recommendations(self, model, media_field, records):
+        if not records:
+            return
+
+        media_model = MEDIA_MODELS[media_field]
+        owners = {record.get('owner') for record in records}
+        names = {record.get('name') for record in records}
+        # several matches for an owner and name resolve to the oldest one
+        media = {}
+        for owner, name, pk in media_model.objects.filter(
+                user__username__in=owners, name__in=names
+        ).order_by('-pk').values_list('user__username', 'name', 'pk'):
+            media[(owner, name)] = pk
+        senders = dict(User.objects.filter(
+            username__in={record.get('sender') for record in records}
+        ).values_list('username', 'pk'))
+
+        rows = []
+        for record in records:
+            media_pk = media.get((record.get('owner'), record.get('name')))
+            sender_pk = senders.get(record.get('sender'))
+            if media_pk is None or sender_pk is None:
+                self.counts['skipped'] += 1
+                continue
+            rows.append(model(**{
+                f'{media_field}_id': media_pk,
+                'sender_id': sender_pk,
+                'recipient': self.user,
+                'message': str(record.get('message', '')),
+                'read': bool(record.get('read'))
+            }))
+
+        model.objects.bulk_create(rows)
+        self.counts[f'{media_field}Recommendation'] += len(rows)
@@ -1,12 +1,20 @@
+from .async_reads import (async_get, book_list, book_notify, game_list,
+                          game_notify, show_list, show_notify, tag_list,
+                          unread)
 from .auth import login_user, register_user
 from .author import AuthorView
 from .book import BookView
 from .book_recommendation import BookRecommendationView
+from .cache_stats import CacheStatsView
+from .events import recommendation_events, recommendation_events_ticket
 from .show_recommendation import ShowRecommendationView
 from .game_recommendation import GameRecommendationView
 from .game import GameView
 from .platform import PlatformView
+from .recommendation import RecommendationView
+from .search import SearchView
 from .show import ShowView
 from .streaming_service import StreamingServiceView
 from .tag import TagView
+from .trove import TroveView
 from .user import UserView
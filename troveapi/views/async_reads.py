@@ -0,0 +1,285 @@
+"""View module for the hot read endpoints, served on the async ORM
+
+Under ASGI a sync view holds a worker thread for its whole request. The
+media and tag lists, the notify checks and the unread long poll are async
+views instead, so one worker can serve many slow or waiting clients. Their
+responses match the ViewSet actions they stand in for, and the lists share
+list_cache with them. Other methods on the same URLs still go to the
+ViewSets, see async_get.
+
+Nothing here blocks the loop on I/O: the database and the Django cache are
+read through their async APIs, and list_cache and the token cache are
+process local memory.
+"""
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from troveapi.cache import (acollection_version, astreamed_list,
+                            auser_version, cache_response, cached_lookup,
+                            not_modified, streamed_list, streams_list)
+from troveapi.events import subscribe
+from troveapi.models import (Book, BookRecommendation, Game,
+                             GameRecommendation, Show, ShowRecommendation)
+from troveapi.routers import apinned_to_primary, read_alias, replica_alias
+from troveapi.views.book import BookView, filtered_books
+from troveapi.views.fast_serializers import (book_data, game_data, show_data,
+                                            tag_data)
+from troveapi.views.game import GameView, filtered_games
+from troveapi.views.pagination import KeysetPagination
+from troveapi.views.recommendation import aunread_counts
+from troveapi.views.show import ShowView, filtered_shows
+from troveapi.views.tag import TagView, filtered_tags
+
+# longest an unread request may be held open waiting for a change, in seconds
+MAX_WAIT = 25
+# seconds between checks for changes no event announces, like reads
+POLL_INTERVAL = 5
+
+
+def served_over_asgi(request):
+    """Whether a request came from an ASGI server, where an async view
+    waiting on it holds no worker thread
+    """
+    return isinstance(request, ASGIRequest)
+
+
+def poll_window(request):
+    """The deadline and since version of a long polling unread request
+
+    Under WSGI the deadline is now, as waiting would hold a worker thread.
+    """
+    try:
+        wait = min(max(float(request.query_params.get('wait', 0)), 0), MAX_WAIT)
+    except ValueError:
+        wait = 0
+    if not served_over_asgi(request._request):
+        wait = 0
+    return time.monotonic() + wait, request.query_params.get('since', None)
+
+
+def loop_rendered(response):
+    """A JSON Response rendered on the event loop, as an HttpResponse
+
+    Django renders a response with a render method in a thread of its sync
+    executor, even when it is already rendered, and a JSON body is cheap
+    enough not to wait for one. Other responses, like the browsable API,
+    are left to Django.
+    """
+    if not isinstance(response, Response) or not isinstance(response.accepted_renderer, JSONRenderer):
+        return response
+
+    response.render()
+    rendered = HttpResponse(response.content, status=response.status_code)
+    for header, value in response.items():
+        rendered[header] = value
+    return rendered
+
+
+class AsyncReadView(APIView):
+    """APIView whose handlers are coroutines, run on the event loop
+
+    Requests go through the authentication, permission, throttle and
+    content negotiation classes the ViewSets use. Authenticators with an
+    aauthenticate method, like CachedTokenAuthentication, run on the loop,
+    others and throttles, which keep their history in the cache, in a
+    thread. Reads go to the replica unless the user wrote recently.
+    """
+
+    async def aperform_authentication(self, request):
+        """perform_authentication for async views
+
+        Raises:
+            AuthenticationFailed -- if the credentials sent are not valid
+        """
+        anonymous = (api_settings.UNAUTHENTICATED_USER and api_settings.UNAUTHENTICATED_USER(),
+                     api_settings.UNAUTHENTICATED_TOKEN and api_settings.UNAUTHENTICATED_TOKEN())
+        for authenticator in request.authenticators:
+            authenticate = getattr(authenticator, 'aauthenticate', None)
+            if authenticate is None:
+                authenticate = sync_to_async(authenticator.authenticate)
+            try:
+                credentials = await authenticate(request)
+            except exceptions.APIException:
+                request.user, request.auth = anonymous
+                raise
+
+            if credentials is not None:
+                request.user, request.auth = credentials
+                return
+
+        request.user, request.auth = anonymous
+
+    async def ainitial(self, request, *args, **kwargs):
+        """initial for async views"""
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        if self.get_throttles():
+            await sync_to_async(self.check_throttles)(request)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+
+            handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            token = read_alias.set(
+                None if await apinned_to_primary(request.user.id) else replica_alias())
+            try:
+                response = await handler(request, *args, **kwargs)
+            finally:
+                read_alias.reset(token)
+        except Exception as exc:  # pylint: disable=broad-except
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return loop_rendered(self.response)
+
+
+def async_api_view(view):
+    """Turn an async function taking a DRF Request into a GET only
+    AsyncReadView, like DRF's api_view does for sync ones
+    """
+    async def get(self, request, *args, **kwargs):
+        return await view(request, *args, **kwargs)
+
+    wrapped = type(view.__name__, (AsyncReadView,), {
+        'get': get, '__doc__': view.__doc__, '__module__': view.__module__})
+    return wrapped.as_view()
+
+
+def async_get(async_view, viewset, actions, basename):
+    """View of a ViewSet route that serves GET requests with async_view
+
+    Returns:
+        function -- async view to route the ViewSet's URL to
+    """
+    sync_view = viewset.as_view(actions, basename=basename, detail=False)
+
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET':
+            return await async_view(request, *args, **kwargs)
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+    # like the ViewSets, which authenticate by token rather than session
+    view.csrf_exempt = True
+    return view
+
+
+async def media_list(request, name, model, filtered, row_data):
+    """The async counterpart of a media ViewSet's cached list action"""
+    version = await acollection_version(request, model, request.auth.user)
+    if streams_list(request, version):
+        # under WSGI Django would read an async body whole before sending it
+        stream = astreamed_list if served_over_asgi(request._request) else streamed_list
+        return not_modified(request, version) or stream(
+            request, version, filtered(request), row_data)
+
+    key, response = cached_lookup(request, name, version)
+    if response is not None:
+        return response
+
+    data = await KeysetPagination().alist_data(filtered(request), request, row_data)
+    return cache_response(request, key, version, Response(data))
+
+
+@async_api_view
+async def game_list(request):
+    '''Handles GET requests to get all games, see GameView.list'''
+    return await media_list(request, GameView.list.__qualname__, Game,
+                            filtered_games, game_data)
+
+
+@async_api_view
+async def book_list(request):
+    '''Handles GET requests to get all books, see BookView.list'''
+    return await media_list(request, BookView.list.__qualname__, Book,
+                            filtered_books, book_data)
+
+
+@async_api_view
+async def show_list(request):
+    '''Handles GET requests to get all shows, see ShowView.list'''
+    return await media_list(request, ShowView.list.__qualname__, Show,
+                            filtered_shows, show_data)
+
+
+@async_api_view
+async def tag_list(request):
+    '''Handles GET requests to get all tags, see TagView.list'''
+    version = await auser_version(request, request.auth.user.id)
+    key, response = cached_lookup(request, TagView.list.__qualname__, version)
+    if response is not None:
+        return response
+
+    tags = [tag async for tag in filtered_tags(request)]
+    return cache_response(request, key, version, Response([tag_data(tag) for tag in tags]))
+
+
+async def notify(request, model):
+    new = await model.objects.unread(request.auth.user).aexists()
+    return Response({'new': new})
+
+
+@async_api_view
+async def book_notify(request):
+    '''Handles GET requests for whether there are unread book recommendations'''
+    return await notify(request, BookRecommendation)
+
+
+@async_api_view
+async def game_notify(request):
+    '''Handles GET requests for whether there are unread game recommendations'''
+    return await notify(request, GameRecommendation)
+
+
+@async_api_view
+async def show_notify(request):
+    '''Handles GET requests for whether there are unread show recommendations'''
+    return await notify(request, ShowRecommendation)
+
+
+@async_api_view
+async def unread(request):
+    '''Handles GET requests for the unread recommendation counts, see
+    RecommendationView.unread
+
+    Long polling: with wait=<seconds> and since=<version of the last
+    response> the request is held open, up to MAX_WAIT seconds, until the
+    counts no longer match that version. A new recommendation ends the wait
+    as soon as it is published, other changes like reads are seen within
+    POLL_INTERVAL seconds. Under WSGI it answers at once.
+    '''
+    deadline, since = poll_window(request)
+
+    # subscribed before the counts are read so no arrival goes unnoticed
+    async with subscribe(request.auth.user.id) as events:
+        counts = await aunread_counts(request.auth.user)
+        while counts['version'] == since and (remaining := deadline - time.monotonic()) > 0:
+            try:
+                await asyncio.wait_for(events.get(), min(POLL_INTERVAL, remaining))
+            except asyncio.TimeoutError:
+                pass
+            counts = await aunread_counts(request.auth.user)
+
+    return Response(counts)
@@ -3,23 +3,29 @@ from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import serializers, status
 from troveapi.models import Author
+from django.db import IntegrityError, transaction
 from django.db.models import Q, Count
-from django.contrib.auth.models import User
 from rest_framework.decorators import action
+from troveapi.views.replica import ReplicaReadMixin
 
 
-class AuthorView(ViewSet):
+class AuthorView(ReplicaReadMixin, ViewSet):
     """Trove author view"""
 
     def retrieve(self, request, pk):
-        """Handle GET requests for single author
+        """Handle GET requests for single author, or for the author named by
+        the name query parameter ignoring case
 
         Returns:
             Response -- JSON serialized author
         """
         try:
+            authors = Author.objects.filter(user=request.auth.user)
             name_text = self.request.query_params.get('name', None)
-            author = Author.objects.get(name__iexact=name_text)
+            if name_text:
+                author = authors.named(name_text).get()
+            else:
+                author = authors.get(pk=pk)
             serializer = AuthorSerializer(author)
             return Response(serializer.data)
         except Author.DoesNotExist as ex:
@@ -37,8 +43,7 @@ class AuthorView(ViewSet):
         name_text = self.request.query_params.get('name', None)
 
         if name_text:
-            authors = Author.objects.filter(
-                name__iexact=name_text, user=request.auth.user)
+            authors = Author.objects.named(name_text).filter(user=request.auth.user)
 
         serializer = AuthorSerializer(authors, many=True)
 
@@ -51,14 +56,38 @@ class AuthorView(ViewSet):
             Response -- JSON serialized author instance
         """
 
-        user = User.objects.get(pk=request.auth.user.id)
+        user = request.auth.user
 
         serializer = CreateAuthorSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(user=user)
+
+        try:
+            with transaction.atomic():
+                serializer.save(user=user)
+        except IntegrityError:
+            return Response({'message': 'You already have an author with this name'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(methods=['post'], detail=False)
+    def resolve(self, request):
+        """Handle POST requests to get the author with a name, ignoring case,
+        or create it if the user has none
+
+        Returns:
+            Response -- JSON serialized author instance, with status 201 if
+            it was created
+        """
+        serializer = CreateAuthorSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        author, created = Author.objects.resolve(
+            request.auth.user, serializer.validated_data['name'])
+
+        return Response(CreateAuthorSerializer(author).data,
+                        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
     @action(methods=['get'], detail=False)
     def active_current(self, request):
         """Only get actors back that are currently active on a book"""
@@ -0,0 +1,226 @@
+"""Batch create, update and delete shared by the game, book and show views"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from troveapi import search
+from troveapi.cache import bump_generation
+from troveapi.models import TagUsage
+from troveapi.signals import deleting_in_bulk
+
+
+class PrefetchedRows:
+    """Stands in for a related field's queryset with rows fetched up front
+
+    PrimaryKeyRelatedField calls queryset.get(pk=...) once per item, which
+    for a batch of thousands is thousands of queries.
+    """
+
+    def __init__(self, model, rows):
+        self.model = model
+        self.rows = rows
+
+    def get(self, pk):
+        try:
+            return self.rows[int(pk)]
+        except KeyError as ex:
+            raise self.model.DoesNotExist from ex
+
+
+def owned_by(queryset, user):
+    """Narrow queryset to the user's rows if its model belongs to users,
+    shared tables like StreamingService are left whole
+    """
+    if any(f.name == 'user' for f in queryset.model._meta.fields):
+        return queryset.filter(user=user)
+    return queryset
+
+
+def prefetch_related_fields(list_serializer, items, user):
+    """Resolve every foreign key posted in the batch with one query per field,
+    among the rows the user may link to
+    """
+    for name, field in list_serializer.child.fields.items():
+        if field.read_only or not isinstance(field, serializers.PrimaryKeyRelatedField):
+            continue
+
+        posted = set()
+        for item in items:
+            try:
+                posted.add(int(item.get(name)))
+            except (TypeError, ValueError):
+                pass
+
+        queryset = owned_by(field.get_queryset(), user)
+        field.queryset = PrefetchedRows(queryset.model, queryset.in_bulk(posted))
+
+
+def validate_items(serializer_class, items, user):
+    """Validate a list of the user's items with one serializer
+
+    Returns:
+        tuple -- validated data and errors, both one entry per item
+    """
+    list_serializer = serializer_class(data=items, many=True)
+    prefetch_related_fields(list_serializer, items, user)
+
+    if list_serializer.is_valid():
+        return list_serializer.validated_data, [{} for _ in items]
+
+    errors = list_serializer.errors
+    if isinstance(errors, dict):
+        # newer DRF versions key list errors by index instead of padding a list
+        errors = [errors.get(index, {}) for index in range(len(items))]
+
+    return [None for _ in items], [dict(item_errors) for item_errors in errors]
+
+
+def is_id(value):
+    """Whether a posted value is an integer id, JSON true and false are not"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def related_ids(item, field_name, errors):
+    """The list of ids posted for a many to many field, or None if absent"""
+    ids = item.get(field_name, None)
+    if ids is None:
+        return None
+
+    if not isinstance(ids, list) or not all(is_id(pk) for pk in ids):
+        errors[field_name] = ['Expected a list of ids.']
+        return None
+
+    return ids
+
+
+def check_related(user, m2m_fields, links, errors):
+    """Check every many to many id posted in the batch with one query per field"""
+    for field in m2m_fields:
+        posted = {pk for item_links in links for pk in item_links[field.name] or []}
+        found = owned_by(field.related_model.objects.filter(pk__in=posted), user)
+        missing = posted - set(found.values_list('pk', flat=True))
+
+        for item_links, item_errors in zip(links, errors):
+            unknown = sorted(set(item_links[field.name] or []) & missing)
+            if unknown:
+                item_errors.setdefault(field.name, []).append(
+                    f'Invalid pk {unknown} - object does not exist.')
+
+
+def run_batch(request, model, serializer_class):
+    """Create, update and delete many of a user's media rows in one transaction
+
+    The request body holds up to three arrays: "create" with items shaped like
+    a POST body, "update" with items shaped like a PUT body plus their "id",
+    and "delete" with ids. Every item is validated before anything is written,
+    and if any fails the response lists the errors per item and nothing is
+    saved. Rows and their through table links are written with bulk inserts.
+
+    Returns:
+        Response -- ids of the created, updated and deleted rows
+    """
+    user = request.auth.user
+    if not isinstance(request.data, dict):
+        return Response({'message': 'Expected an object with create, update and delete'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    create_items = request.data.get('create', [])
+    update_items = request.data.get('update', [])
+    delete_ids = request.data.get('delete', [])
+
+    if not (isinstance(create_items, list) and isinstance(update_items, list) and
+            all(isinstance(item, dict) for item in create_items + update_items)):
+        return Response({'message': 'Expected create and update to be lists of objects'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(delete_ids, list) or not all(is_id(pk) for pk in delete_ids):
+        return Response({'message': 'Expected delete to be a list of ids'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    m2m_fields = model._meta.many_to_many
+
+    create_data, create_errors = validate_items(serializer_class, create_items, user)
+    update_data, update_errors = validate_items(serializer_class, update_items, user)
+    delete_errors = [{} for _ in delete_ids]
+
+    create_links = [{field.name: related_ids(item, field.name, errors) for field in m2m_fields}
+                    for item, errors in zip(create_items, create_errors)]
+    update_links = [{field.name: related_ids(item, field.name, errors) for field in m2m_fields}
+                    for item, errors in zip(update_items, update_errors)]
+    check_related(user, m2m_fields, create_links + update_links, create_errors + update_errors)
+
+    existing = model.objects.filter(
+        user=user,
+        pk__in=[item['id'] for item in update_items if is_id(item.get('id'))] + delete_ids
+    ).in_bulk()
+    for item, errors in zip(update_items, update_errors):
+        if not is_id(item.get('id')) or item['id'] not in existing:
+            errors['id'] = ['Not found.']
+    for pk, errors in zip(delete_ids, delete_errors):
+        if pk not in existing:
+            errors['id'] = ['Not found.']
+
+    if any(any(errors) for errors in (create_errors, update_errors, delete_errors)):
+        return Response({
+            'create': create_errors,
+            'update': update_errors,
+            'delete': delete_errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        created = model.objects.bulk_create(
+            [model(user=user, **data) for data in create_data], batch_size=500)
+
+        now = timezone.now()
+        updated = []
+        update_fields = {'last_modified'}
+        for item, data in zip(update_items, update_data):
+            instance = existing[item['id']]
+            for attr, value in data.items():
+                setattr(instance, attr, value)
+                update_fields.add(attr)
+            instance.last_modified = now
+            updated.append(instance)
+        model.objects.bulk_update(updated, update_fields, batch_size=500)
+
+        deleted = [pk for pk in delete_ids if pk in existing]
+
+        # tags whose usage counts may change: the updated rows' current tags,
+        # in case they moved between current and queued, the deleted rows'
+        # tags and every posted tag
+        touched_tags = set(model.tags.through.objects.filter(
+            **{f'{model._meta.model_name}__in': [instance.pk for instance in updated] + deleted}
+        ).values_list('tag_id', flat=True))
+        touched_tags.update(
+            pk for links in create_links + update_links for pk in links['tags'] or [])
+
+        for field in m2m_fields:
+            through = field.remote_field.through
+            media_column = f'{field.m2m_field_name()}_id'
+            related_column = f'{field.m2m_reverse_field_name()}_id'
+
+            replaced = [instance.pk for instance, links in zip(updated, update_links)
+                        if links[field.name] is not None]
+            through.objects.filter(**{f'{media_column}__in': replaced}).delete()
+
+            through.objects.bulk_create(
+                [through(**{media_column: instance.pk, related_column: related_pk})
+                 for instance, links in zip(created + updated, create_links + update_links)
+                 for related_pk in dict.fromkeys(links[field.name] or [])],
+                batch_size=500)
+
+        with deleting_in_bulk():
+            model.objects.filter(pk__in=deleted).delete()
+
+        # bulk writes skip the model signals that keep derived data current
+        search.index(created + updated)
+        search.remove(model, deleted)
+        if touched_tags:
+            TagUsage.objects.refresh(touched_tags)
+        if deleted:
+            bump_generation(user.id)
+
+    return Response({
+        'created': [instance.pk for instance in created],
+        'updated': [instance.pk for instance in updated],
+        'deleted': deleted
+    })
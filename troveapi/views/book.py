@@ -1,14 +1,52 @@
 """View module for handling requests about books"""
-from django.contrib.auth.models import User
+from django.db import transaction
 from django.db.models import Q
 from rest_framework import serializers, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
-from troveapi.models import Book
+from troveapi import search
+from troveapi.cache import (add_validators, cached_list, not_modified,
+                            row_version)
+from troveapi.models import Author, Book
+from troveapi.views.author import CreateAuthorSerializer
+from troveapi.views.batch import run_batch
+from troveapi.views.fast_serializers import book_data
+from troveapi.views.pagination import KeysetPagination
+from troveapi.views.replica import ReplicaReadMixin
 from troveapi.views.user import UserSerializer
 
 
-class BookView(ViewSet):
+def filtered_books(request):
+    """The user's books matching the filters of a list request, newest first"""
+    search_text = request.query_params.get('search', None)
+    # current must be passed in as string, not boolean
+    # due to diff between True and true in Python
+    current_boolean = request.query_params.get('current', None)
+    # can be passed as int or string
+    author_id = request.query_params.get('authorId', None)
+    tag_list = request.query_params.getlist('tags', '')
+    # tagMatch=any returns media with any of the tags instead of all of them
+    tag_match = request.query_params.get('tagMatch', 'all')
+
+    filter_params = Q(user=request.auth.user)
+    if search_text:
+        filter_params &= search.name_filter(Book, request.auth.user, search_text)
+    if current_boolean:
+        filter_params &= Q(current=current_boolean)
+    if author_id:
+        filter_params &= Q(author__id=author_id)
+
+    books = Book.objects.with_related().filter(
+        filter_params).order_by(*KeysetPagination.ordering)
+
+    if tag_list:
+        books = books.tagged(tag_list, match_all=tag_match != 'any')
+
+    return books
+
+
+class BookView(ReplicaReadMixin, ViewSet):
     """Trove book view"""
 
     def retrieve(self, request, pk):
@@ -17,59 +55,61 @@ class BookView(ViewSet):
         Returns:
             Response -- JSON serialized book
         """
+        version = row_version(request, Book, pk)
+        unchanged = not_modified(request, version)
+        if unchanged:
+            return unchanged
+
         try:
-            book = Book.objects.get(pk=pk)
+            book = Book.objects.with_related().get(pk=pk)
             serializer = BookSerializer(book)
-            return Response(serializer.data)
+            return add_validators(Response(serializer.data), version)
         except Book.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
+    @cached_list(Book, filtered_books, book_data)
     def list(self, request):
         """Handle GET requests to get all books
 
+        search matches books with a word in their name starting with each
+        searched word, e.g. "wit" finds "The Witcher" but "itcher" does not.
+
         Returns:
             Response -- JSON serialized list of books
         """
-        search_text = request.query_params.get('search', None)
-        # current must be passed in as string, not boolean
-        # due to diff between True and true in Python
-        current_boolean = request.query_params.get('current', None)
-        # can be passed as int or string
-        author_id = request.query_params.get('authorId', None)
-        tag_list = request.query_params.getlist('tags', '')
-
-        filter_params = Q(user=request.auth.user)
-        if search_text:
-            filter_params &= Q(name__contains=search_text)
-        if current_boolean:
-            filter_params &= Q(current=current_boolean)
-        if author_id:
-            filter_params &= Q(author__id=author_id)
-
-        books = Book.objects.filter(filter_params).order_by('-last_modified')
-
-        if tag_list:
-            for tag_id in tag_list:
-                books = books.filter(tags__id=tag_id)
-
-        serializer = BookSerializer(books, many=True)
-
-        return Response(serializer.data)
+        books = filtered_books(request)
+        return Response(KeysetPagination().list_data(books, request, book_data))
 
     def create(self, request):
         """Handle POST operations
 
+        An "authorName" instead of "author" files the book under the user's
+        author of that name, ignoring case, creating it if needed.
+
         Returns:
             Response -- JSON serialized book instance
         """
 
-        user = User.objects.get(pk=request.auth.user.id)
+        user = request.auth.user
 
-        serializer = CreateBookSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        book = serializer.save(user=user)
+        with transaction.atomic():
+            data = request.data
+            author_name = data.get('authorName', None)
+            if author_name is not None and 'author' not in data:
+                author_serializer = CreateAuthorSerializer(data={'name': author_name})
+                if not author_serializer.is_valid():
+                    return Response({'authorName': author_serializer.errors['name']},
+                                    status=status.HTTP_400_BAD_REQUEST)
+
+                author, _ = Author.objects.resolve(user, author_serializer.validated_data['name'])
+                data = data.copy()
+                data['author'] = author.pk
+
+            serializer = CreateBookSerializer(data=data)
+            serializer.is_valid(raise_exception=True)
+            book = serializer.save(user=user)
 
-        book.tags.set(request.data["tags"])
+            book.tags.set(request.data["tags"])
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -85,9 +125,10 @@ class BookView(ViewSet):
 
             serializer = CreateBookSerializer(book, data=request.data)
             serializer.is_valid(raise_exception=True)
-            updated_book = serializer.save()
-
-            updated_book.tags.set(request.data["tags"])
+            # one transaction, so the tags' usage moves with the book
+            with transaction.atomic():
+                updated_book = serializer.save()
+                updated_book.tags.set(request.data["tags"])
 
             return Response(None, status=status.HTTP_204_NO_CONTENT)
         except Book.DoesNotExist as ex:
@@ -106,6 +147,15 @@ class BookView(ViewSet):
         except Book.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(methods=['post'], detail=False)
+    def batch(self, request):
+        """Handle POST requests to create, update and delete many books at once
+
+        Returns:
+            Response -- ids of the created, updated and deleted books
+        """
+        return run_batch(request, Book, CreateBookSerializer)
+
 
 class BookSerializer(serializers.ModelSerializer):
     """JSON serializer for book types
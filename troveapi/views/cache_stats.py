@@ -0,0 +1,18 @@
+"""View module for handling requests about the response caches"""
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+from troveapi.cache import list_cache
+
+
+class CacheStatsView(ViewSet):
+    """Trove cache statistics view, for staff only"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def list(self, request):
+        """Handle GET requests for the list cache statistics of this process
+
+        Returns:
+            Response -- JSON serialized hit, miss and size counters
+        """
+        return Response(list_cache.stats())
@@ -0,0 +1,114 @@
+"""View module for pushing events to a user as server-sent events
+
+Browsers cannot set headers on an EventSource, and a token in the URL
+would end up in access logs. Instead a client posts to
+recommendations/events/ticket with its token and opens the stream with
+?ticket=. A ticket opens one stream and expires after TICKET_MAX_AGE
+seconds, so a logged one is of no use. Clients that can set headers may
+send their token in the Authorization header instead.
+"""
+import asyncio
+import json
+import secrets
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from troveapi.authentication import CachedTokenAuthentication
+from troveapi.events import subscribe
+from troveapi.views.async_reads import served_over_asgi
+
+# seconds between comments that keep idle connections from being closed
+KEEPALIVE = 15
+# milliseconds browsers wait before reconnecting a dropped stream
+RETRY = 5000
+# seconds a ticket can be redeemed for a stream
+TICKET_MAX_AGE = 30
+
+
+def ticket_key(ticket):
+    return f'trove:events:ticket:{ticket}'
+
+
+def redeem_ticket(ticket):
+    """Id of the user a ticket was issued to, None if it is unknown, expired
+    or already used
+    """
+    key = ticket_key(ticket)
+    user_id = cache.get(key)
+    # only the request that deletes the ticket gets to use it
+    if user_id is None or not cache.delete(key):
+        return None
+    return user_id
+
+
+def authenticated_user_id(request):
+    """Id of the user of the token in the Authorization header, or of the
+    ticket in ?ticket=
+    """
+    try:
+        credentials = CachedTokenAuthentication().authenticate(request)
+    except exceptions.AuthenticationFailed:
+        return None
+
+    if credentials is not None:
+        return credentials[0].id
+    if 'ticket' in request.GET:
+        return redeem_ticket(request.GET['ticket'])
+    return None
+
+
+async def event_stream(user_id):
+    yield f'retry: {RETRY}\n\n'
+
+    async with subscribe(user_id) as events:
+        while True:
+            try:
+                event = await asyncio.wait_for(events.get(), KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+@api_view(['POST'])
+def recommendation_events_ticket(request):
+    '''Handles POST requests for a ticket to open the authenticated user's
+    event stream with
+
+    Returns:
+        Response -- the ticket and the seconds it can be used for
+    '''
+    ticket = secrets.token_urlsafe(32)
+    cache.set(ticket_key(ticket), request.auth.user.id, TICKET_MAX_AGE)
+    return Response({'ticket': ticket, 'expires': TICKET_MAX_AGE})
+
+
+@require_GET
+async def recommendation_events(request):
+    '''Streams the new recommendations of the authenticated user
+
+    The stream never ends, so it is only served under ASGI. Under WSGI it
+    would hold a worker thread for as long as the client stays connected.
+
+    Method arguments:
+        request -- The full HTTP request object
+    '''
+    if not served_over_asgi(request):
+        return JsonResponse({'detail': 'Event streams need an ASGI server.'}, status=503)
+
+    user_id = await sync_to_async(authenticated_user_id)(request)
+    if user_id is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'},
+                            status=401)
+
+    response = StreamingHttpResponse(event_stream(user_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # keep proxies like nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,56 @@
+"""Sending one recommendation to many recipients, shared by the book, game
+and show recommendation views"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+from troveapi.events import publish, recommendation_event
+
+MAX_RECIPIENTS = 100
+
+
+def fan_out(request, model, serializer_class):
+    """Create a recommendation for every user in the "recipients" list
+
+    The media and message are validated once, every recipient is checked
+    with one query, and the rows are written with one bulk insert. Their
+    recipients' event streams are told once the transaction commits.
+
+    Returns:
+        Response -- JSON serialized list of the created recommendations
+    """
+    recipient_ids = request.data.get('recipients')
+    if (not isinstance(recipient_ids, list) or not recipient_ids or
+            not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in recipient_ids)):
+        return Response({'recipients': ['Expected a list of user ids.']},
+                        status=status.HTTP_400_BAD_REQUEST)
+    recipient_ids = list(dict.fromkeys(recipient_ids))
+    if len(recipient_ids) > MAX_RECIPIENTS:
+        return Response({'recipients': [f'At most {MAX_RECIPIENTS} recipients.']},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    data = {key: value for key, value in request.data.items()
+            if key not in ('recipient', 'recipients')}
+    serializer = serializer_class(data=data)
+    # recipients are checked together below instead of one lookup each
+    serializer.fields.pop('recipient')
+    serializer.is_valid(raise_exception=True)
+
+    found = set(User.objects.filter(pk__in=recipient_ids).values_list('pk', flat=True))
+    missing = [pk for pk in recipient_ids if pk not in found]
+    if missing:
+        return Response({'recipients': [f'Invalid pk {missing} - object does not exist.']},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    sender = request.auth.user
+    with transaction.atomic():
+        recommendations = model.objects.bulk_create(
+            [model(sender=sender, recipient_id=pk, **serializer.validated_data)
+             for pk in recipient_ids])
+
+        # bulk inserts skip the post_save hook that publishes single sends
+        for recommendation in recommendations:
+            publish(recommendation.recipient_id, [recommendation_event(recommendation)])
+
+    return Response(serializer_class(recommendations, many=True).data,
+                    status=status.HTTP_201_CREATED)
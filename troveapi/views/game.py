@@ -1,14 +1,55 @@
 """View module for handling requests about games"""
-from django.contrib.auth.models import User
+from django.db import transaction
 from django.db.models import Q
 from rest_framework import serializers, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
+from troveapi import search
+from troveapi.cache import (add_validators, cached_list, not_modified,
+                            row_version)
 from troveapi.models import Game
+from troveapi.views.batch import run_batch
+from troveapi.views.fast_serializers import game_data
+from troveapi.views.pagination import KeysetPagination
+from troveapi.views.replica import ReplicaReadMixin
 from troveapi.views.user import UserSerializer
 
 
-class GameView(ViewSet):
+def filtered_games(request):
+    """The user's games matching the filters of a list request, newest first"""
+    search_text = request.query_params.get('search', None)
+    # current must be passed in as string, not boolean 
+    # due to diff between True and true in Python
+    current_boolean = request.query_params.get('current', None)
+    # multiplayer must be passed in as string, not boolean 
+    multiplayer_boolean = request.query_params.get('multiplayer', None)
+    # can be passed as int or string
+    platform_id = request.query_params.get('platformId', None)
+    tag_list = request.query_params.getlist('tags', '')
+    # tagMatch=any returns media with any of the tags instead of all of them
+    tag_match = request.query_params.get('tagMatch', 'all')
+
+    filter_params = Q(user=request.auth.user)
+    if search_text:
+        filter_params &= search.name_filter(Game, request.auth.user, search_text)
+    if current_boolean:
+        filter_params &= Q(current=current_boolean)
+    if multiplayer_boolean:
+        filter_params &= Q(multiplayer_capable=multiplayer_boolean)
+    if platform_id:
+        filter_params &= Q(platforms__id=platform_id)
+
+    games = Game.objects.with_related().filter(
+        filter_params).order_by(*KeysetPagination.ordering)
+
+    if tag_list:
+        games = games.tagged(tag_list, match_all=tag_match != 'any')
+
+    return games
+
+
+class GameView(ReplicaReadMixin, ViewSet):
     """Trove game view"""
 
     def retrieve(self, request, pk):
@@ -17,48 +58,30 @@ class GameView(ViewSet):
         Returns:
             Response -- JSON serialized game
         """
+        version = row_version(request, Game, pk)
+        unchanged = not_modified(request, version)
+        if unchanged:
+            return unchanged
+
         try:
-            game = Game.objects.get(pk=pk)
+            game = Game.objects.with_related().get(pk=pk)
             serializer = GameSerializer(game)
-            return Response(serializer.data)
+            return add_validators(Response(serializer.data), version)
         except Game.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
+    @cached_list(Game, filtered_games, game_data)
     def list(self, request):
         """Handle GET requests to get all games
 
+        search matches games with a word in their name starting with each
+        searched word, e.g. "wit" finds "The Witcher" but "itcher" does not.
+
         Returns:
             Response -- JSON serialized list of games
         """
-        search_text = request.query_params.get('search', None)
-        # current must be passed in as string, not boolean 
-        # due to diff between True and true in Python
-        current_boolean = request.query_params.get('current', None)
-        # multiplayer must be passed in as string, not boolean 
-        multiplayer_boolean = request.query_params.get('multiplayer', None)
-        # can be passed as int or string
-        platform_id = request.query_params.get('platformId', None)
-        tag_list = request.query_params.getlist('tags', '')
-
-        filter_params = Q(user=request.auth.user)
-        if search_text:
-            filter_params &= Q(name__contains=search_text)
-        if current_boolean:
-            filter_params &= Q(current=current_boolean)
-        if multiplayer_boolean:
-            filter_params &= Q(multiplayer_capable=multiplayer_boolean)
-        if platform_id:
-            filter_params &= Q(platforms__id=platform_id)
-
-        games = Game.objects.filter(filter_params).order_by('-last_modified')
-
-        if tag_list:
-            for tag_id in tag_list:
-                games = games.filter(tags__id=tag_id)
-
-        serializer = GameSerializer(games, many=True)
-
-        return Response(serializer.data)
+        games = filtered_games(request)
+        return Response(KeysetPagination().list_data(games, request, game_data))
 
     def create(self, request):
         """Handle POST operations
@@ -67,7 +90,7 @@ class GameView(ViewSet):
             Response -- JSON serialized game instance
         """
 
-        user = User.objects.get(pk=request.auth.user.id)
+        user = request.auth.user
 
         serializer = CreateGameSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -90,10 +113,11 @@ class GameView(ViewSet):
 
             serializer = CreateGameSerializer(game, data=request.data)
             serializer.is_valid(raise_exception=True)
-            updated_game = serializer.save()
-
-            updated_game.tags.set(request.data["tags"])
-            updated_game.platforms.set(request.data["platforms"])
+            # one transaction, so the tags' usage moves with the game
+            with transaction.atomic():
+                updated_game = serializer.save()
+                updated_game.tags.set(request.data["tags"])
+                updated_game.platforms.set(request.data["platforms"])
 
             return Response(None, status=status.HTTP_204_NO_CONTENT)
         except Game.DoesNotExist as ex:
@@ -112,6 +136,15 @@ class GameView(ViewSet):
         except Game.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(methods=['post'], detail=False)
+    def batch(self, request):
+        """Handle POST requests to create, update and delete many games at once
+
+        Returns:
+            Response -- ids of the created, updated and deleted games
+        """
+        return run_batch(request, Game, CreateGameSerializer)
+
 
 class GameSerializer(serializers.ModelSerializer):
     """JSON serializer for game types
@@ -1,15 +1,18 @@
 """View module for handling requests about game recommendations"""
-from django.contrib.auth.models import User
 from rest_framework import serializers, status
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 from rest_framework.decorators import action
 from troveapi.models import GameRecommendation
+from troveapi.views.fan_out import fan_out
+from troveapi.views.fast_serializers import recommendation_data
+from troveapi.views.replica import ReplicaReadMixin
 from troveapi.views.user import UserSerializer
 
 
-class GameRecommendationView(ViewSet):
+class GameRecommendationView(ReplicaReadMixin, ViewSet):
     """Trove game_recommendation view"""
+    replica_actions = ('list', 'retrieve', 'notify')
 
     def retrieve(self, request, pk):
         """Handle GET requests for single game_recommendation
@@ -31,20 +34,25 @@ class GameRecommendationView(ViewSet):
             Response -- JSON serialized list of game_recommendations
         """
         game_recommendations = GameRecommendation.objects.filter(
-            recipient=request.auth.user)
+            recipient=request.auth.user).with_related()
 
-        serializer = RecoSerializer(game_recommendations, many=True)
-
-        return Response(serializer.data)
+        return Response([recommendation_data(recommendation, 'game')
+                         for recommendation in game_recommendations])
 
     def create(self, request):
         """Handle POST operations
 
+        A "recipients" list of user ids instead of "recipient" sends the
+        recommendation to each of them.
+
         Returns:
-            Response -- JSON serialized game_recommendation instance
+            Response -- JSON serialized game_recommendation instance, or list
+            of instances
         """
+        if 'recipients' in request.data:
+            return fan_out(request, GameRecommendation, CreateRecoSerializer)
 
-        user = User.objects.get(pk=request.auth.user.id)
+        user = request.auth.user
 
         serializer = CreateRecoSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -78,13 +86,9 @@ class GameRecommendationView(ViewSet):
     def notify(self, request):
         """Put requests to mark all of users received recommendations as read"""
 
-        unread = GameRecommendation.objects.filter(
-            recipient=request.auth.user.id, read=False)
+        new = GameRecommendation.objects.unread(request.auth.user).exists()
 
-        if len(unread) > 0:
-            return Response({'new': True})
-        else:
-            return Response({'new': False})
+        return Response({'new': new})
 
 
 class RecoSerializer(serializers.ModelSerializer):
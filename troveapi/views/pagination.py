@@ -0,0 +1,142 @@
+"""Keyset pagination for media lists ordered by last_modified"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(*position):
+    """Turn a position tuple into an opaque cursor string"""
+    raw = '|'.join(str(value) for value in position)
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, parts):
+    """Split an opaque cursor back into its string parts
+
+    Raises:
+        NotFound -- if the cursor was not made by encode_cursor
+    """
+    try:
+        values = urlsafe_b64decode(cursor.encode()).decode().split('|')
+    except (ValueError, UnicodeError) as ex:
+        raise NotFound('Invalid cursor') from ex
+
+    if len(values) != parts:
+        raise NotFound('Invalid cursor')
+
+    return values
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on (last_modified, id), newest first
+
+    Each page filters past the last row of the previous one instead of using
+    OFFSET, so a deep page costs the same as the first. Pagination is opt in:
+    lists are only paged when the client sends a cursor or a page size.
+    """
+    page_size = getattr(settings, 'TROVE_PAGE_SIZE', 50)
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'pageSize'
+    ordering = ('-last_modified', '-id')
+
+    def is_requested(self, request):
+        """Whether the client asked for a paged response"""
+        return (self.cursor_query_param in request.query_params or
+                self.page_size_query_param in request.query_params)
+
+    def get_page_size(self, request):
+        """Page size from the query string, capped at max_page_size"""
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        return min(max(size, 1), self.max_page_size)
+
+    def get_position(self, request):
+        """The (last_modified, id) the requested page starts after"""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+
+        modified, pk = decode_cursor(cursor, 2)
+        try:
+            return datetime.fromisoformat(modified), int(pk)
+        except ValueError as ex:
+            raise NotFound('Invalid cursor') from ex
+
+    def page_queryset(self, queryset, request):
+        """The rows of the requested page, plus one to tell if there is a next"""
+        self.request = request
+        self.size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.get_position(request)
+        if position:
+            modified, pk = position
+            queryset = queryset.filter(
+                Q(last_modified__lt=modified) |
+                Q(last_modified=modified, id__lt=pk)
+            )
+
+        # one extra row tells us whether there is a next page
+        return queryset[:self.size + 1]
+
+    def cut_page(self, rows):
+        page = rows[:self.size]
+
+        self.next_cursor = None
+        if len(rows) > self.size:
+            last = page[-1]
+            self.next_cursor = encode_cursor(last.last_modified.isoformat(), last.pk)
+
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.cut_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset for async views"""
+        return self.cut_page([row async for row in self.page_queryset(queryset, request)])
+
+    def list_data(self, queryset, request, row_data):
+        """Data of a list action, the rows of queryset passed through
+        row_data, paged if the client asked for it
+        """
+        if not self.is_requested(request):
+            return [row_data(row) for row in queryset]
+
+        page = self.paginate_queryset(queryset, request)
+        return self.get_paginated_data([row_data(row) for row in page])
+
+    async def alist_data(self, queryset, request, row_data):
+        """list_data for async views"""
+        if not self.is_requested(request):
+            return [row_data(row) async for row in queryset]
+
+        page = await self.apaginate_queryset(queryset, request)
+        return self.get_paginated_data([row_data(row) for row in page])
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'nextCursor': self.next_cursor,
+            'results': data
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
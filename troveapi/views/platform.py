@@ -1,7 +1,7 @@
 """View module for handling requests about platform"""
 from rest_framework.viewsets import ViewSet
-from rest_framework.response import Response
 from rest_framework import serializers
+from troveapi.cache import reference_list
 from troveapi.models import Platform
 
 
@@ -12,12 +12,10 @@ class PlatformView(ViewSet):
         """Handle GET requests to get all platforms
 
         Returns:
-            Response -- JSON serialized list of platforms
+            Response -- JSON serialized list of platforms, cached until
+            one changes
         """
-        platforms = Platform.objects.all()
-        serializer = PlatformSerializer(platforms, many=True)
-
-        return Response(serializer.data)
+        return reference_list(request, Platform, PlatformSerializer)
 
 
 class PlatformSerializer(serializers.ModelSerializer):
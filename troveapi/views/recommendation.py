@@ -0,0 +1,282 @@
+"""View module for handling requests about recommendations of every media type"""
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.viewsets import ViewSet
+from troveapi.models import (BookRecommendation, GameRecommendation,
+                             ShowRecommendation)
+from troveapi.views.book_recommendation import \
+    RecoSerializer as BookRecoSerializer
+from troveapi.views.fast_serializers import inbox_data
+from troveapi.views.game_recommendation import \
+    RecoSerializer as GameRecoSerializer
+from troveapi.views.pagination import (KeysetPagination, decode_cursor,
+                                       encode_cursor)
+from troveapi.views.replica import ReplicaReadMixin
+from troveapi.views.show_recommendation import \
+    RecoSerializer as ShowRecoSerializer
+
+# response key of the recommendations of each media type
+RECOMMENDATION_MODELS = {
+    'books': BookRecommendation,
+    'games': GameRecommendation,
+    'shows': ShowRecommendation,
+}
+
+
+class BookInboxSerializer(BookRecoSerializer):
+    """JSON serializer for book recommendations in the inbox"""
+    class Meta(BookRecoSerializer.Meta):
+        fields = BookRecoSerializer.Meta.fields + ('read', 'created')
+
+
+class GameInboxSerializer(GameRecoSerializer):
+    """JSON serializer for game recommendations in the inbox"""
+    class Meta(GameRecoSerializer.Meta):
+        fields = GameRecoSerializer.Meta.fields + ('read', 'created')
+
+
+class ShowInboxSerializer(ShowRecoSerializer):
+    """JSON serializer for show recommendations in the inbox"""
+    class Meta(ShowRecoSerializer.Meta):
+        fields = ShowRecoSerializer.Meta.fields + ('read', 'created')
+
+
+# record type, model, media field and serializer of each kind of inbox row,
+# rows sent at the same time are ordered by their position here; lists
+# serialize with fast_serializers.inbox_data, which mirrors the serializer
+INBOX_TYPES = (
+    ('bookRecommendation', BookRecommendation, 'book', BookInboxSerializer),
+    ('gameRecommendation', GameRecommendation, 'game', GameInboxSerializer),
+    ('showRecommendation', ShowRecommendation, 'show', ShowInboxSerializer),
+)
+
+
+def inbox_position(cursor):
+    """The (created, type rank, id) an inbox page starts after"""
+    if not cursor:
+        return None
+
+    created, rank, pk = decode_cursor(cursor, 3)
+    try:
+        return datetime.fromisoformat(created), int(rank), int(pk)
+    except ValueError as ex:
+        raise NotFound('Invalid cursor') from ex
+
+
+def inbox_rows(user, rank, position, size):
+    """Up to size received recommendations of one type, newest first, that
+    come after position in the merged inbox order
+    """
+    model = INBOX_TYPES[rank][1]
+    rows = model.objects.filter(recipient=user).with_related().order_by('-created', '-id')
+
+    if position:
+        created, position_rank, pk = position
+        after = Q(created__lt=created)
+        if rank > position_rank:
+            after |= Q(created=created)
+        elif rank == position_rank:
+            after |= Q(created=created, id__lt=pk)
+        rows = rows.filter(after)
+
+    return list(rows[:size])
+
+
+def selected_rows(user, selection):
+    """The user's received recommendations named by a validated
+    BulkSelectionSerializer, as a queryset per record type
+    """
+    querysets = {}
+    for record_type, model, _, _ in INBOX_TYPES:
+        rows = model.objects.filter(recipient=user)
+        if 'ids' in selection:
+            rows = rows.filter(pk__in=selection['ids'].get(record_type, []))
+        if 'types' in selection and record_type not in selection['types']:
+            continue
+        if 'before' in selection:
+            rows = rows.filter(created__lte=selection['before'])
+        if 'read' in selection:
+            rows = rows.filter(read=selection['read'])
+        querysets[record_type] = rows
+
+    return querysets
+
+
+def unread_count(model):
+    """Number of unread recommendations of a model for the outer user"""
+    unread = model.objects.filter(
+        recipient=OuterRef('pk'), read=False
+    ).order_by().values('recipient').annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(unread), 0)
+
+
+def latest_received(model):
+    """Id of the newest recommendation of a model the outer user received"""
+    latest = model.objects.filter(
+        recipient=OuterRef('pk')
+    ).order_by().values('recipient').annotate(latest=Max('pk')).values('latest')
+    return Coalesce(Subquery(latest), 0)
+
+
+def unread_counts_query(user):
+    return User.objects.filter(pk=user.pk).values(
+        **{key: unread_count(model) for key, model in RECOMMENDATION_MODELS.items()},
+        **{f'{key}_latest': latest_received(model)
+           for key, model in RECOMMENDATION_MODELS.items()})
+
+
+def with_total(row):
+    """Counts of an unread_counts_query row with their total and version
+
+    The version pairs each type's unread count with the id of its newest
+    recommendation, so a read followed by a new arrival still changes it.
+    """
+    counts = {key: row[key] for key in RECOMMENDATION_MODELS}
+    counts['total'] = sum(counts.values())
+    counts['version'] = '.'.join(f"{row[f'{key}_latest']}-{row[key]}"
+                                 for key in RECOMMENDATION_MODELS)
+    return counts
+
+
+def unread_counts(user):
+    """Unread recommendations of a user per media type, in one query"""
+    return with_total(unread_counts_query(user).get())
+
+
+async def aunread_counts(user):
+    """unread_counts for async views"""
+    return with_total(await unread_counts_query(user).aget())
+
+
+class RecommendationView(ReplicaReadMixin, ViewSet):
+    """Trove recommendations across books, games and shows"""
+    replica_actions = ('list', 'unread')
+
+    def list(self, request):
+        """Handle GET requests for the received recommendations of every
+        media type, newest first
+
+        Pages hold pageSize rows, pass nextCursor back as cursor to get the
+        next one. A page costs a fixed number of queries however deep it is.
+
+        Returns:
+            Response -- next link, next cursor and the page of recommendations
+        """
+        paginator = KeysetPagination()
+        size = paginator.get_page_size(request)
+        position = inbox_position(request.query_params.get(paginator.cursor_query_param))
+
+        rows = [(row.created, rank, row.pk, row)
+                for rank in range(len(INBOX_TYPES))
+                for row in inbox_rows(request.auth.user, rank, position, size + 1)]
+        rows.sort(key=lambda row: (row[0], -row[1], row[2]), reverse=True)
+        page = rows[:size]
+
+        next_cursor = next_link = None
+        if len(rows) > size:
+            created, rank, pk, _ = page[-1]
+            next_cursor = encode_cursor(created.isoformat(), rank, pk)
+            next_link = replace_query_param(
+                request.build_absolute_uri(), paginator.cursor_query_param, next_cursor)
+
+        results = []
+        for _, rank, _, row in page:
+            record_type, _, media_field, _ = INBOX_TYPES[rank]
+            results.append({'type': record_type, record_type: inbox_data(row, media_field)})
+
+        return Response({
+            'next': next_link,
+            'nextCursor': next_cursor,
+            'results': results
+        })
+
+    @action(methods=['put'], detail=False)
+    def read(self, request):
+        """Handle PUT requests to mark many received recommendations as read
+
+        The body selects rows like BulkSelectionSerializer describes.
+
+        Returns:
+            Response -- number of recommendations marked read per type
+        """
+        selection = BulkSelectionSerializer(data=request.data)
+        selection.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            counts = {record_type: rows.filter(read=False).update(read=True)
+                      for record_type, rows in selected_rows(
+                          request.auth.user, selection.validated_data).items()}
+
+        counts['total'] = sum(counts.values())
+        return Response(counts)
+
+    @action(methods=['post'], detail=False)
+    def dismiss(self, request):
+        """Handle POST requests to delete many received recommendations
+
+        The body selects rows like BulkSelectionSerializer describes.
+
+        Returns:
+            Response -- number of recommendations deleted per type
+        """
+        selection = BulkSelectionSerializer(data=request.data)
+        selection.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            counts = {record_type: rows.delete()[0]
+                      for record_type, rows in selected_rows(
+                          request.auth.user, selection.validated_data).items()}
+
+        counts['total'] = sum(counts.values())
+        return Response(counts)
+
+    @action(methods=['get'], detail=False)
+    def unread(self, request):
+        """Handle GET requests for the number of unread recommendations per
+        media type
+
+        Always answers at once. Long polling with wait and since is served
+        by the async view on the same URL under ASGI, see
+        troveapi.views.async_reads.unread.
+
+        Returns:
+            Response -- JSON serialized unread counts and their version
+        """
+        return Response(unread_counts(request.auth.user))
+
+
+class BulkSelectionSerializer(serializers.Serializer):
+    """JSON serializer for the received recommendations a bulk action applies to
+
+    Either "ids", mapping record types like bookRecommendation to lists of
+    ids, or "all": true. Both can be narrowed by "types", a list of record
+    types, "before", the latest created time, and "read".
+    """
+    ids = serializers.DictField(
+        child=serializers.ListField(child=serializers.IntegerField()), required=False)
+    all = serializers.BooleanField(required=False, default=False)
+    types = serializers.ListField(
+        child=serializers.ChoiceField(choices=[record_type for record_type, *_ in INBOX_TYPES]),
+        required=False)
+    before = serializers.DateTimeField(required=False)
+    read = serializers.BooleanField(required=False)
+
+    def validate_ids(self, value):
+        unknown = set(value) - {record_type for record_type, *_ in INBOX_TYPES}
+        if unknown:
+            raise serializers.ValidationError(f'Unknown record types {sorted(unknown)}.')
+        return value
+
+    def validate(self, attrs):
+        if 'ids' not in attrs and not attrs['all']:
+            raise serializers.ValidationError('Pass ids, or all to select every recommendation.')
+        return attrs
@@ -0,0 +1,34 @@
+"""Read replica routing for ViewSets, see troveapi.routers"""
+from rest_framework.permissions import SAFE_METHODS
+from troveapi.routers import (pin_to_primary, pinned_to_primary, read_alias,
+                              replica_alias)
+
+
+class ReplicaReadMixin:
+    """Run the queries of read actions on the replica
+
+    Actions named in replica_actions read from the replica unless the user
+    wrote recently. Any successful unsafe request pins its user to the
+    primary so their next reads see the write.
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        # authentication is done, so the user is known and was read from
+        # the primary
+        if self.action in self.replica_actions and not pinned_to_primary(request.user.id):
+            self.read_alias_token = read_alias.set(replica_alias())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, 'read_alias_token', None)
+        if token is not None:
+            read_alias.reset(token)
+            self.read_alias_token = None
+
+        if (request.method not in SAFE_METHODS and response.status_code < 400 and
+                request.user.is_authenticated):
+            pin_to_primary(request.user.id)
+
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,64 @@
+"""View module for searching across games, books and shows"""
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+from troveapi import search
+from troveapi.models import Book, Game, Show
+from troveapi.views.book import BookSerializer
+from troveapi.views.game import GameSerializer
+from troveapi.views.show import ShowSerializer
+
+# most matches one search returns, ?limit= can lower it
+MAX_LIMIT = 200
+
+MEDIA = {
+    'game': (Game, GameSerializer),
+    'book': (Book, BookSerializer),
+    'show': (Show, ShowSerializer),
+}
+
+
+class SearchView(ViewSet):
+    """Trove search view"""
+
+    def list(self, request):
+        """Handle GET requests to search all of a user's media by name
+
+        Names match when each searched word is the start of one of their
+        words. limit, 50 by default, is capped between 1 and 200.
+
+        Returns:
+            Response -- JSON serialized list of matches, best match first
+        """
+        search_text = request.query_params.get('q', None)
+        # type can be repeated to narrow the search, e.g. ?type=game&type=show
+        media_types = [media_type for media_type in request.query_params.getlist('type')
+                       if media_type in MEDIA] or list(MEDIA)
+        try:
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            return Response({'message': 'limit must be a whole number'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        matches = search.ranked(request.auth.user, search_text, media_types, limit)
+
+        found = {}
+        for media_type, (model, _) in MEDIA.items():
+            ids = [pk for match_type, pk in matches if match_type == media_type]
+            if ids:
+                items = model.objects.with_related().filter(
+                    pk__in=ids, user=request.auth.user)
+                found[media_type] = {item.pk: item for item in items}
+
+        results = []
+        for media_type, pk in matches:
+            item = found[media_type].get(pk)
+            if item is not None:
+                serializer_class = MEDIA[media_type][1]
+                results.append({
+                    'type': media_type,
+                    media_type: serializer_class(item).data
+                })
+
+        return Response(results)
@@ -1,14 +1,51 @@
 """View module for handling requests about shows"""
-from django.contrib.auth.models import User
+from django.db import transaction
 from django.db.models import Q
 from rest_framework import serializers, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
+from troveapi import search
+from troveapi.cache import (add_validators, cached_list, not_modified,
+                            row_version)
 from troveapi.models import Show
+from troveapi.views.batch import run_batch
+from troveapi.views.fast_serializers import show_data
+from troveapi.views.pagination import KeysetPagination
+from troveapi.views.replica import ReplicaReadMixin
 from troveapi.views.user import UserSerializer
 
 
-class ShowView(ViewSet):
+def filtered_shows(request):
+    """The user's shows matching the filters of a list request, newest first"""
+    search_text = request.query_params.get('search', None)
+    # current must be passed in as string, not boolean 
+    # due to diff btwn True and true in Python
+    current_boolean = request.query_params.get('current', None)
+    # can be passed as int or string
+    streaming_service_id = request.query_params.get('streamingServiceId', None)
+    tag_list = request.query_params.getlist('tags', '')
+    # tagMatch=any returns media with any of the tags instead of all of them
+    tag_match = request.query_params.get('tagMatch', 'all')
+
+    filter_params = Q(user=request.auth.user)
+    if search_text:
+        filter_params &= search.name_filter(Show, request.auth.user, search_text)
+    if current_boolean:
+        filter_params &= Q(current=current_boolean)
+    if streaming_service_id:
+        filter_params &= Q(streaming_service__id=streaming_service_id)
+
+    shows = Show.objects.with_related().filter(
+        filter_params).order_by(*KeysetPagination.ordering)
+
+    if tag_list:
+        shows = shows.tagged(tag_list, match_all=tag_match != 'any')
+
+    return shows
+
+
+class ShowView(ReplicaReadMixin, ViewSet):
     """Trove show view"""
 
     def retrieve(self, request, pk):
@@ -17,44 +54,30 @@ class ShowView(ViewSet):
         Returns:
             Response -- JSON serialized show
         """
+        version = row_version(request, Show, pk)
+        unchanged = not_modified(request, version)
+        if unchanged:
+            return unchanged
+
         try:
-            show = Show.objects.get(pk=pk)
+            show = Show.objects.with_related().get(pk=pk)
             serializer = ShowSerializer(show)
-            return Response(serializer.data)
+            return add_validators(Response(serializer.data), version)
         except Show.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
+    @cached_list(Show, filtered_shows, show_data)
     def list(self, request):
         """Handle GET requests to get all shows
 
+        search matches shows with a word in their name starting with each
+        searched word, e.g. "wit" finds "The Witcher" but "itcher" does not.
+
         Returns:
             Response -- JSON serialized list of shows
         """
-        search_text = request.query_params.get('search', None)
-        # current must be passed in as string, not boolean 
-        # due to diff btwn True and true in Python
-        current_boolean = request.query_params.get('current', None)
-        # can be passed as int or string
-        streaming_service_id = request.query_params.get('streamingServiceId', None)
-        tag_list = request.query_params.getlist('tags', '')
-
-        filter_params = Q(user=request.auth.user)
-        if search_text:
-            filter_params &= Q(name__contains=search_text)
-        if current_boolean:
-            filter_params &= Q(current=current_boolean)
-        if streaming_service_id:
-            filter_params &= Q(streaming_service__id=streaming_service_id)
-
-        shows = Show.objects.filter(filter_params).order_by('-last_modified')
-
-        if tag_list:
-            for tag_id in tag_list:
-                shows = shows.filter(tags__id=tag_id)
-
-        serializer = ShowSerializer(shows, many=True)
-
-        return Response(serializer.data)
+        shows = filtered_shows(request)
+        return Response(KeysetPagination().list_data(shows, request, show_data))
 
     def create(self, request):
         """Handle POST operations
@@ -63,7 +86,7 @@ class ShowView(ViewSet):
             Response -- JSON serialized show instance
         """
 
-        user = User.objects.get(pk=request.auth.user.id)
+        user = request.auth.user
 
         serializer = CreateShowSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -85,9 +108,10 @@ class ShowView(ViewSet):
 
             serializer = CreateShowSerializer(show, data=request.data)
             serializer.is_valid(raise_exception=True)
-            updated_show = serializer.save()
-
-            updated_show.tags.set(request.data["tags"])
+            # one transaction, so the tags' usage moves with the show
+            with transaction.atomic():
+                updated_show = serializer.save()
+                updated_show.tags.set(request.data["tags"])
 
             return Response(None, status=status.HTTP_204_NO_CONTENT)
         except Show.DoesNotExist as ex:
@@ -106,6 +130,15 @@ class ShowView(ViewSet):
         except Show.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(methods=['post'], detail=False)
+    def batch(self, request):
+        """Handle POST requests to create, update and delete many shows at once
+
+        Returns:
+            Response -- ids of the created, updated and deleted shows
+        """
+        return run_batch(request, Show, CreateShowSerializer)
+
 
 class ShowSerializer(serializers.ModelSerializer):
     """JSON serializer for show types
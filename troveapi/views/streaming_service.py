@@ -1,7 +1,7 @@
 """View module for handling requests about streamingService"""
 from rest_framework.viewsets import ViewSet
-from rest_framework.response import Response
 from rest_framework import serializers
+from troveapi.cache import reference_list
 from troveapi.models import StreamingService
 
 
@@ -12,12 +12,10 @@ class StreamingServiceView(ViewSet):
         """Handle GET requests to get all streamingServices
 
         Returns:
-            Response -- JSON serialized list of streamingServices
+            Response -- JSON serialized list of streamingServices, cached until
+            one changes
         """
-        streaming_services = StreamingService.objects.all()
-        serializer = StreamingServiceSerializer(streaming_services, many=True)
-
-        return Response(serializer.data)
+        return reference_list(request, StreamingService, StreamingServiceSerializer)
 
 
 class StreamingServiceSerializer(serializers.ModelSerializer):
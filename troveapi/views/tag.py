@@ -1,35 +1,87 @@
 """View module for handling requests about tag"""
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Q, Count
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
 from rest_framework import serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
-from troveapi.models import Tag
+from troveapi.cache import bump_generation, cached_list
+from troveapi.models import Author, Tag, TagUsage
+from troveapi.models.tag_usage import USAGE_FIELDS
+from troveapi.views.author import CreateAuthorSerializer
+from troveapi.views.fast_serializers import tag_data
+from troveapi.views.replica import ReplicaReadMixin
 
 
-class TagView(ViewSet):
+def seed_rows(model, field, user_ids, values, ignore_case=False):
+    """Bulk insert a model row per user and value, skipping existing ones
+
+    With ignore_case, values matching an existing row or each other but for
+    case are skipped too. Rows a concurrent seed inserted first are left to
+    the model's unique constraint to skip.
+
+    Returns:
+        list -- the rows that were created
+    """
+    fold = str.lower if ignore_case else str
+    unique = {}
+    for value in values:
+        unique.setdefault(fold(value), value)
+
+    if ignore_case:
+        # lowered by the database on both sides, as its unique constraint is
+        matching = model.objects.alias(key=Lower(field)).filter(
+            key__in=[Lower(Value(value)) for value in unique.values()])
+    else:
+        matching = model.objects.filter(**{f'{field}__in': list(unique.values())})
+    matching = matching.filter(user_id__in=user_ids).order_by('pk')
+
+    existing = {(row.user_id, fold(getattr(row, field))): row.pk for row in matching}
+    model.objects.bulk_create(
+        [model(user_id=user_id, **{field: value})
+         for user_id in user_ids
+         for folded, value in unique.items()
+         if (user_id, folded) not in existing],
+        batch_size=500, ignore_conflicts=True)
+
+    # rows inserted ignoring conflicts get no pk, so read them back
+    existing_pks = set(existing.values())
+    return [row for row in matching.all() if row.pk not in existing_pks]
+
+
+def filtered_tags(request):
+    """The user's tags by name, only those containing the q query parameter
+    if there is one
+    """
+    tags = Tag.objects.order_by("tag").filter(user=request.auth.user)
+
+    search_text = request.query_params.get('q', None)
+
+    if search_text:
+        tags = Tag.objects.order_by("tag").filter(
+            Q(tag__contains=search_text) &
+            Q(user=request.auth.user)
+        )
+
+    return tags
+
+
+class TagView(ReplicaReadMixin, ViewSet):
     """Trove tag view"""
 
+    @cached_list()
     def list(self, request):
         """Handle GET requests to get all tags
 
         Returns:
             Response -- JSON serialized list of tags
         """
-        tags = Tag.objects.order_by("tag").filter(user=request.auth.user)
-
-        search_text = self.request.query_params.get('q', None)
+        tags = filtered_tags(request)
 
-        if search_text:
-            tags = Tag.objects.order_by("tag").filter(
-                Q(tag__contains=search_text) &
-                Q(user=request.auth.user)
-            )
-
-        serializer = TagSerializer(tags, many=True)
-
-        return Response(serializer.data)
+        return Response([tag_data(tag) for tag in tags])
 
     def retrieve(self, request, pk):
         """Handle GET requests for single tag
@@ -50,11 +102,17 @@ class TagView(ViewSet):
         Returns:
             Response -- JSON serialized tag instance
         """
-        user = User.objects.get(pk=request.auth.user.id)
+        user = request.auth.user
 
         serializer = CreateTagSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(user=user)
+
+        try:
+            with transaction.atomic():
+                serializer.save(user=user)
+        except IntegrityError:
+            return Response({'message': 'You already have a tag with this name'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -70,9 +128,13 @@ class TagView(ViewSet):
 
             serializer = CreateTagSerializer(tag, data=request.data)
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
 
             return Response(None, status=status.HTTP_204_NO_CONTENT)
+        except IntegrityError:
+            return Response({'message': 'You already have a tag with this name'},
+                            status=status.HTTP_400_BAD_REQUEST)
         except Tag.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
@@ -91,94 +153,107 @@ class TagView(ViewSet):
 
     @action(methods=['post'], detail=False)
     def seed(self, request):
-        """Seed a user's database with some general tags to get them started when they register"""
+        """Seed a user's database with some general tags to get them started when they register
 
-        user = User.objects.get(pk=request.auth.user.id)
-        default_tags = ["Action", "Adventure", "Comedy", "Drama", "Mystery",
-                        "Fantasy", "Historical", "Horror", "Romance", "Science Fiction", "Thriller",
-                        "Western", "Platformer", "Shooter", "Survival", "RPG",
-                        "Strategy", "Esports", "Casual", "Educational", "Open world"
-                        ]
-
-        data_list = []
+        The tags come from the TROVE_DEFAULT_TAGS setting unless "tags" is posted.
+        Seeding is idempotent, tags the user already has are skipped. Staff can
+        seed many users at once for onboarding imports by posting their ids as
+        "users", optionally with "authors" to seed as well.
+        """
+        seed_serializer = SeedSerializer(data=request.data)
+        seed_serializer.is_valid(raise_exception=True)
+        tag_names = seed_serializer.validated_data.get("tags", settings.TROVE_DEFAULT_TAGS)
+        author_names = seed_serializer.validated_data["authors"]
+        user_ids = seed_serializer.validated_data.get("users", None)
+
+        tag_serializer = CreateTagSerializer(
+            data=[{"tag": name} for name in tag_names], many=True)
+        tag_serializer.is_valid(raise_exception=True)
+        author_serializer = CreateAuthorSerializer(
+            data=[{"name": name} for name in author_names], many=True)
+        author_serializer.is_valid(raise_exception=True)
+
+        if user_ids is None:
+            users = [request.auth.user.id]
+        elif not request.auth.user.is_staff:
+            return Response({'message': 'Only staff can seed other users'},
+                            status=status.HTTP_403_FORBIDDEN)
+        else:
+            users = list(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+            if len(users) != len(set(user_ids)):
+                return Response({'message': 'Unknown user in users'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            tags = seed_rows(Tag, 'tag', users, tag_names)
+            # a concurrent seed may have given some of them usage rows already
+            TagUsage.objects.bulk_create(
+                [TagUsage(tag=tag) for tag in tags], batch_size=500, ignore_conflicts=True)
+            authors = seed_rows(Author, 'name', users, author_names, ignore_case=True)
+
+        # bulk inserts skip the signals that move the cached versions on
+        for user_id in users:
+            bump_generation(user_id)
+
+        if user_ids is None:
+            return Response(CreateTagSerializer(tags, many=True).data,
+                            status=status.HTTP_201_CREATED)
+
+        return Response({'tags': len(tags), 'authors': len(authors)},
+                        status=status.HTTP_201_CREATED)
 
-        for tag_string in default_tags:
-            serializer = CreateTagSerializer(data={"tag": tag_string})
-            serializer.is_valid(raise_exception=True)
-            serializer.save(user=user)
-            data_list.append(serializer.data)
+    @action(methods=['get'], detail=False)
+    def activity(self, request):
+        """Get every tag with how many current and queued books, games and
+        shows it is used on
+        """
+        tags = self.tag_usage(request.auth.user)
+        serializer = TagActivitySerializer(tags, many=True)
 
-        return Response(data_list, status=status.HTTP_201_CREATED)
+        return Response(serializer.data)
 
     @action(methods=['get'], detail=False)
     def active_current(self, request):
         """Only get tags that are active on current media"""
 
-        current_book_tags = Tag.objects.annotate(count_book=Count('taggedbook')
-        ).filter(count_book__gt=0, user=request.auth.user, taggedbook__book__current=True
-        ).order_by("tag")
-
-        current_game_tags = Tag.objects.annotate(count_game=Count('taggedgame')
-        ).filter(count_game__gt=0, user=request.auth.user, taggedgame__game__current=True
-        ).order_by("tag")
-
-        current_show_tags = Tag.objects.annotate(count_show=Count('taggedshow')
-        ).filter(count_show__gt=0, user=request.auth.user, taggedshow__show__current=True
-        ).order_by("tag")
-
-        current_book_serializer = TagSerializer(current_book_tags, many=True)
-        current_game_serializer = TagSerializer(current_game_tags, many=True)
-        current_show_serializer = TagSerializer(current_show_tags, many=True)
+        tags = self.tag_usage(request.auth.user)
 
         return Response({
-            "currentBookTags": current_book_serializer.data,
-            "currentGameTags": current_game_serializer.data,
-            "currentShowTags": current_show_serializer.data
+            "currentBookTags": self.used_tags(tags, 'current_books'),
+            "currentGameTags": self.used_tags(tags, 'current_games'),
+            "currentShowTags": self.used_tags(tags, 'current_shows')
         })
 
     @action(methods=['get'], detail=False)
     def active_queued(self, request):
         """Only get tags that are active on queued media"""
 
-        queued_book_tags = Tag.objects.annotate(count_book=Count('taggedbook')
-        ).filter(count_book__gt=0, user=request.auth.user, taggedbook__book__current=False
-        ).order_by("tag")
-
-        queued_game_tags = Tag.objects.annotate(count_game=Count('taggedgame')
-        ).filter(count_game__gt=0, user=request.auth.user, taggedgame__game__current=False
-        ).order_by("tag")
-
-        queued_show_tags = Tag.objects.annotate(count_show=Count('taggedshow')
-        ).filter(count_show__gt=0, user=request.auth.user, taggedshow__show__current=False
-        ).order_by("tag")
-
-        queued_book_serializer = TagSerializer(queued_book_tags, many=True)
-        queued_game_serializer = TagSerializer(queued_game_tags, many=True)
-        queued_show_serializer = TagSerializer(queued_show_tags, many=True)
+        tags = self.tag_usage(request.auth.user)
 
         return Response({
-            "queuedBookTags": queued_book_serializer.data,
-            "queuedGameTags": queued_game_serializer.data,
-            "queuedShowTags": queued_show_serializer.data
+            "queuedBookTags": self.used_tags(tags, 'queued_books'),
+            "queuedGameTags": self.used_tags(tags, 'queued_games'),
+            "queuedShowTags": self.used_tags(tags, 'queued_shows')
         })
 
     @action(methods=['get'], detail=False)
     def active(self, request):
         """Only get tags that are active on any media"""
 
-        tags = Tag.objects.annotate(
-            count_game=Count('taggedgame', distinct=True),
-            count_show=Count('taggedshow', distinct=True),
-            count_book=Count('taggedbook', distinct=True)
-        ).filter(
-            Q(count_game__gt=0, user=request.auth.user) |
-            Q(count_show__gt=0, user=request.auth.user) |
-            Q(count_book__gt=0, user=request.auth.user)
-        ).order_by("tag")
+        tags = self.tag_usage(request.auth.user)
 
-        serializer = TagSerializer(tags, many=True)
+        return Response(self.used_tags(tags, *USAGE_FIELDS))
 
-        return Response(serializer.data)
+    def tag_usage(self, user):
+        """A user's tags, ordered by name, with their usage counts"""
+        return list(Tag.objects.filter(user=user).with_usage().order_by("tag"))
+
+    def used_tags(self, tags, *usage_fields):
+        """Serialize the tags with a non zero count in any of usage_fields"""
+        used = [tag for tag in tags
+                if any(getattr(tag, field) for field in usage_fields)]
+
+        return TagSerializer(used, many=True).data
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -190,6 +265,31 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'tag', 'user')
 
 
+class TagActivitySerializer(serializers.ModelSerializer):
+    """JSON serializer for tags with their usage counts
+    """
+    currentBooks = serializers.IntegerField(source='current_books')
+    queuedBooks = serializers.IntegerField(source='queued_books')
+    currentGames = serializers.IntegerField(source='current_games')
+    queuedGames = serializers.IntegerField(source='queued_games')
+    currentShows = serializers.IntegerField(source='current_shows')
+    queuedShows = serializers.IntegerField(source='queued_shows')
+
+    class Meta:
+        model = Tag
+        fields = ('id', 'tag', 'user', 'currentBooks', 'queuedBooks',
+                  'currentGames', 'queuedGames', 'currentShows', 'queuedShows')
+
+
+class SeedSerializer(serializers.Serializer):
+    """JSON serializer for the body of a seed request, each name is checked
+    again by CreateTagSerializer or CreateAuthorSerializer
+    """
+    tags = serializers.ListField(child=serializers.CharField(), required=False)
+    authors = serializers.ListField(child=serializers.CharField(), default=list)
+    users = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+
 class CreateTagSerializer(serializers.ModelSerializer):
     """JSON serializer for tag types
     """
@@ -0,0 +1,72 @@
+"""View module for exporting and importing a user's whole trove"""
+import io
+
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+from troveapi.transfer import (FORMATS, READ_ERRORS, TroveImporter,
+                               aiter_chunks, export_records)
+from troveapi.views.async_reads import served_over_asgi
+
+
+class TroveView(ViewSet):
+    """Trove export and import view"""
+
+    @action(methods=['get'], detail=False)
+    def export(self, request):
+        """Handle GET requests to download every tag, game, book, show and
+        received recommendation of the user
+
+        fileFormat can be ndjson (the default) or csv.
+
+        Returns:
+            StreamingHttpResponse -- the records, streamed as they are read
+        """
+        file_format = request.query_params.get('fileFormat', 'ndjson')
+        if file_format not in FORMATS:
+            return Response({'message': f'Unknown fileFormat {file_format}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        writer, _, content_type = FORMATS[file_format]
+        body = writer(export_records(request.auth.user))
+        if served_over_asgi(request._request):
+            body = aiter_chunks(body)
+
+        response = StreamingHttpResponse(body, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="trove.{file_format}"'
+
+        return response
+
+    @action(methods=['post'], detail=False, url_path='import')
+    def import_file(self, request):
+        """Handle POST requests uploading an export as "file" to add to the
+        user's trove
+
+        fileFormat defaults to the extension of the uploaded file. A file
+        that cannot be read imports nothing.
+
+        Returns:
+            Response -- number of imported records per type
+        """
+        upload = request.FILES.get('file', None)
+        if upload is None:
+            return Response({'message': 'Upload an export as file'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = request.query_params.get(
+            'fileFormat', upload.name.rsplit('.', 1)[-1].lower())
+        if file_format not in FORMATS:
+            return Response({'message': f'Unknown fileFormat {file_format}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        _, reader, _ = FORMATS[file_format]
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+        try:
+            counts = TroveImporter(request.auth.user).run(reader(lines))
+        except READ_ERRORS as ex:
+            return Response({'message': f'Could not read the file: {ex}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(counts, status=status.HTTP_201_CREATED)
@@ -15,7 +15,7 @@ class UserView(ViewSet):
             Response -- JSON serialized user
         """
         try:
-            user = User.objects.get(pk=request.auth.user.id)
+            user = request.auth.user
 
             username_text = self.request.query_params.get('username', None)
             if username_text: